@@ -4,12 +4,16 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
+import hashlib
 import secrets
 from dotenv import load_dotenv
 
-import schemas, models, database
+import schemas, models, database, principal_cache
+from services import password_service
 
 load_dotenv()
 
@@ -21,16 +25,17 @@ if not SECRET_KEY or SECRET_KEY == "your-secret-key-should-be-in-env":
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Extended from 30 to 60 minutes
 REFRESH_TOKEN_EXPIRE_DAYS = 7
-
-import bcrypt
+# Live refresh tokens kept per user (one per signed-in device); the oldest are evicted
+REFRESH_TOKEN_MAX_PER_USER = int(os.getenv("REFRESH_TOKEN_MAX_PER_USER", "10"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Hashing runs on the dedicated password executor (services/password_service)
 def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_service.verify_password_blocking(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_service.hash_password_blocking(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -42,47 +47,87 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def create_refresh_token(user_id: int, db: Session):
-    # Generate a secure random token
+def create_user_access_token(user: models.User, salon_id: Optional[int] = None):
+    """Access token carrying the user id and salon id so requests can skip those lookups"""
+    data = {"sub": user.email, "uid": user.id}
+    if salon_id is not None:
+        data["sid"] = salon_id
+    return create_access_token(data, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _issue_refresh_token(user_id: int, db: Session) -> str:
+    """Add a new refresh token row in the caller's transaction, enforcing the per-user cap"""
+    stale_ids = [
+        row[0] for row in db.query(models.RefreshToken.id)
+        .filter(models.RefreshToken.user_id == user_id)
+        .order_by(models.RefreshToken.id.desc())
+        .offset(max(REFRESH_TOKEN_MAX_PER_USER - 1, 0))
+    ]
+    if stale_ids:
+        db.query(models.RefreshToken).filter(models.RefreshToken.id.in_(stale_ids)).delete(synchronize_session=False)
+
+    # Generate a secure random token; only its hash is stored
     token = secrets.token_urlsafe(32)
-    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-
-    # Save to database
-    db_token = models.RefreshToken(
-        token=token,
+    db.add(models.RefreshToken(
+        token_hash=hash_refresh_token(token),
         user_id=user_id,
-        expires_at=expires_at
-    )
-    db.add(db_token)
-    db.commit()
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
 
+def create_refresh_token(user_id: int, db: Session):
+    token = _issue_refresh_token(user_id, db)
+    db.commit()
     return token
 
-def verify_refresh_token(token: str, db: Session) -> Optional[models.User]:
+def _find_refresh_token(token: str, db: Session) -> Optional[models.RefreshToken]:
     db_token = db.query(models.RefreshToken).filter(
-        models.RefreshToken.token == token,
+        models.RefreshToken.token_hash == hash_refresh_token(token),
         models.RefreshToken.revoked == False
     ).first()
 
-    if not db_token:
+    # Check if expired
+    if not db_token or db_token.expires_at < datetime.utcnow():
         return None
+    return db_token
 
-    # Check if expired
-    if db_token.expires_at < datetime.utcnow():
+def verify_refresh_token(token: str, db: Session) -> Optional[models.User]:
+    db_token = _find_refresh_token(token, db)
+    return db_token.user if db_token else None
+
+def rotate_refresh_token(token: str, db: Session):
+    """Swap a valid refresh token for a new one in a single transaction.
+
+    Returns (user, new_token), or None if the token is unknown, expired or was
+    already used by a concurrent refresh.
+    """
+    db_token = _find_refresh_token(token, db)
+    if not db_token:
+        return None
+    user = db_token.user
+
+    # Conditional delete: of two concurrent refreshes with the same token only one wins
+    deleted = db.query(models.RefreshToken).filter(
+        models.RefreshToken.id == db_token.id
+    ).delete(synchronize_session=False)
+    if deleted != 1:
+        db.rollback()
         return None
+    db.expunge(db_token)
 
-    return db_token.user
+    new_token = _issue_refresh_token(user.id, db)
+    db.commit()
+    return user, new_token
 
 def revoke_refresh_token(token: str, db: Session):
-    db_token = db.query(models.RefreshToken).filter(
-        models.RefreshToken.token == token
-    ).first()
-
-    if db_token:
-        db_token.revoked = True
-        db.commit()
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.token_hash == hash_refresh_token(token)
+    ).delete(synchronize_session=False)
+    db.commit()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -93,11 +138,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
+        token_data = schemas.TokenData(email=email, user_id=payload.get("uid"), salon_id=payload.get("sid"))
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+
+    # Tokens with a user id claim can be served from the principal cache
+    if token_data.user_id is not None:
+        user = principal_cache.get_user(token_data.user_id, token_data.email)
+        if user is not None:
+            return user
+
+    result = await db.execute(select(models.User).where(models.User.email == token_data.email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    if token_data.user_id is not None and token_data.user_id != user.id:
+        raise credentials_exception
+
+    principal_cache.set_user(user, token_data.salon_id)
     return user
@@ -0,0 +1,279 @@
+"""
+API latency/throughput suite on a large seeded dataset, with regression baselines.
+
+Usage (from hairfit_server/):
+    python benchmarks/bench_api.py                       # full volumes, compare to baseline
+    python benchmarks/bench_api.py --scale 0.05          # quick run on 5% of the volumes
+    python benchmarks/bench_api.py --update-baseline     # record the current numbers
+
+Full volumes (--scale 1): 10k users/salons, 100k members, 1M synthesis history
+rows and 5k style images. The seeded database and files are kept in --workdir
+(default: a directory keyed by scale under the system temp dir) so later runs
+skip seeding. The app runs in process behind httpx's ASGI transport with rate
+limiting disabled.
+
+Baselines are stored per configuration in --baseline. A scenario regresses
+when its p95 latency grows, or its throughput drops, by more than --threshold
+(default 20%); any regression makes the run exit with status 1. Baselines are
+only comparable on the machine that recorded them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+FULL_VOLUMES = {"users": 10_000, "members": 100_000, "history": 1_000_000, "styles": 5_000}
+PASSWORD = "benchmark-password"
+BATCH_SIZE = 10_000
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_baseline.json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--workdir")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--auth-requests", type=int, default=64, help="login/refresh requests (bcrypt bound)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+VOLUMES = {name: max(1, int(count * ARGS.scale)) for name, count in FULL_VOLUMES.items()}
+WORK_DIR = os.path.abspath(ARGS.workdir or os.path.join(tempfile.gettempdir(), f"hairfit-bench-api-{ARGS.scale:g}"))
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.makedirs(WORK_DIR, exist_ok=True)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["HAIRFIT_RUNTIME_DIR"] = os.path.join(WORK_DIR, "run")
+# Relative paths (uploads/, assets/styles/) resolve inside the work dir
+os.chdir(WORK_DIR)
+
+import httpx
+from PIL import Image
+from sqlalchemy import insert
+
+import models, database, auth_utils as auth
+from services import password_service, search_service, style_service
+from main import app
+
+
+def batched_insert(db, model, rows, after_batch=None):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.execute(insert(model), batch)
+            if after_batch:
+                after_batch(db, batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+        if after_batch:
+            after_batch(db, batch)
+    db.commit()
+
+
+def index_member_batch(db, rows):
+    search_service.index_members(db, [SimpleNamespace(**row) for row in rows])
+
+
+def seed_styles():
+    styles_dir = os.path.join(WORK_DIR, "assets", "styles")
+    os.makedirs(styles_dir, exist_ok=True)
+    rng = random.Random(7)
+    for i in range(1, VOLUMES["styles"] + 1):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new("RGB", (64, 64), color).save(os.path.join(styles_dir, f"style_{i}.jpg"), quality=80)
+
+
+def seed_uploads(count: int = 50):
+    originals = os.path.join(WORK_DIR, "uploads", "originals")
+    os.makedirs(originals, exist_ok=True)
+    for i in range(count):
+        Image.new("RGB", (640, 800), (i * 5 % 256, 120, 200)).save(os.path.join(originals, f"photo_{i}.jpg"))
+
+
+def seed():
+    """Populate the database once; returns False if the work dir was already seeded"""
+    if os.path.exists(DB_PATH):
+        return False
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=SERVER_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    hashed = password_service.hash_password_blocking(PASSWORD)
+    base = datetime.utcnow()
+    rng = random.Random(42)
+    db = database.SessionLocal()
+
+    users = VOLUMES["users"]
+    batched_insert(db, models.User, (
+        {"id": i, "email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": hashed,
+         "created_at": base}
+        for i in range(1, users + 1)
+    ))
+    batched_insert(db, models.Salon, (
+        {"id": i, "name": f"Salon {i}", "owner_id": i, "created_at": base} for i in range(1, users + 1)
+    ))
+
+    # Skewed sizes: salon 1 (the benchmark account) is the largest, most salons are small
+    weights = [1 / rank for rank in range(1, users + 1)]
+    member_salons = rng.choices(range(1, users + 1), weights=weights, k=VOLUMES["members"])
+    batched_insert(db, models.Member, (
+        {"id": f"m{i}", "salon_id": salon_id, "name": f"Member {i}", "phone": f"010{i:08d}",
+         "created_at": base - timedelta(seconds=i), "updated_at": base - timedelta(seconds=i)}
+        for i, salon_id in enumerate(member_salons)
+    ), after_batch=index_member_batch)
+
+    styles = VOLUMES["styles"]
+    batched_insert(db, models.SynthesisHistory, (
+        {"id": f"h{i}", "member_id": f"m{rng.randrange(VOLUMES['members'])}",
+         "original_photo_path": f"originals/photo_{i % 50}.jpg",
+         "reference_style_id": f"style_{rng.randrange(1, styles + 1)}",
+         "result_photo_path": f"results/{i}.png", "created_at": base - timedelta(seconds=i)}
+        for i in range(VOLUMES["history"])
+    ))
+    db.close()
+
+    seed_styles()
+    seed_uploads()
+    print(f"Seeded {VOLUMES} in {time.perf_counter() - started:.1f}s ({WORK_DIR})")
+    return True
+
+
+def issue_refresh_tokens(count: int) -> list:
+    db = database.SessionLocal()
+    try:
+        return [auth.create_refresh_token(1 + i % VOLUMES["users"], db) for i in range(count)]
+    finally:
+        db.close()
+
+
+async def measure(client, make_request, total: int, concurrency: int) -> dict:
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for index in remaining:
+            start = time.perf_counter()
+            response = await make_request(client, index)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": round(total / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+    }
+
+
+async def run_scenarios() -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        login = await client.post("/login", json={"email": "user1@example.com", "password": PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        refresh_tokens = issue_refresh_tokens(ARGS.auth_requests)
+        users = VOLUMES["users"]
+
+        scenarios = {
+            "get_members": (lambda c, i: c.get("/members/?limit=50", headers=headers), ARGS.requests),
+            "get_members_search": (lambda c, i: c.get(f"/members/search?q=Member {i % 1000}", headers=headers),
+                                   ARGS.requests),
+            "get_synthesis_history": (lambda c, i: c.get("/synthesis-history?limit=50", headers=headers),
+                                      ARGS.requests),
+            "get_styles": (lambda c, i: c.get("/styles/", headers=headers), max(ARGS.requests // 10, 1)),
+            "get_image": (lambda c, i: c.get(f"/images/originals/photo_{i % 50}.jpg"), ARGS.requests),
+            "login": (lambda c, i: c.post("/login", json={"email": f"user{1 + i % users}@example.com",
+                                                            "password": PASSWORD}), ARGS.auth_requests),
+            "refresh": (lambda c, i: c.post("/refresh", json={"refresh_token": refresh_tokens[i]}),
+                        ARGS.auth_requests),
+        }
+        results = {}
+        for name, (make_request, total) in scenarios.items():
+            results[name] = await measure(client, make_request, total, ARGS.concurrency)
+            print(f"{name:<24}{results[name]['rps']:>10.1f}{results[name]['p50_ms']:>10.1f}"
+                  f"{results[name]['p95_ms']:>10.1f}")
+        return results
+
+
+def config() -> dict:
+    return {
+        "volumes": VOLUMES,
+        "requests": ARGS.requests,
+        "auth_requests": ARGS.auth_requests,
+        "concurrency": ARGS.concurrency,
+        "bcrypt_rounds": password_service.BCRYPT_ROUNDS,
+    }
+
+
+def config_key() -> str:
+    return json.dumps(config(), sort_keys=True)
+
+
+def find_regressions(baseline: dict, results: dict, threshold: float) -> list:
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {current['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if current["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {current['rps']:.1f} req/s vs baseline {base['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    seed()
+    # The app's startup hook is not run by the ASGI transport
+    style_service.load_catalog()
+
+    print(f"volumes {VOLUMES}, concurrency {ARGS.concurrency}")
+    print(f"{'scenario':<24}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    results = asyncio.run(run_scenarios())
+
+    baselines = {}
+    if os.path.exists(ARGS.baseline):
+        with open(ARGS.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    key = config_key()
+
+    if ARGS.update_baseline or key not in baselines:
+        baselines[key] = {"recorded_at": datetime.utcnow().isoformat(), "results": results}
+        with open(ARGS.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline recorded in {ARGS.baseline}")
+        return
+
+    regressions = find_regressions(baselines[key]["results"], results, ARGS.threshold)
+    if regressions:
+        print(f"Regressions beyond {ARGS.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions beyond {ARGS.threshold:.0%} against the baseline from {baselines[key]['recorded_at']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Concurrent throughput benchmark: blocking (sync Session inside async def)
+vs. non-blocking (AsyncSession) member listing.
+
+Usage (from hairfit_server/):
+    python benchmarks/bench_async_db.py --requests 400 --concurrency 32 --db-latency-ms 2
+
+--db-latency-ms simulates a networked database by sleeping in the thread that
+executes each SQL statement: the event loop thread for the blocking variant,
+the driver's worker thread for the async variant.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="hairfit-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models, database, schemas, auth_utils as auth
+from main import app
+from utils import get_user_salon
+
+
+# Pre-change handler, kept here only as the "before" baseline
+@app.get("/bench/legacy-members", response_model=list[schemas.MemberResponse])
+async def legacy_get_members(
+    skip: int = 0,
+    limit: int = 50,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    salon = get_user_salon(current_user, db)
+    return db.query(models.Member).filter(models.Member.salon_id == salon.id)\
+        .order_by(models.Member.created_at.desc())\
+        .offset(skip).limit(limit).all()
+
+
+def install_latency(latency_s: float):
+    def trace(_statement):
+        time.sleep(latency_s)
+
+    @event.listens_for(database.engine, "connect")
+    def sync_connect(dbapi_connection, _record):
+        dbapi_connection.set_trace_callback(trace)
+
+    @event.listens_for(database.async_engine.sync_engine, "connect")
+    def async_connect(dbapi_connection, _record):
+        # aiosqlite adapter -> aiosqlite.Connection -> sqlite3.Connection
+        dbapi_connection._connection._conn.set_trace_callback(trace)
+
+
+def seed(members: int) -> str:
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    user = models.User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    salon = models.Salon(name="Bench Salon", owner_id=user.id)
+    db.add(salon)
+    db.commit()
+    base = datetime.utcnow()
+    db.bulk_insert_mappings(models.Member, [
+        {"id": f"m{i}", "salon_id": salon.id, "name": f"Member {i}", "phone": "010",
+         "created_at": base - timedelta(seconds=i)}
+        for i in range(members)
+    ])
+    db.commit()
+    db.close()
+    return auth.create_access_token({"sub": "bench@example.com"})
+
+
+async def run(path: str, token: str, total: int, concurrency: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    max_lag = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        lag_task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max_lag * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    token = seed(args.members)
+    if args.db_latency_ms > 0:
+        install_latency(args.db_latency_ms / 1000)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.members} members, simulated DB latency {args.db_latency_ms} ms")
+    print(f"{'variant':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'loop lag ms':>14}")
+    variants = [("before (sync Session)", "/bench/legacy-members"), ("after (AsyncSession)", "/members/")]
+
+    async def run_all():
+        # One event loop for every variant: the async engine's pool is bound to it
+        return [await run(path, token, args.requests, args.concurrency) for _, path in variants]
+
+    for (name, _), result in zip(variants, asyncio.run(run_all())):
+        print(f"{name:<22}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['max_loop_lag_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Import and startup time of the API, checked against a time budget.
+
+Usage (from hairfit_server/):
+    python benchmarks/bench_startup.py --runs 5 --import-budget 1.5 --ready-budget 5
+
+Each run starts a fresh interpreter: one to time `import main` (module import
+only), and one uvicorn server on a temporary SQLite database, timed from spawn
+until /health answers (liveness) and until /ready returns 200 (database,
+storage and style catalog ready). The median of the runs is compared with the
+budgets; exceeding either one makes the script exit with status 1. Model
+discovery runs in the background and is not part of the budget.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="hairfit-bench-startup-")
+ENV = dict(
+    os.environ,
+    DATABASE_URL=f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}",
+    SECRET_KEY=os.getenv("SECRET_KEY", "benchmark-secret"),
+    HAIRFIT_RUNTIME_DIR=os.path.join(WORK_DIR, "run"),
+)
+
+import httpx
+
+IMPORT_TIMER = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(f'IMPORT {time.perf_counter() - started:.6f}')"
+)
+
+
+def time_import() -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_TIMER], cwd=SERVER_DIR, env=ENV, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.rsplit("IMPORT ", 1)[1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, started: float, timeout: float = 60) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not become available")
+
+
+def time_server() -> tuple:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        live = wait_for(f"{base_url}/health", started)
+        ready = wait_for(f"{base_url}/ready", started)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds for `import main`")
+    parser.add_argument("--ready-budget", type=float, default=5.0, help="seconds from spawn to /ready 200")
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=SERVER_DIR, env=ENV, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    imports, lives, readies = [], [], []
+    for _ in range(args.runs):
+        imports.append(time_import())
+        live, ready = time_server()
+        lives.append(live)
+        readies.append(ready)
+
+    results = {
+        "import main": (statistics.median(imports), args.import_budget),
+        "spawn -> /health": (statistics.median(lives), None),
+        "spawn -> /ready": (statistics.median(readies), args.ready_budget),
+    }
+    print(f"{args.runs} runs, median seconds")
+    over_budget = []
+    for name, (seconds, budget) in results.items():
+        print(f"{name:<20}{seconds:>8.3f}" + (f"   budget {budget:.2f}" if budget else ""))
+        if budget and seconds > budget:
+            over_budget.append(name)
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
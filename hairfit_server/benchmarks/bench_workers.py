@@ -0,0 +1,164 @@
+"""
+Throughput of the production server (gunicorn.conf.py) at different worker counts.
+
+Usage (from hairfit_server/):
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --requests 400 --concurrency 32
+
+Each worker count gets a fresh gunicorn process tree on a temporary SQLite
+database. Scenarios cover a DB read (member list), the in-memory style catalog,
+a NumPy similarity query and bcrypt-bound login. Rate limiting is disabled so
+the numbers measure the server, not the limiter. Scaling stops at the number of
+CPU cores available to the machine running the benchmark.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="hairfit-bench-workers-")
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+
+EMAIL, PASSWORD = "bench@example.com", "benchmark-password"
+
+
+def seed(members: int):
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=SERVER_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    import models, database
+    from services import password_service
+
+    db = database.SessionLocal()
+    user = models.User(email=EMAIL, username="bench", hashed_password=password_service.hash_password_blocking(PASSWORD))
+    db.add(user)
+    db.commit()
+    salon = models.Salon(name="Bench Salon", owner_id=user.id)
+    db.add(salon)
+    db.commit()
+    base = datetime.utcnow()
+    db.bulk_insert_mappings(models.Member, [
+        {"id": f"m{i}", "salon_id": salon.id, "name": f"Member {i}", "phone": "010",
+         "created_at": base - timedelta(seconds=i)}
+        for i in range(members)
+    ])
+    db.commit()
+    db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+        RATE_LIMIT_ENABLED="false",
+        GUNICORN_ACCESS_LOG="",
+        HAIRFIT_RUNTIME_DIR=os.path.join(WORK_DIR, f"run-{workers}"),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def run(client: httpx.AsyncClient, request, total: int, concurrency: int):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await request(client)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def run_scenarios(base_url: str, total: int, concurrency: int, login_requests: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/login", json={"email": EMAIL, "password": PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        styles = (await client.get("/styles/", headers=headers)).json()["styles"]
+        style_id = styles[0]["id"] if styles else "style_1"
+
+        scenarios = [
+            ("GET /members/", lambda c: c.get("/members/?limit=50", headers=headers), total),
+            ("GET /styles/", lambda c: c.get("/styles/", headers=headers), total),
+            ("GET /styles/{id}/similar", lambda c: c.get(f"/styles/{style_id}/similar", headers=headers), total),
+            ("POST /login (bcrypt)", lambda c: c.post("/login", json={"email": EMAIL, "password": PASSWORD}),
+             login_requests),
+        ]
+        return [(name, await run(client, request, count, concurrency)) for name, request, count in scenarios]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--login-requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--members", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed(args.members)
+    print(f"{args.requests} requests ({args.login_requests} logins), concurrency {args.concurrency}, "
+          f"{args.members} members, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}  {'scenario':<26}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(workers, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_ready(base_url)
+            results = asyncio.run(run_scenarios(base_url, args.requests, args.concurrency, args.login_requests))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=90)
+        for name, result in results:
+            print(f"{workers:>8}  {name:<26}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+from typing import Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# 응답 압축 (Accept-Encoding 협상: br > gzip)
+# Brotli is used when the client accepts it and the brotli package is
+# installed. Bodies under COMPRESSION_MIN_SIZE, images and already-encoded
+# responses pass through; large bodies (base64 synthesis results) are
+# compressed in a worker thread so the event loop keeps serving.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+THREAD_MIN_SIZE = 128 * 1024
+
+def parse_accept_encoding(value: str) -> dict:
+    """{coding: q} from an Accept-Encoding header"""
+    codings = {}
+    for item in value.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        codings[name.strip()] = q
+    return codings
+
+def choose_encoding(accept_encoding: str, brotli_available: bool = None) -> Optional[str]:
+    """Best supported coding the client accepts; on equal q, brotli is preferred"""
+    if brotli_available is None:
+        brotli_available = brotli is not None
+    codings = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in (("br", "gzip") if brotli_available else ("gzip",)):
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = COMPRESSION_BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MIN_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.quality)
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression for responses of at least minimum_size bytes"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=COMPRESSION_GZIP_LEVEL,
+                                      thread_minimum_size=THREAD_MIN_SIZE)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -1,16 +1,232 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
-import os
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hairfit.db")
+import metrics
+
+# DATABASE_URL is preferred; SQLALCHEMY_DATABASE_URL is accepted for older compose files
+SQLALCHEMY_DATABASE_URL = (
+    os.getenv("DATABASE_URL")
+    or os.getenv("SQLALCHEMY_DATABASE_URL")
+    or "sqlite:///./hairfit.db"
+)
+if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+    SQLALCHEMY_DATABASE_URL = "postgresql://" + SQLALCHEMY_DATABASE_URL[len("postgres://"):]
+
+# Connection pool settings (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite connection pragmas
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def is_sqlite_memory(url: str) -> bool:
+    # Parsed so a rendered URL (":memory:" escaped as %3Amemory%3A) is still recognised
+    return is_sqlite(url) and (make_url(url).database in (None, "", ":memory:") or "mode=memory" in url)
+
+# Backend -> async driver, and drivers that are already async-capable
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "postgres": "asyncpg"}
+ASYNC_CAPABLE_DRIVERS = {"aiosqlite", "asyncpg", "psycopg", "psycopg_async"}
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver equivalent"""
+    parsed = make_url(url)
+    # Read the driver from the URL itself; get_driver_name() reports the dialect default when none is given
+    backend, _, driver = parsed.drivername.partition("+")
+    if backend not in ASYNC_DRIVERS or driver in ASYNC_CAPABLE_DRIVERS:
+        return url
+    dialect = "postgresql" if backend == "postgres" else backend
+    parsed = parsed.set(drivername=f"{dialect}+{ASYNC_DRIVERS[backend]}")
+    return parsed.render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+class PoolStats:
+    """Checkout counters and wait times for one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "idle": pool.checkedin(),
+            })
+        return data
+
+POOL_STATS = {"sync": PoolStats(), "async": PoolStats()}
+
+class _TimedPoolMixin:
+    """Records how long callers wait to check a connection out of the pool
+
+    stats and stats_name are bound per engine by _engine_options; unbound
+    pools time nothing.
+    """
+    stats = None
+    stats_name = None
+
+    def connect(self):
+        if self.stats is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            metrics.DB_CHECKOUT_TIMEOUTS.labels(self.stats_name).inc()
+            raise
+        wait_seconds = time.perf_counter() - start
+        self.stats.record_checkout(wait_seconds)
+        metrics.DB_CHECKOUT_WAIT.labels(self.stats_name).observe(wait_seconds)
+        return connection
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _engine_options(url: str, poolclass, stats: PoolStats = None, name: str = "sync") -> dict:
+    options = {}
+    if is_sqlite(url):
+        # check_same_thread=False is needed for SQLite in multi-threaded environments (like FastAPI)
+        options["connect_args"] = {"check_same_thread": False}
+    if not is_sqlite_memory(url):
+        if stats is not None and issubclass(poolclass, _TimedPoolMixin):
+            # A subclass rather than instance attributes so pool.recreate() (engine.dispose) keeps them
+            poolclass = type(poolclass.__name__, (poolclass,), {"stats": stats, "stats_name": name})
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection):
+    """WAL + relaxed fsync so readers don't block writers and commits stay cheap"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def configure_engine(sync_engine, url: str, stats: PoolStats, name: str = "sync"):
+    """Attach SQLite pragmas, pool statistics and query timing listeners to an engine"""
+    if is_sqlite(url):
+        @event.listens_for(sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.increment("checkins")
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+
+    # The start time lives on the execution context, which is discarded with the
+    # statement even when it raises (after_cursor_execute then never fires)
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        metrics.DB_QUERY_LATENCY.labels(name, metrics.sql_operation(statement)).observe(elapsed)
 
-# check_same_thread=False is needed for SQLite in multi-threaded environments (like FastAPI)
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL, TimedQueuePool, POOL_STATS["sync"])
 )
+configure_engine(engine, SQLALCHEMY_DATABASE_URL, POOL_STATS["sync"])
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by async def routes so DB round trips don't block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, TimedAsyncAdaptedQueuePool, POOL_STATS["async"], name="async"),
+)
+configure_engine(async_engine.sync_engine, ASYNC_DATABASE_URL, POOL_STATS["async"], name="async")
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def get_pool_stats() -> dict:
+    """Checkout/wait statistics for the sync and async connection pools"""
+    return {
+        "sync": POOL_STATS["sync"].snapshot(engine.pool),
+        "async": POOL_STATS["async"].snapshot(async_engine.sync_engine.pool),
+    }
+
+def reset_after_fork():
+    """Drop pooled connections inherited from the parent process (gunicorn --preload)"""
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
 Base = declarative_base()
 
 # Dependency to get DB session
@@ -20,3 +236,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session (for async def routes)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,45 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import os
 
-limiter = Limiter(key_func=get_remote_address)
+import auth_utils, metrics
+from rate_limit import TokenBucketLimiter, ClientIdentity, create_store, parse_networks
+
+# memory:// counts per process; use sqlite:///path (one host) or redis://host
+# (several hosts) so all workers share the same buckets
+RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL", "memory://")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Proxies whose X-Forwarded-For is believed (loopback and the Docker bridge range by default)
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", "127.0.0.1/32,::1/128,172.16.0.0/12"))
+
+# Shared per-salon API budget; heavier operations charge more tokens
+API_RATE_LIMIT = os.getenv("API_RATE_LIMIT", "600/minute")
+READ_COST = 1
+WRITE_COST = 2
+ROUTE_COSTS = {
+    "/synthesize": 30,
+    "/members/import": 60,
+    "/members/export": 20,
+    "/members/bulk-delete": 20,
+}
+FREE_PATHS = (
+    "/", "/health", "/health/db", "/health/storage", "/health/auth", "/health/synthesis", "/metrics", "/ready",
+)
+
+if RATE_LIMIT_STORAGE_URL.startswith("memory://") and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    print("Warning: RATE_LIMIT_STORAGE_URL=memory:// with several workers; each worker enforces its own limits")
+
+limiter = TokenBucketLimiter(
+    create_store(RATE_LIMIT_STORAGE_URL),
+    key_func=ClientIdentity(TRUSTED_PROXIES, auth_utils.SECRET_KEY, auth_utils.ALGORITHM),
+    enabled=RATE_LIMIT_ENABLED,
+)
+
+def _request_cost(request) -> int:
+    path = metrics.route_template(request.scope) or request.url.path
+    if path in FREE_PATHS:
+        return 0
+    if path in ROUTE_COSTS:
+        return ROUTE_COSTS[path]
+    return READ_COST if request.method in ("GET", "HEAD", "OPTIONS") else WRITE_COST
+
+# App-wide dependency charging the shared API budget
+api_rate_limit = limiter.dependency(API_RATE_LIMIT, scope="api", cost=_request_cost)
@@ -0,0 +1,70 @@
+"""Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+State split between workers:
+- Per process (rebuilt in every worker, may lag behind other workers):
+  principal cache (PRINCIPAL_CACHE_TTL_SECONDS), Google cert / access token
+  caches, DB connection pools, password hashing executor, synthesis admission
+  queue (SYNTHESIS_SERVER_CONCURRENCY split across workers), upload removal
+  queue (drained on shutdown).
+- Shared (files or the database, consistent across workers):
+  style catalog (assets/styles, reloaded when .catalog_version changes),
+  rate-limit buckets (RATE_LIMIT_STORAGE_URL; defaults to a SQLite file here),
+  Prometheus metrics (PROMETHEUS_MULTIPROC_DIR, merged by /metrics),
+  Gemini model list (cached in HAIRFIT_RUNTIME_DIR, listed by one worker),
+  refresh tokens, sync feed and members (database), maintenance loops (one
+  worker at a time via process_lock.run_exclusive).
+"""
+import multiprocessing
+import os
+
+import process_lock
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# CPU-bound work (image decoding, bcrypt) scales with processes, not threads
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers fork with modules already loaded
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+# Recycle workers periodically (jitter keeps them from restarting together)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+# Synthesis calls can take a while; graceful_timeout lets in-flight requests finish
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+
+# Per-process budgets: split the hashing threads across workers unless set explicitly
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // max(workers, 1))))
+# Gemini slots for the whole server; every worker admits and queues its share on its own
+synthesis_slots = int(os.getenv("SYNTHESIS_SERVER_CONCURRENCY", "8"))
+os.environ.setdefault("SYNTHESIS_MAX_CONCURRENCY", str(max(1, synthesis_slots // max(workers, 1))))
+# memory:// buckets would give every worker its own budget
+if workers > 1:
+    os.environ.setdefault("RATE_LIMIT_STORAGE_URL", f"sqlite:///{process_lock.runtime_path('ratelimit.db')}")
+# Workers write Prometheus samples here; must be set before prometheus_client is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(process_lock.runtime_path("metrics")))
+
+def on_starting(server):
+    # Samples from a previous run would be added to this run's totals
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+def post_fork(server, worker):
+    import database
+
+    database.reset_after_fork()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the exited worker's live gauges (in-flight requests)
+    multiprocess.mark_process_dead(worker.pid)
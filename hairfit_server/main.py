@@ -1,30 +1,32 @@
+import time
+_import_started = time.perf_counter()
+
 import os
-import google.generativeai as genai
+import asyncio
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 
 # Import internal modules
 from models import Base
-import models, database
-from dependencies import limiter
-from services import style_service
+import models, database, metrics, profiling, readiness
+from compression import CompressionMiddleware
+from serialization import FastJSONResponse
+from dependencies import api_rate_limit
+from process_lock import run_exclusive
+from services import style_service, popularity_service, token_service, storage_service, password_service, google_auth_service, gemini_service, admission_service, image_service, hedging_service
 
 # Import Routers
-from routers import auth, members, styles, synthesis, users, files
+from routers import auth, members, styles, synthesis, users, files, sync
 
 load_dotenv()
 
-# Initialize DB tables
-models.Base.metadata.create_all(bind=database.engine)
-
-app = FastAPI(title="HairFit API")
+# DB schema is managed by Alembic migrations; run `alembic upgrade head` before starting
 
-# Setup Rate Limiter
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Every request draws from its salon's (or client IP's) token bucket; see dependencies.py
+# orjson-encoded JSON for every route; see serialization.py
+app = FastAPI(title="HairFit API", dependencies=[Depends(api_rate_limit)], default_response_class=FastJSONResponse)
 
 # CORS Config
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -36,13 +38,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Estimated", "Retry-After", "X-Profile-Id", "X-Queue-Wait-Ms"],
     max_age=600,
 )
 
-# Gemini API Setup
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Compress JSON bodies (sync pages, member lists, synthesis results) for slow salon Wi-Fi
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); see profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Optional bearer token for Prometheus scrapes (/metrics is reachable through the public proxy)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 # Include Routers
 app.include_router(auth.router, tags=["Auth"])
@@ -51,31 +61,95 @@ app.include_router(styles.router, prefix="/styles", tags=["Styles"])
 app.include_router(synthesis.router, tags=["Synthesis"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(files.router, tags=["Files"])
+app.include_router(sync.router, tags=["Sync"])
+
+readiness.STARTUP["import_seconds"] = round(time.perf_counter() - _import_started, 3)
 
 @app.on_event("startup")
 async def startup_event():
     print("Server starting up...")
+    started = time.perf_counter()
+
+    # Load style metadata, images and the similarity index
+    style_service.load_catalog()
+
+    # Maintenance loops run in one worker at a time (see process_lock.run_exclusive)
+    # Periodically reconcile the materialized style popularity counters
+    app.state.popularity_reconciler = asyncio.create_task(
+        run_exclusive("popularity-reconciler", popularity_service.run_reconciler)
+    )
+    # Periodically delete expired and revoked refresh tokens
+    app.state.token_sweeper = asyncio.create_task(
+        run_exclusive("token-sweeper", token_service.run_token_sweeper)
+    )
+    # Remove synthesis results that were never saved to a history
+    app.state.result_sweeper = asyncio.create_task(
+        run_exclusive("result-sweeper", image_service.run_result_sweeper)
+    )
 
-    # Load metadata first
-    style_service.load_style_metadata()
-    # Then load images and sync
-    style_service.load_style_images()
-
-    if GEMINI_API_KEY:
-        print("Listing available models...")
-        try:
-            for m in genai.list_models():
-                if 'generateContent' in m.supported_generation_methods:
-                    print(f"Found model: {m.name}")
-        except Exception as e:
-            print(f"Error listing models: {e}")
+    # The Gemini client is imported and its models listed in the background; /ready reports progress
+    if gemini_service.GEMINI_API_KEY and gemini_service.MODEL_DISCOVERY_ENABLED:
+        app.state.model_discovery = asyncio.create_task(gemini_service.run_model_discovery())
     else:
         print("GEMINI_API_KEY is not set.")
 
+    readiness.STARTUP["startup_seconds"] = round(time.perf_counter() - started, 3)
+    print(f"Startup finished in {readiness.STARTUP['startup_seconds']}s "
+          f"(imports {readiness.STARTUP['import_seconds']}s)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    names = ("popularity_reconciler", "token_sweeper", "result_sweeper", "model_discovery")
+    tasks = [getattr(app.state, name, None) for name in names]
+    tasks = [task for task in tasks if task]
+    for task in tasks:
+        task.cancel()
+    # Let the loops release their leader locks before the worker exits
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Finish queued upload removals; the queue is per process and would be lost on recycle
+    await asyncio.to_thread(storage_service.wait_for_removals)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to HairFit API"}
 
 @app.get("/health")
 def health_check():
+    """Liveness: the process is up and serving; dependencies are checked by /ready"""
     return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness_check(response: Response, db: AsyncSession = Depends(database.get_async_db)):
+    """Readiness per dependency (database, storage, catalog, model client); 503 until the required ones are up"""
+    ready, checks = await readiness.check_all(db)
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "not_ready", "checks": checks, "startup": readiness.STARTUP}
+
+@app.get("/health/db")
+def database_health():
+    """Connection pool checkout/wait statistics"""
+    return {"pools": database.get_pool_stats()}
+
+@app.get("/health/auth")
+def auth_health():
+    """Password hashing executor stats and Google verification cache stats"""
+    return {**password_service.get_stats(), "google": google_auth_service.get_stats()}
+
+@app.get("/health/storage")
+def storage_health():
+    """Member deletion latency, upload file reclamation and result encoding counters"""
+    return {**storage_service.get_storage_stats(), "result_encoding": image_service.get_stats()}
+
+@app.get("/health/synthesis")
+def synthesis_health():
+    """Synthesis admission (slots, queue depth, per-salon waits) and model tier hedging (this worker)"""
+    return {**admission_service.get_stats(), "models": hedging_service.get_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint, aggregated over all worker processes"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
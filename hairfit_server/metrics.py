@@ -0,0 +1,173 @@
+import os
+import re
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+
+# Prometheus 메트릭 (/metrics)
+# Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+# (set in gunicorn.conf.py before this module is imported) and /metrics merges
+# them, so any worker can answer a scrape with totals for the whole server.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+GEMINI_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2.5, 5)
+BYTE_BUCKETS = (16_384, 65_536, 262_144, 1_048_576, 2_097_152, 4_194_304, 8_388_608, 16_777_216)
+
+HTTP_REQUESTS = Counter(
+    "hairfit_http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "hairfit_http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "hairfit_http_requests_in_flight", "HTTP requests being handled", ["method"], multiprocess_mode="livesum"
+)
+
+GEMINI_LATENCY = Histogram(
+    "hairfit_gemini_request_duration_seconds", "Gemini generate_content latency", ["model", "outcome"],
+    buckets=GEMINI_BUCKETS,
+)
+GEMINI_BYTES = Histogram(
+    "hairfit_gemini_payload_bytes", "Image bytes sent to / received from Gemini", ["model", "direction"],
+    buckets=BYTE_BUCKETS,
+)
+GEMINI_FINISH_REASONS = Counter(
+    "hairfit_gemini_finish_reasons_total", "Finish reason of the first Gemini candidate", ["model", "finish_reason"]
+)
+
+DB_CHECKOUT_WAIT = Histogram(
+    "hairfit_db_pool_checkout_seconds", "Time spent waiting for a pooled DB connection", ["pool"],
+    buckets=QUERY_BUCKETS,
+)
+DB_CHECKOUT_TIMEOUTS = Counter("hairfit_db_pool_timeouts_total", "Pool checkouts that timed out", ["pool"])
+DB_QUERY_LATENCY = Histogram(
+    "hairfit_db_query_duration_seconds", "SQL statement execution time", ["pool", "operation"],
+    buckets=QUERY_BUCKETS,
+)
+
+SYNTHESIS_QUEUE_WAIT = Histogram(
+    "hairfit_synthesis_queue_wait_seconds", "Time synthesis requests waited for admission, by salon weight",
+    ["weight"], buckets=(0, 0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60),
+)
+SYNTHESIS_REJECTIONS = Counter("hairfit_synthesis_rejections_total", "Synthesis requests turned away", ["reason"])
+SYNTHESIS_RUNNING = Gauge(
+    "hairfit_synthesis_running", "Synthesis requests holding a slot", multiprocess_mode="livesum"
+)
+SYNTHESIS_QUEUED = Gauge(
+    "hairfit_synthesis_queued", "Synthesis requests waiting for a slot", multiprocess_mode="livesum"
+)
+SYNTHESIS_MODEL_SERVED = Counter(
+    "hairfit_synthesis_model_served_total", "Synthesis requests by the model tier that answered", ["model", "tier"]
+)
+SYNTHESIS_HEDGES = Counter(
+    "hairfit_synthesis_hedges_total", "Calls sent to a later model tier (hedge, switch or failover)",
+    ["model", "reason"],
+)
+SYNTHESIS_DEADLINE_EXCEEDED = Counter(
+    "hairfit_synthesis_deadline_exceeded_total", "Synthesis requests no model answered within their deadline"
+)
+
+RESULT_ENCODE_LATENCY = Histogram(
+    "hairfit_result_encode_seconds", "Time to transcode a synthesis result into both size classes", ["format"],
+    buckets=LATENCY_BUCKETS,
+)
+RESULT_IMAGE_BYTES = Histogram(
+    "hairfit_result_image_bytes", "Synthesis result size as returned by the model and as stored", ["size_class"],
+    buckets=BYTE_BUCKETS,
+)
+
+PASSWORD_HASH_LATENCY = Histogram(
+    "hairfit_password_hash_duration_seconds", "bcrypt hash / verify time on the hashing executor", ["operation"],
+    buckets=HASH_BUCKETS,
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "hairfit_password_hash_pending", "Password hash jobs queued or running on the hashing executor",
+    multiprocess_mode="livesum",
+)
+
+UPLOAD_BYTES = Histogram("hairfit_upload_bytes", "Size of uploaded files", ["kind"], buckets=BYTE_BUCKETS)
+
+CACHE_REQUESTS = Counter("hairfit_cache_requests_total", "Cache lookups", ["cache", "result"])
+
+PATH_PARAM = re.compile(r"{(\w+)(?::\w+)?}")
+
+def route_template(scope) -> Optional[str]:
+    """Full route template of a matched request, e.g. /members/{member_id}.
+
+    Routes of an included router only know their own path (/{member_id}); the
+    router prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return None
+    params = scope.get("path_params", {})
+    concrete = PATH_PARAM.sub(lambda match: str(params.get(match.group(1), match.group(0))), template)
+    path = scope.get("path", "")
+    if concrete and path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + template
+    return template
+
+def route_label(scope) -> str:
+    """Route template label, so paths with ids share one series"""
+    return route_template(scope) or UNMATCHED_ROUTE
+
+def sql_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def record_upload(kind: str, size: int):
+    UPLOAD_BYTES.labels(kind).observe(size)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = route_label(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+def render() -> tuple:
+    """(body, content type) for a scrape, merged across workers when running multi-process"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,63 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+import database
+import models  # noqa: F401  (registers tables on Base.metadata)
+from services import search_service
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = database.Base.metadata
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The member search table (and FTS5 shadow tables) is managed by hand
+    if type_ == "table" and name and name.startswith(search_service.SEARCH_TABLE):
+        return False
+    return True
+
+def _database_url():
+    return config.get_main_option("sqlalchemy.url") or database.SQLALCHEMY_DATABASE_URL
+
+def run_migrations_offline():
+    url = _database_url()
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        render_as_batch=database.is_sqlite(url),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # Tests pass an open connection through config.attributes
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    url = _database_url()
+    connectable = create_engine(url)
+    with connectable.connect() as connection:
+        _run_with_connection(connection)
+    connectable.dispose()
+
+def _run_with_connection(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
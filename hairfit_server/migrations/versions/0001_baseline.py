@@ -0,0 +1,122 @@
+"""Baseline schema (tables previously created by Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Existing databases were created with create_all at import time, so each
+table is only created when it is missing; upgrading such a database simply
+records this revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String()),
+            sa.Column("username", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "refresh_tokens" not in existing:
+        op.create_table(
+            "refresh_tokens",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("token", sa.String(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("revoked", sa.Boolean()),
+        )
+        op.create_index("ix_refresh_tokens_id", "refresh_tokens", ["id"])
+        op.create_index("ix_refresh_tokens_token", "refresh_tokens", ["token"], unique=True)
+
+    if "salons" not in existing:
+        op.create_table(
+            "salons",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_salons_id", "salons", ["id"])
+
+    if "members" not in existing:
+        op.create_table(
+            "members",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("salon_id", sa.Integer(), sa.ForeignKey("salons.id")),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("phone", sa.String(), nullable=False),
+            sa.Column("memo", sa.String()),
+            sa.Column("photo_path", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+
+    if "synthesis_history" not in existing:
+        op.create_table(
+            "synthesis_history",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("member_id", sa.String(), sa.ForeignKey("members.id")),
+            sa.Column("original_photo_path", sa.String(), nullable=False),
+            sa.Column("reference_style_id", sa.String(), nullable=False),
+            sa.Column("result_photo_path", sa.String()),
+            sa.Column("is_synced", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    if "style_usage_counters" not in existing:
+        op.create_table(
+            "style_usage_counters",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("salon_id", sa.Integer(), nullable=False),
+            sa.Column("style_id", sa.String(), nullable=False),
+            sa.Column("total_count", sa.Integer(), nullable=False),
+            sa.Column("count_7d", sa.Integer(), nullable=False),
+            sa.Column("count_30d", sa.Integer(), nullable=False),
+            sa.Column("last_used_at", sa.DateTime(timezone=True)),
+            sa.UniqueConstraint("salon_id", "style_id", name="uq_style_usage_counter"),
+        )
+        op.create_index("ix_style_usage_counters_id", "style_usage_counters", ["id"])
+
+    if "style_usage_daily" not in existing:
+        op.create_table(
+            "style_usage_daily",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("salon_id", sa.Integer(), nullable=False),
+            sa.Column("style_id", sa.String(), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.UniqueConstraint("salon_id", "style_id", "day", name="uq_style_usage_daily"),
+        )
+        op.create_index("ix_style_usage_daily_id", "style_usage_daily", ["id"])
+        op.create_index("ix_style_usage_daily_day", "style_usage_daily", ["day"])
+
+
+def downgrade():
+    for table in (
+        "style_usage_daily",
+        "style_usage_counters",
+        "synthesis_history",
+        "members",
+        "salons",
+        "refresh_tokens",
+        "users",
+    ):
+        op.drop_table(table)
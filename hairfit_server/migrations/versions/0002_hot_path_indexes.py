@@ -0,0 +1,41 @@
+"""Composite indexes for the hot member, history and refresh-token queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+On Postgres the indexes are built CONCURRENTLY (outside the migration
+transaction) so the tables stay writable while they build.
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # get_members: WHERE salon_id = ? ORDER BY created_at DESC
+    ("ix_members_salon_created", "members", ["salon_id", "created_at"]),
+    # synthesis history: WHERE member_id = ? ORDER BY created_at DESC
+    ("ix_synthesis_history_member_created", "synthesis_history", ["member_id", "created_at"]),
+    # refresh token lookup/cleanup per user and global expiry sweep
+    ("ix_refresh_tokens_user_expires", "refresh_tokens", ["user_id", "expires_at"]),
+    ("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,29 @@
+"""Index synthesis_history.created_at for salon-wide keyset pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+The unfiltered history listing walks rows newest first and stops after one
+page; without this index it has to sort the whole table.
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_synthesis_history_created", "synthesis_history", ["created_at"],
+                            if_not_exists=True, postgresql_concurrently=True)
+    else:
+        op.create_index("ix_synthesis_history_created", "synthesis_history", ["created_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_synthesis_history_created", table_name="synthesis_history", if_exists=True)
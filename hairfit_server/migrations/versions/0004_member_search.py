@@ -0,0 +1,30 @@
+"""Member search index (SQLite FTS5 trigram / Postgres pg_trgm)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+The search table is not an ORM model (it is an FTS5 virtual table on
+SQLite), so its DDL lives in services.search_service and is excluded from
+autogenerate. Existing members are backfilled here.
+"""
+from alembic import op
+from sqlalchemy.orm import Session
+
+from services import search_service
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    search_service.create_search_table(bind)
+    search_service.rebuild_search_index(Session(bind=bind))
+
+
+def downgrade():
+    search_service.drop_search_table(op.get_bind())
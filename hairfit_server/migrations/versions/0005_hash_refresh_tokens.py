@@ -0,0 +1,51 @@
+"""Store refresh tokens as SHA-256 hashes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+Existing plaintext tokens are hashed in place so signed-in clients keep
+working. Databases created by create_all with the current models already
+have token_hash and are left alone.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("refresh_tokens")}
+    if "token_hash" in columns:
+        return
+
+    op.add_column("refresh_tokens", sa.Column("token_hash", sa.String(64), nullable=True))
+    rows = bind.execute(sa.text("SELECT id, token FROM refresh_tokens")).fetchall()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE refresh_tokens SET token_hash = :token_hash WHERE id = :id"),
+            [{"id": row.id, "token_hash": hashlib.sha256(row.token.encode("utf-8")).hexdigest()} for row in rows],
+        )
+
+    op.drop_index("ix_refresh_tokens_token", table_name="refresh_tokens")
+    with op.batch_alter_table("refresh_tokens") as batch:
+        batch.drop_column("token")
+        batch.alter_column("token_hash", existing_type=sa.String(64), nullable=False)
+    op.create_index("ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True)
+
+
+def downgrade():
+    # Plaintext tokens cannot be recovered; every session has to sign in again
+    op.execute("DELETE FROM refresh_tokens")
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    with op.batch_alter_table("refresh_tokens") as batch:
+        batch.drop_column("token_hash")
+        batch.add_column(sa.Column("token", sa.String(), nullable=False))
+    op.create_index("ix_refresh_tokens_token", "refresh_tokens", ["token"], unique=True)
@@ -0,0 +1,53 @@
+"""Change feed table for delta sync
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Existing members and their history are backfilled as upserts so a client's
+first sync (since=0) sees everything. History rows without a member have
+no salon and are not backfilled.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "sync_changes" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "sync_changes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("salon_id", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_sync_changes_salon_id", "sync_changes", ["salon_id", "id"])
+    op.create_index("ix_sync_changes_entity", "sync_changes", ["entity", "entity_id"])
+
+    op.execute(
+        "INSERT INTO sync_changes (salon_id, entity, entity_id, op, changed_at) "
+        "SELECT salon_id, 'member', id, 'upsert', COALESCE(updated_at, created_at) "
+        "FROM members WHERE salon_id IS NOT NULL ORDER BY created_at, id"
+    )
+    op.execute(
+        "INSERT INTO sync_changes (salon_id, entity, entity_id, op, changed_at) "
+        "SELECT m.salon_id, 'history', h.id, 'upsert', h.created_at "
+        "FROM synthesis_history h JOIN members m ON m.id = h.member_id "
+        "WHERE m.salon_id IS NOT NULL ORDER BY h.created_at, h.id"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_sync_changes_entity", table_name="sync_changes")
+    op.drop_index("ix_sync_changes_salon_id", table_name="sync_changes")
+    op.drop_table("sync_changes")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -17,11 +17,15 @@ class User(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_expires", "user_id", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
+    # SHA-256 hex digest; the raw token is only ever returned to the client
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     revoked = Column(Boolean, default=False)
 
@@ -40,6 +44,9 @@ class Salon(Base):
 
 class Member(Base):
     __tablename__ = "members"
+    __table_args__ = (
+        Index("ix_members_salon_created", "salon_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True)
     salon_id = Column(Integer, ForeignKey("salons.id"))
@@ -55,6 +62,10 @@ class Member(Base):
 
 class SynthesisHistory(Base):
     __tablename__ = "synthesis_history"
+    __table_args__ = (
+        Index("ix_synthesis_history_member_created", "member_id", "created_at"),
+        Index("ix_synthesis_history_created", "created_at"),
+    )
 
     id = Column(String, primary_key=True)
     member_id = Column(String, ForeignKey("members.id"), nullable=True)
@@ -65,3 +76,46 @@ class SynthesisHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     member = relationship("Member", back_populates="synthesis_history")
+
+class StyleUsageCounter(Base):
+    """Materialized style usage counts; salon_id 0 holds the global counters."""
+    __tablename__ = "style_usage_counters"
+    __table_args__ = (UniqueConstraint("salon_id", "style_id", name="uq_style_usage_counter"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    salon_id = Column(Integer, nullable=False, default=0)
+    style_id = Column(String, nullable=False)
+    total_count = Column(Integer, nullable=False, default=0)
+    count_7d = Column(Integer, nullable=False, default=0)
+    count_30d = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+
+class StyleUsageDaily(Base):
+    """Per-day usage buckets backing the rolling 7/30-day windows."""
+    __tablename__ = "style_usage_daily"
+    __table_args__ = (UniqueConstraint("salon_id", "style_id", "day", name="uq_style_usage_daily"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    salon_id = Column(Integer, nullable=False, default=0)
+    style_id = Column(String, nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class SyncChange(Base):
+    """Change feed for delta sync: the latest upsert or delete (tombstone) per entity.
+
+    The autoincrement id is the sync cursor; recording a change replaces the
+    entity's previous row, so the feed holds one row per entity.
+    """
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        Index("ix_sync_changes_salon_id", "salon_id", "id"),
+        Index("ix_sync_changes_entity", "entity", "entity_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    salon_id = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # "member" | "history"
+    entity_id = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # "upsert" | "delete"
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
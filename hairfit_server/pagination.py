@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Keyset (cursor) pagination on (created_at DESC, id DESC)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COUNT_ESTIMATE_CAP = 10000
+
+CountMode = Literal["none", "exact", "estimate"]
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque cursor pointing just after the given row"""
+    payload = json.dumps({"c": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["c"]), str(payload["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_keyset(query, created_column, id_column, cursor: Optional[str]):
+    """Order newest first and, if a cursor is given, continue after it.
+
+    `created_at <= c` is kept as a separate conjunct so the database can use
+    it as an index range; the OR only breaks ties between equal timestamps.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(and_(
+            created_column <= created_at,
+            or_(created_column < created_at, id_column < row_id)
+        ))
+    return query.order_by(created_column.desc(), id_column.desc())
+
+async def fetch_page(db: AsyncSession, query, limit: int):
+    """Fetch one page (limit + 1 probe row); returns (rows, next_cursor)"""
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+async def count_rows(db: AsyncSession, query, mode: CountMode):
+    """Return (total, estimated) for an unordered query, or (None, False) when mode is none.
+
+    estimate counts at most COUNT_ESTIMATE_CAP + 1 rows, so it stays cheap on
+    huge result sets and reports the cap as a lower bound.
+    """
+    if mode == "none":
+        return None, False
+    query = query.order_by(None)
+    if mode == "estimate":
+        query = query.limit(COUNT_ESTIMATE_CAP + 1)
+    total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
+    if mode == "estimate" and total > COUNT_ESTIMATE_CAP:
+        return COUNT_ESTIMATE_CAP, True
+    return total, False
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: Optional[int] = None, estimated: bool = False):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+        if estimated:
+            response.headers["X-Total-Count-Estimated"] = "true"
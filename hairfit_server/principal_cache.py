@@ -0,0 +1,72 @@
+import os
+from typing import Optional
+
+from sqlalchemy import event
+
+import models
+from cache import TTLCache
+
+# 인증 주체(사용자 + 살롱) 캐시: 요청마다 users/salons 조회를 생략하기 위함
+# Entries are per process; the TTL bounds how long another worker can serve a
+# stale principal after a change it did not see.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+PRINCIPAL_CACHE = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS, name="principal")
+
+USER_FIELDS = ("id", "email", "username", "created_at")
+SALON_FIELDS = ("id", "name", "owner_id", "created_at")
+
+def _snapshot(instance, fields) -> dict:
+    return {field: getattr(instance, field) for field in fields}
+
+def get_user(user_id: int, email: str) -> Optional[models.User]:
+    """Return a detached User rebuilt from the cache, or None on a miss.
+
+    A fresh instance is built per call so requests never share ORM objects;
+    it only carries the columns in USER_FIELDS.
+    """
+    entry = PRINCIPAL_CACHE.get(user_id)
+    if entry is None or entry["user"]["email"] != email:
+        return None
+    return models.User(**entry["user"])
+
+def set_user(user: models.User, salon_id: Optional[int] = None):
+    entry = PRINCIPAL_CACHE.get(user.id)
+    salon = entry["salon"] if entry and entry["user"]["email"] == user.email else None
+    if salon is None and salon_id is not None:
+        # Salon id claimed by our own signed access token
+        salon = {"id": salon_id, "name": None, "owner_id": user.id, "created_at": None}
+    PRINCIPAL_CACHE.set(user.id, {"user": _snapshot(user, USER_FIELDS), "salon": salon})
+
+def get_salon(user_id: int) -> Optional[models.Salon]:
+    entry = PRINCIPAL_CACHE.get(user_id)
+    if entry is None or entry["salon"] is None:
+        return None
+    return models.Salon(**entry["salon"])
+
+def set_salon(user: models.User, salon: models.Salon):
+    entry = PRINCIPAL_CACHE.get(user.id)
+    if entry is None:
+        entry = {"user": _snapshot(user, USER_FIELDS), "salon": None}
+    PRINCIPAL_CACHE.set(user.id, {"user": entry["user"], "salon": _snapshot(salon, SALON_FIELDS)})
+
+def invalidate(user_id: Optional[int]):
+    if user_id is not None:
+        PRINCIPAL_CACHE.pop(user_id)
+
+def clear():
+    PRINCIPAL_CACHE.clear()
+
+# Invalidate on any ORM-level change to a user or salon. Bulk query.update()/
+# query.delete() bypass these hooks and must call invalidate() themselves.
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate(target.id)
+
+@event.listens_for(models.Salon, "after_insert")
+@event.listens_for(models.Salon, "after_update")
+@event.listens_for(models.Salon, "after_delete")
+def _salon_changed(mapper, connection, target):
+    invalidate(target.owner_id)
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process only
+    fcntl = None
+
+# 워커 프로세스 간 파일 잠금 (gunicorn 멀티 워커용)
+# Locks are advisory flock()s on files in RUNTIME_DIR, so they only coordinate
+# processes on the same host; the kernel releases them when a worker exits.
+RUNTIME_DIR = Path(os.getenv("HAIRFIT_RUNTIME_DIR", os.path.join(tempfile.gettempdir(), "hairfit")))
+
+def runtime_path(name: str) -> Path:
+    RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+    return RUNTIME_DIR / name
+
+class ProcessLock:
+    """Exclusive lock shared by threads of this process and by other processes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            handle.close()
+            self._thread_lock.release()
+            return False
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+async def run_exclusive(name: str, loop_factory):
+    """Run a background loop in only one worker at a time.
+
+    The other workers wait on the lock and take over when the holder exits
+    (for example when gunicorn recycles it after max_requests).
+    """
+    lock = ProcessLock(runtime_path(f"{name}.lock"))
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(LEADER_RETRY_SECONDS)
+    try:
+        await loop_factory()
+    finally:
+        lock.release()
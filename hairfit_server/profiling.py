@@ -0,0 +1,190 @@
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+
+import metrics
+import process_lock
+
+# 요청 단위 샘플링 프로파일러 (opt-in)
+# A profiled request gets a sampler thread that snapshots every thread's stack
+# each PROFILE_INTERVAL_MS (sys._current_frames). Stacks are written in the
+# collapsed "a;b;c count" format read by flamegraph.pl, speedscope and
+# inferno, next to a JSON summary, in a directory that keeps the newest
+# PROFILE_MAX_FILES profiles. Requests running concurrently in the same worker
+# show up in the same profile. With no token and a zero sample rate the
+# middleware is a single branch per request.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(process_lock.RUNTIME_DIR / "profiles")))
+PROFILE_HEADER = b"x-profile"
+
+# Time attributed to libraries, matched against frame file paths
+COMPONENTS = {
+    "sqlalchemy": ("/sqlalchemy/", "/aiosqlite/", "/asyncpg/", "/sqlite3/", "/psycopg2/"),
+    "pil": ("/PIL/",),
+    "gemini": ("/google/generativeai/", "/google/ai/", "/google/api_core/", "/grpc/"),
+    "bcrypt": ("/bcrypt/", "/services/password_service.py"),
+    "numpy": ("/numpy/",),
+}
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# One profile per process at a time keeps the overhead bounded
+_active = threading.Lock()
+
+def _frame_name(frame) -> str:
+    filename = frame.f_code.co_filename.replace("\\", "/")
+    for root in ("site-packages/", "hairfit_server/"):
+        if root in filename:
+            filename = filename.rsplit(root, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f"{frame.f_code.co_name} ({filename})"
+
+def _is_idle(frame) -> bool:
+    filename = os.path.basename(frame.f_code.co_filename)
+    return (filename, frame.f_code.co_name) in IDLE_FRAMES
+
+class RequestProfiler(threading.Thread):
+    """Samples all busy threads while one request is being handled"""
+
+    def __init__(self, method: str, path: str, interval: float = None):
+        super().__init__(name="request-profiler", daemon=True)
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.interval = interval or PROFILE_INTERVAL_SECONDS
+        self.stacks = Counter()
+        self.components = Counter()
+        self.ticks = 0
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._started_at = time.perf_counter()
+
+    def run(self):
+        deadline = self._started_at + PROFILE_MAX_SECONDS
+        while not self._stop_event.wait(self.interval) and time.perf_counter() < deadline:
+            self._sample()
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.ticks += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident or _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            files = [f.f_code.co_filename.replace("\\", "/") for f in stack]
+            for component, markers in COMPONENTS.items():
+                if any(marker in filename for filename in files for marker in markers):
+                    self.components[component] += 1
+            key = ";".join([names.get(ident, str(ident))] + [_frame_name(f) for f in reversed(stack)])
+            self.stacks[key] += 1
+            self.samples += 1
+
+    def finish(self, route: str, status: int):
+        """Stop sampling and write the profile; runs off the event loop"""
+        duration = time.perf_counter() - self._started_at
+        self._stop_event.set()
+        self.join()
+        try:
+            self._write(route, status, duration)
+        except OSError as e:
+            print(f"Error writing profile {self.profile_id}: {e}")
+        finally:
+            _active.release()
+
+    def _write(self, route: str, status: int, duration: float):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.profile_id}"
+        with open(f"{stem}.folded", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        summary = {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "components": {
+                component: {
+                    "samples": self.components[component],
+                    "share": round(self.components[component] / self.samples, 4) if self.samples else 0.0,
+                }
+                for component in COMPONENTS
+            },
+        }
+        with open(f"{stem}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        prune_profiles()
+
+def prune_profiles(max_files: int = None):
+    """Keep only the newest max_files profiles (each is a .folded + .json pair)"""
+    max_files = PROFILE_MAX_FILES if max_files is None else max_files
+    summaries = sorted(PROFILE_DIR.glob("*.json"), key=lambda path: (path.stat().st_mtime_ns, path.name))
+    for summary in summaries[:max(len(summaries) - max_files, 0)]:
+        summary.with_suffix(".folded").unlink(missing_ok=True)
+        summary.unlink(missing_ok=True)
+
+def _requested(scope) -> bool:
+    if PROFILE_TOKEN:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, PROFILE_TOKEN.encode())
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class ProfilingMiddleware:
+    """Profiles requests carrying `X-Profile: <PROFILE_TOKEN>` or a PROFILE_SAMPLE_RATE share of them"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0) or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(scope["method"], scope["path"])
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profiler.profile_id)
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await asyncio.to_thread(profiler.finish, metrics.route_label(scope), status)
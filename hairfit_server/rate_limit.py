@@ -0,0 +1,311 @@
+import asyncio
+import functools
+import inspect
+import ipaddress
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Union
+
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+
+# 토큰 버킷 rate limiter (공유 저장소: memory / sqlite / redis)
+# Buckets are keyed by salon (or user) for authenticated requests and by the
+# real client IP, taken from X-Forwarded-For set by trusted proxies, otherwise.
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rate(rate: str):
+    """"10/hour" -> (capacity 10, refill of 10 tokens per 3600 seconds)"""
+    amount, _, period = rate.partition("/")
+    period = period.strip().rstrip("s")
+    if period not in PERIODS:
+        raise ValueError(f"Unknown rate period: {rate}")
+    capacity = float(amount)
+    return capacity, capacity / PERIODS[period]
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, rate: str, retry_after: float, limit: float):
+        super().__init__(
+            status_code=429,
+            detail=f"Rate limit exceeded: {rate}",
+            headers={
+                "Retry-After": str(max(1, math.ceil(retry_after))),
+                "X-RateLimit-Limit": str(int(limit)),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
+
+class MemoryBucketStore:
+    """Per-process buckets; use the sqlite or redis store when running several workers"""
+    MAX_KEYS = 100000
+    # take() never does I/O, so async callers skip the thread hop
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float, now: float):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Least recently used buckets are the most likely to have refilled
+            while len(self._buckets) > self.MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file shared by all worker processes on one host"""
+    PRUNE_PROBABILITY = 0.001
+    PRUNE_AFTER_SECONDS = 86400
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        # A connection inherited through fork (gunicorn --preload) must not be reused
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float, now: float):
+        connection = self._connect()
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            if random.random() < self.PRUNE_PROBABILITY:
+                connection.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.PRUNE_AFTER_SECONDS,)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+    def clear(self):
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+
+class RedisBucketStore:
+    """Buckets in Redis (or any server speaking its protocol and Lua scripting)"""
+
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill_rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str, prefix: str = "hairfit:ratelimit:"):
+        import redis  # optional dependency, only needed for redis:// storage
+
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float, now: float):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, refill_rate, cost, now])
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+def create_store(url: str):
+    if url.startswith("sqlite:///"):
+        return SQLiteBucketStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBucketStore(url)
+    if url.startswith("memory://"):
+        return MemoryBucketStore()
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL: {url}")
+
+def parse_networks(value: str):
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+class ClientIdentity:
+    """Resolves the rate-limit identity of a request"""
+
+    def __init__(self, trusted_proxies, secret_key: Optional[str], algorithm: str):
+        self.trusted_proxies = trusted_proxies
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        """Rightmost X-Forwarded-For address not added by one of our trusted proxies"""
+        peer = request.client.host if request.client else "unknown"
+        if not self._is_trusted(peer):
+            return peer
+        forwarded = [
+            address.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for address in header.split(",")
+            if address.strip()
+        ]
+        for address in reversed(forwarded):
+            if not self._is_trusted(address):
+                return address
+        return forwarded[0] if forwarded else peer
+
+    def __call__(self, request: Request) -> str:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer ") and self.secret_key:
+            try:
+                # Signature check only; the route's own auth dependency still validates the user
+                payload = jwt.decode(authorization[7:], self.secret_key, algorithms=[self.algorithm])
+            except JWTError:
+                payload = None
+            if payload:
+                if payload.get("sid") is not None:
+                    return f"salon:{payload['sid']}"
+                if payload.get("uid") is not None:
+                    return f"user:{payload['uid']}"
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}"
+        return f"ip:{self.client_ip(request)}"
+
+Cost = Union[int, float, Callable[[Request], float]]
+
+class TokenBucketLimiter:
+    # Seconds between repeated "store unavailable" warnings
+    STORE_WARNING_INTERVAL = 60
+
+    def __init__(self, store, key_func: Callable[[Request], str], enabled: bool = True):
+        self.store = store
+        self.key_func = key_func
+        self.enabled = enabled
+        self.store_errors = 0
+        self._last_warning = 0.0
+
+    def _charge(self, request: Request, rate: str, scope: str, cost: Cost):
+        """(key, capacity, refill_rate, cost) to take from the store, or None when nothing is charged"""
+        if not self.enabled:
+            return None
+        capacity, refill_rate = parse_rate(rate)
+        cost = cost(request) if callable(cost) else cost
+        if cost <= 0:
+            return None
+        # A single request may never cost more than a full bucket
+        return f"{scope}:{self.key_func(request)}", capacity, refill_rate, min(float(cost), capacity)
+
+    def _take(self, rate: str, key: str, capacity: float, refill_rate: float, cost: float):
+        """Blocking store round trip; fails open when the store is unavailable"""
+        try:
+            allowed, tokens = self.store.take(key, capacity, refill_rate, cost, time.time())
+        except Exception as e:
+            # A locked SQLite file or unreachable Redis must not turn every request into a 500
+            self.store_errors += 1
+            now = time.monotonic()
+            if now - self._last_warning >= self.STORE_WARNING_INTERVAL:
+                self._last_warning = now
+                print(f"Warning: rate limit store unavailable, allowing requests ({self.store_errors} errors): {e!r}")
+            return
+        if not allowed:
+            raise RateLimitExceeded(rate, (cost - tokens) / refill_rate, capacity)
+
+    def hit(self, request: Request, rate: str, scope: str, cost: Cost = 1):
+        """Charge `cost` tokens from the caller's bucket for scope; raises RateLimitExceeded"""
+        charge = self._charge(request, rate, scope, cost)
+        if charge:
+            self._take(rate, *charge)
+
+    async def hit_async(self, request: Request, rate: str, scope: str, cost: Cost = 1):
+        """hit() for async code: the store round trip runs in a worker thread, off the event loop"""
+        charge = self._charge(request, rate, scope, cost)
+        if not charge:
+            return
+        if getattr(self.store, "blocking", True):
+            await asyncio.to_thread(self._take, rate, *charge)
+        else:
+            self._take(rate, *charge)
+
+    def limit(self, rate: str, scope: Optional[str] = None, cost: Cost = 1):
+        """Route decorator; the endpoint must take a `request: Request` parameter"""
+        def decorator(func):
+            bucket = scope or f"{func.__module__}.{func.__name__}"
+
+            def find_request(args, kwargs) -> Request:
+                for value in list(args) + list(kwargs.values()):
+                    if isinstance(value, Request):
+                        return value
+                raise RuntimeError(f"{func.__name__} needs a `request: Request` parameter to be rate limited")
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    await self.hit_async(find_request(args, kwargs), rate, bucket, cost)
+                    return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                self.hit(find_request(args, kwargs), rate, bucket, cost)
+                return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def dependency(self, rate: str, scope: str, cost: Cost = 1):
+        """FastAPI dependency form, for router-wide budgets (sync, so FastAPI runs it in the threadpool)"""
+        def charge(request: Request):
+            self.hit(request, rate, scope, cost)
+        return charge
+
+    def reset(self):
+        self.store.clear()
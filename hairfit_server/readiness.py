@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+
+from services import gemini_service, storage_service, style_service
+
+# 준비 상태 점검 (/ready)
+# /health only says the process is up (liveness); /ready checks what serving
+# traffic depends on. The model client is reported but not required: without
+# it only synthesis fails, so it should not take a worker out of rotation.
+READY_CHECK_TIMEOUT_SECONDS = float(os.getenv("READY_CHECK_TIMEOUT_SECONDS", "2"))
+STORAGE_DIRS = ("profiles", "originals", "results")
+
+# Filled in by main.py: module import and startup hook durations of this process
+STARTUP = {"import_seconds": None, "startup_seconds": None}
+
+async def check_database(db) -> dict:
+    await db.execute(text("SELECT 1"))
+    return {}
+
+async def check_storage(db) -> dict:
+    for name in STORAGE_DIRS:
+        path = storage_service.UPLOAD_DIR / name
+        if not path.is_dir() or not os.access(path, os.W_OK | os.X_OK):
+            raise RuntimeError(f"{path} is missing or not writable")
+    return {}
+
+async def check_catalog(db) -> dict:
+    status = style_service.catalog_status()
+    if not status["loaded"]:
+        raise RuntimeError("Style catalog is not loaded")
+    return status
+
+async def check_model(db) -> dict:
+    status = gemini_service.get_status()
+    # "stale": the last refresh failed but an earlier model list is still in use;
+    # "unlisted": discovery is turned off and every configured tier is tried
+    return {**status, "ok": status["status"] in ("ready", "stale", "unlisted")}
+
+# (name, check, required for readiness)
+CHECKS = (
+    ("database", check_database, True),
+    ("storage", check_storage, True),
+    ("catalog", check_catalog, True),
+    ("model", check_model, False),
+)
+
+async def check_all(db) -> tuple:
+    """(ready, per-dependency results); each check is bounded by READY_CHECK_TIMEOUT_SECONDS"""
+    results = {}
+    for name, check, required in CHECKS:
+        started = time.perf_counter()
+        try:
+            result = {"ok": True, **await asyncio.wait_for(check(db), READY_CHECK_TIMEOUT_SECONDS)}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or repr(e)}
+        result["required"] = required
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results[name] = result
+    ready = all(result["ok"] for result in results.values() if result["required"])
+    return ready, results
@@ -2,15 +2,17 @@ import shutil
 import uuid
 import os
 from pathlib import Path
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Query
 from fastapi.responses import FileResponse
 
-import models, auth_utils as auth
+import models, auth_utils as auth, metrics
 from dependencies import limiter
+from services import image_service
+from services.storage_service import UPLOAD_DIR
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("uploads")
 # Ensure directories exist (might be redundant if main.py does it, but safe)
 UPLOAD_DIR.mkdir(exist_ok=True)
 (UPLOAD_DIR / "profiles").mkdir(exist_ok=True)
@@ -31,6 +33,7 @@ async def upload_profile_photo(
 
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+            metrics.record_upload("profile", buffer.tell())
 
         return {"photo_path": f"profiles/{filename}"}
     except Exception as e:
@@ -50,6 +53,7 @@ async def upload_result_photo(
 
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+            metrics.record_upload("result", buffer.tell())
 
         return {"photo_path": f"results/{filename}"}
     except Exception as e:
@@ -69,18 +73,27 @@ async def upload_original_photo(
 
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+            metrics.record_upload("original", buffer.tell())
 
         return {"photo_path": f"originals/{filename}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
 
 @router.get("/images/{image_type}/{filename}")
-async def get_image(image_type: str, filename: str):
+async def get_image(
+    image_type: str,
+    filename: str,
+    size: Optional[Literal["full", "preview"]] = Query(None, description="preview: smaller copy of a synthesis result")
+):
     # Handle style images from assets directory
     if image_type == "styles":
         file_path = Path("assets") / "styles" / filename
     else:
         file_path = UPLOAD_DIR / image_type / filename
+        # Results stored by the synthesis pipeline have a preview; others fall back to the full image
+        preview = image_service.find_preview(f"{image_type}/{filename}") if size == "preview" else None
+        if preview:
+            file_path = UPLOAD_DIR / preview
 
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Image not found")
@@ -1,50 +1,217 @@
+import os
+import tempfile
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload
+from starlette.background import BackgroundTask
 
-import models, schemas, auth_utils as auth, database
-from utils import get_user_salon
+import models, schemas, auth_utils as auth, database, metrics
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CountMode, apply_keyset, fetch_page, count_rows, set_page_headers
+from serialization import list_response, schema_fields
+from utils import get_user_salon, get_user_salon_async, image_url
+from services import search_service, member_io_service, member_service, sync_service
 
 router = APIRouter()
 
+MAX_RECENT_HISTORY = 50
+member_fields = schema_fields(schemas.MemberResponse)
+
+async def _get_salon_member(member_id: str, salon_id: int, db: AsyncSession) -> models.Member:
+    result = await db.execute(
+        select(models.Member).where(
+            models.Member.id == member_id,
+            models.Member.salon_id == salon_id
+        )
+    )
+    member = result.scalars().first()
+
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    return member
+
 @router.get("/", response_model=list[schemas.MemberResponse])
 async def get_members(
-    skip: int = 0,
-    limit: int = 50,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Deprecated offset paging; ignored when cursor is set"),
+    count: CountMode = "none",
+    fields: Optional[frozenset] = Depends(member_fields),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """List members newest first. The next page's cursor is returned in X-Next-Cursor."""
+    salon = await get_user_salon_async(current_user, db)
+    base_query = select(models.Member).where(models.Member.salon_id == salon.id)
+
+    query = apply_keyset(base_query, models.Member.created_at, models.Member.id, cursor)
+    if skip and not cursor:
+        query = query.offset(skip)
+    members, next_cursor = await fetch_page(db, query, limit)
+
+    total, estimated = await count_rows(db, base_query, count)
+    set_page_headers(response, next_cursor, total, estimated)
+    return list_response(members, schemas.MemberResponse, response, fields)
+
+@router.get("/search", response_model=list[schemas.MemberResponse])
+async def search_members(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=search_service.MAX_SEARCH_RESULTS),
+    fields: Optional[frozenset] = Depends(member_fields),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Search members by (partial) name, 초성, or phone-number fragment, best match first"""
+    salon = await get_user_salon_async(current_user, db)
+    member_ids = await db.run_sync(search_service.search_member_ids, salon.id, q, limit)
+    if not member_ids:
+        return []
+
+    result = await db.execute(
+        select(models.Member).where(
+            models.Member.id.in_(member_ids),
+            models.Member.salon_id == salon.id
+        )
+    )
+    members = {member.id: member for member in result.scalars().all()}
+    ranked = [members[member_id] for member_id in member_ids if member_id in members]
+    return list_response(ranked, schemas.MemberResponse, response, fields)
+
+@router.post("/import", response_model=schemas.MemberImportResult)
+def import_members(
+    file: UploadFile = File(...),
+    file_format: Optional[member_io_service.FileFormat] = Query(None, alias="format"),
+    on_duplicate: member_io_service.DuplicateMode = "skip",
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Bulk import members from CSV/XLSX (header row with name, phone and optional memo).
+
+    Runs in the threadpool since parsing and batch inserts are blocking work.
+    """
+    salon = get_user_salon(current_user, db)
+    file_format = member_io_service.detect_format(file.filename, file_format)
+    if file.size is not None:
+        metrics.record_upload("member_import", file.size)
+    try:
+        return member_io_service.import_members(db, salon.id, file.file, file_format, on_duplicate)
+    except member_io_service.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export")
+def export_members(
+    file_format: member_io_service.FileFormat = Query("csv", alias="format"),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     salon = get_user_salon(current_user, db)
-    members = db.query(models.Member).filter(models.Member.salon_id == salon.id)\
-        .order_by(models.Member.created_at.desc())\
-        .offset(skip).limit(limit).all()
-    return members
+    filename = f"members-{datetime.utcnow():%Y%m%d}.{file_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if file_format == "xlsx":
+        # XLSX is a zip archive, so it is written to a temp file first and then streamed
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        member_io_service.write_members_xlsx(db, salon.id, path)
+        return FileResponse(
+            path,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers,
+            background=BackgroundTask(os.remove, path)
+        )
+
+    # The request's session may be closed before the body is streamed, so use a new one
+    bind = db.get_bind()
+    salon_id = salon.id
+
+    def stream():
+        with Session(bind=bind) as export_db:
+            yield from member_io_service.iter_members_csv(export_db, salon_id)
+
+    return StreamingResponse(stream(), media_type="text/csv; charset=utf-8", headers=headers)
 
 @router.get("/{member_id}", response_model=schemas.MemberResponse)
 async def get_member(
     member_id: str,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
-    member = db.query(models.Member).filter(
-        models.Member.id == member_id,
-        models.Member.salon_id == salon.id
-    ).first()
+    salon = await get_user_salon_async(current_user, db)
+    return await _get_salon_member(member_id, salon.id, db)
 
-    if not member:
+@router.get("/{member_id}/detail", response_model=schemas.MemberDetailResponse)
+async def get_member_detail(
+    member_id: str,
+    history_limit: int = Query(10, ge=0, le=MAX_RECENT_HISTORY),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Member screen payload: the member, its history count and the latest history entries.
+
+    Always two queries regardless of history size; relationships are
+    raiseload'ed so an accidental lazy load fails loudly instead of adding
+    a query per row.
+    """
+    salon = await get_user_salon_async(current_user, db)
+
+    history_count = (
+        select(func.count(models.SynthesisHistory.id))
+        .where(models.SynthesisHistory.member_id == models.Member.id)
+        .correlate(models.Member)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(models.Member, history_count)
+        .where(models.Member.id == member_id, models.Member.salon_id == salon.id)
+        .options(raiseload("*"))
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Member not found")
+    member, count = row
 
-    return member
+    recent = []
+    if history_limit and count:
+        result = await db.execute(
+            select(models.SynthesisHistory)
+            .where(models.SynthesisHistory.member_id == member.id)
+            .order_by(models.SynthesisHistory.created_at.desc(), models.SynthesisHistory.id.desc())
+            .limit(history_limit)
+            .options(raiseload("*"))
+        )
+        recent = result.scalars().all()
+
+    detail = schemas.MemberResponse.model_validate(member).model_dump()
+    detail.update(
+        photo_url=image_url(member.photo_path),
+        history_count=count,
+        recent_history=[
+            {
+                **schemas.SynthesisHistoryResponse.model_validate(history).model_dump(),
+                "original_url": image_url(history.original_photo_path),
+                "result_url": image_url(history.result_photo_path),
+                "thumbnail_url": image_url(history.result_photo_path, size="preview") if history.result_photo_path
+                else image_url(history.original_photo_path),
+            }
+            for history in recent
+        ],
+    )
+    return detail
 
 @router.post("/", response_model=schemas.MemberResponse)
 async def create_member(
     member: schemas.MemberCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
+    salon = await get_user_salon_async(current_user, db)
 
     new_member = models.Member(
         id=str(uuid.uuid4()),
@@ -58,8 +225,10 @@ async def create_member(
     )
 
     db.add(new_member)
-    db.commit()
-    db.refresh(new_member)
+    await db.run_sync(search_service.index_member, new_member)
+    await db.run_sync(sync_service.record_changes, salon.id, sync_service.MEMBER, [new_member.id])
+    await db.commit()
+    await db.refresh(new_member)
 
     return new_member
 
@@ -68,45 +237,45 @@ async def update_member(
     member_id: str,
     member_update: schemas.MemberUpdate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
-
-    member = db.query(models.Member).filter(
-        models.Member.id == member_id,
-        models.Member.salon_id == salon.id
-    ).first()
-
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
+    salon = await get_user_salon_async(current_user, db)
+    member = await _get_salon_member(member_id, salon.id, db)
 
     update_data = member_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(member, key, value)
 
     member.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(member)
+    if "name" in update_data or "phone" in update_data:
+        await db.run_sync(search_service.index_member, member)
+    await db.run_sync(sync_service.record_changes, salon.id, sync_service.MEMBER, [member.id])
+    await db.commit()
+    await db.refresh(member)
 
     return member
 
+@router.post("/bulk-delete", response_model=schemas.MemberBulkDeleteResult)
+async def bulk_delete_members(
+    request: schemas.MemberBulkDelete,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Delete many members (and their history and photo files) in one transaction"""
+    if len(request.member_ids) > member_service.MAX_BULK_DELETE:
+        raise HTTPException(status_code=400, detail=f"At most {member_service.MAX_BULK_DELETE} members per request")
+    salon = await get_user_salon_async(current_user, db)
+    return await db.run_sync(member_service.delete_members, salon.id, request.member_ids)
+
 @router.delete("/{member_id}")
 async def delete_member(
     member_id: str,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
-
-    member = db.query(models.Member).filter(
-        models.Member.id == member_id,
-        models.Member.salon_id == salon.id
-    ).first()
-
-    if not member:
+    salon = await get_user_salon_async(current_user, db)
+    result = await db.run_sync(member_service.delete_members, salon.id, [member_id])
+    if not result["deleted"]:
         raise HTTPException(status_code=404, detail="Member not found")
 
-    db.delete(member)
-    db.commit()
-
     return {"message": "Member deleted successfully"}
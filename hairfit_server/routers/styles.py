@@ -1,38 +1,137 @@
+import asyncio
 import os
-import shutil
+import io
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from PIL import Image
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-import models, schemas, auth_utils as auth
+import models, schemas, auth_utils as auth, database
 from dependencies import limiter
-from services import style_service
+from serialization import FastJSONResponse, FieldSet, select_fields
+from services import style_service, popularity_service
+from utils import get_user_salon_async
 
-router = APIRouter()
+async def _fresh_catalog():
+    """Pick up style changes made by other worker processes"""
+    await style_service.refresh_catalog_async()
+
+def _update_catalog(change, *args):
+    """Run change under the catalog lock and publish it; blocking, so callers use asyncio.to_thread"""
+    with style_service.catalog_update():
+        return change(*args)
+
+router = APIRouter(dependencies=[Depends(_fresh_catalog)])
+
+MAX_SIMILAR_STYLES = 50
+MAX_POPULAR_STYLES = 100
+
+PopularityWindow = Literal["total", "7d", "30d"]
+PopularityScope = Literal["salon", "global"]
+style_fields = FieldSet(("id", "name", "image_path", "exists", "tags", "gender", "category", "usage_count"))
+
+def _style_info(style_id: str, image_path: str, fields: frozenset = None) -> dict:
+    metadata = style_service.STYLE_METADATA.get(style_id, {})
+    info = {
+        "id": style_id,
+        "name": metadata.get("name") or style_id.replace("_", " ").title(),
+        "image_path": image_path.replace("assets/", ""),
+    }
+    # One stat() per style; skipped when the client did not ask for it
+    if fields is None or "exists" in fields:
+        info["exists"] = os.path.exists(image_path)
+    info["tags"] = metadata.get("tags", [])
+    info["gender"] = metadata.get("gender", "neutral")
+    info["category"] = metadata.get("category", "unknown")
+    return info
+
+async def _popularity_salon_id(scope: str, current_user: models.User, db: AsyncSession):
+    if scope == "global":
+        return None
+    return (await get_user_salon_async(current_user, db)).id
 
 @router.get("/")
-async def get_styles(current_user: models.User = Depends(auth.get_current_user)):
+async def get_styles(
+    sort: Literal["default", "popular"] = "default",
+    window: PopularityWindow = "total",
+    scope: PopularityScope = "salon",
+    fields: frozenset = Depends(style_fields),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
     """Get list of available hairstyles"""
     try:
         styles = []
-        for style_id, image_path in style_service.STYLE_IMAGES.items():
-            metadata = style_service.STYLE_METADATA.get(style_id, {})
-            style_info = {
-                "id": style_id,
-                "name": metadata.get("name") or style_id.replace("_", " ").title(),
-                "image_path": image_path.replace("assets/", ""),
-                "exists": os.path.exists(image_path),
-                "tags": metadata.get("tags", []),
-                "gender": metadata.get("gender", "neutral"),
-                "category": metadata.get("category", "unknown")
-            }
-            styles.append(style_info)
+        # A snapshot: uploads and deletes change the catalog from worker threads
+        for style_id, image_path in list(style_service.STYLE_IMAGES.items()):
+            styles.append(_style_info(style_id, image_path, fields))
+
+        if sort == "popular":
+            salon_id = await _popularity_salon_id(scope, current_user, db)
+            counts = await db.run_sync(popularity_service.get_usage_counts, salon_id, window)
+            for style_info in styles:
+                style_info["usage_count"] = counts.get(style_info["id"], 0)
+            # Stable sort keeps catalog order among styles with equal usage
+            styles.sort(key=lambda style_info: style_info["usage_count"], reverse=True)
 
-        return {"styles": styles}
+        # Plain str/list/bool values: hand them to orjson without jsonable_encoder's walk
+        return FastJSONResponse({"styles": select_fields(styles, fields)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/popular")
+async def get_popular_styles(
+    limit: int = Query(10, ge=1, le=MAX_POPULAR_STYLES),
+    window: PopularityWindow = "30d",
+    scope: PopularityScope = "salon",
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Get the most used hairstyles for the caller's salon or all salons"""
+    salon_id = await _popularity_salon_id(scope, current_user, db)
+    top_styles = await db.run_sync(popularity_service.get_top_styles, salon_id, window, limit * 2)
+    styles = []
+    # Over-fetch slightly so deleted styles don't shrink the result
+    for style_id, count in top_styles:
+        image_path = style_service.STYLE_IMAGES.get(style_id)
+        if image_path is None:
+            continue
+        style_info = _style_info(style_id, image_path)
+        style_info["usage_count"] = count
+        styles.append(style_info)
+        if len(styles) == limit:
+            break
+
+    return {"window": window, "scope": scope, "styles": styles}
+
+@router.get("/{style_id}/similar")
+async def get_similar_styles(
+    style_id: str,
+    k: int = Query(5, ge=1, le=MAX_SIMILAR_STYLES),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Get the k styles most visually similar to the given style"""
+    if style_id not in style_service.STYLE_IMAGES:
+        raise HTTPException(status_code=404, detail="Style not found")
+
+    results = style_service.STYLE_INDEX.similar(style_id, k)
+    if results is None:
+        raise HTTPException(status_code=409, detail="Style is not indexed yet")
+
+    similar = []
+    for similar_id, score in results:
+        image_path = style_service.STYLE_IMAGES.get(similar_id)
+        if image_path is None:
+            continue
+        style_info = _style_info(similar_id, image_path)
+        style_info["score"] = round(score, 4)
+        similar.append(style_info)
+
+    return {"style_id": style_id, "similar": similar}
+
 @router.post("/")
-@limiter.limit("10/hour")  # 10 uploads per hour
+@limiter.limit("10/hour")  # 10 uploads per hour per salon
 async def upload_style(
     request: Request,
     file: UploadFile = File(...),
@@ -41,74 +140,105 @@ async def upload_style(
     tags: str = Form("[]"),  # JSON string of tags
     gender: str = Form("neutral"),
     category: str = Form("unknown"),
+    allow_duplicate: bool = Form(False),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Upload a new hairstyle reference image"""
     try:
-        # Auto-generate style_id if not provided
-        if not style_id:
-            # Find the next available style number
-            existing_numbers = []
-            for existing_id in style_service.STYLE_IMAGES.keys():
-                if existing_id.startswith("style_"):
-                    try:
-                        num = int(existing_id.replace("style_", ""))
-                        existing_numbers.append(num)
-                    except ValueError:
-                        continue
-
-            next_number = max(existing_numbers, default=0) + 1
-            style_id = f"style_{next_number}"
-            print(f"Auto-generated style_id: {style_id}")
-
-        # Validate style_id format
-        if not style_id.startswith("style_"):
-            raise HTTPException(status_code=400, detail="style_id must start with 'style_'")
-
-        # Check if style_id already exists
-        if style_id in style_service.STYLE_IMAGES:
-            raise HTTPException(status_code=400, detail=f"Style ID '{style_id}' already exists")
-
-        # Save file to assets/styles directory
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        filename = f"{style_id}.{file_extension}"
-        file_path = f"assets/styles/{filename}"
-
-        # Create directory if not exists
-        os.makedirs("assets/styles", exist_ok=True)
-
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Update STYLE_IMAGES mapping
-        style_service.STYLE_IMAGES[style_id] = file_path
-        
-        # Parse tags
+        # Compute perceptual hash / features before taking the catalog lock
+        contents = await file.read()
         try:
-            tags_list = json.loads(tags)
-        except:
-            tags_list = []
-
-        # Update Metadata
-        style_service.STYLE_METADATA[style_id] = {
-            "name": name,
-            "tags": tags_list,
-            "gender": gender,
-            "category": category
-        }
-        style_service.save_style_metadata()
+            with Image.open(io.BytesIO(contents)) as image:
+                signature = style_service.compute_image_signature(image)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image file")
 
-        return {
-            "message": "Style uploaded successfully",
-            "style_id": style_id,
-            "file_path": file_path
-        }
+        # Id allocation and writes are serialized across workers
+        return await asyncio.to_thread(
+            _update_catalog, _save_style,
+            contents, signature, style_id, name, tags, gender, category, allow_duplicate, file.filename,
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _save_style(contents: bytes, signature, style_id, name, tags, gender, category, allow_duplicate, filename):
+    """Register an uploaded style; the caller holds the catalog lock"""
+    # Auto-generate style_id if not provided
+    if not style_id:
+        # Find the next available style number
+        existing_numbers = []
+        for existing_id in style_service.STYLE_IMAGES.keys():
+            if existing_id.startswith("style_"):
+                try:
+                    num = int(existing_id.replace("style_", ""))
+                    existing_numbers.append(num)
+                except ValueError:
+                    continue
+
+        next_number = max(existing_numbers, default=0) + 1
+        style_id = f"style_{next_number}"
+        print(f"Auto-generated style_id: {style_id}")
+
+    # Validate style_id format
+    if not style_id.startswith("style_"):
+        raise HTTPException(status_code=400, detail="style_id must start with 'style_'")
+
+    # Check if style_id already exists
+    if style_id in style_service.STYLE_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Style ID '{style_id}' already exists")
+
+    # Check for near-duplicates
+    duplicates = style_service.STYLE_INDEX.duplicates(*signature)
+    if duplicates and not allow_duplicate:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "A near-identical style already exists",
+                "duplicates": duplicates
+            }
+        )
+
+    # Save file to assets/styles directory
+    file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
+    file_path = f"assets/styles/{style_id}.{file_extension}"
+
+    # Create directory if not exists
+    os.makedirs("assets/styles", exist_ok=True)
+
+    # Save file
+    with open(file_path, "wb") as buffer:
+        buffer.write(contents)
+
+    # Update STYLE_IMAGES mapping and similarity index
+    style_service.STYLE_IMAGES[style_id] = file_path
+    style_service.index_style_image(style_id, file_path, signature=signature)
+    style_service.STYLE_INDEX.save()
+
+    # Parse tags
+    try:
+        tags_list = json.loads(tags)
+    except:
+        tags_list = []
+
+    # Update Metadata
+    style_service.STYLE_METADATA[style_id] = {
+        "name": name,
+        "tags": tags_list,
+        "gender": gender,
+        "category": category
+    }
+    style_service.save_style_metadata()
+
+    return {
+        "message": "Style uploaded successfully",
+        "style_id": style_id,
+        "file_path": file_path,
+        "duplicates": duplicates
+    }
+
+
 @router.put("/{style_id}")
 async def update_style_metadata(
     style_id: str,
@@ -117,30 +247,36 @@ async def update_style_metadata(
 ):
     """Update style metadata (tags, gender, etc)"""
     try:
-        if style_id not in style_service.STYLE_IMAGES:
-            raise HTTPException(status_code=404, detail="Style not found")
-            
-        if not metadata:
-             raise HTTPException(status_code=400, detail="No metadata provided")
-
-        current_meta = style_service.STYLE_METADATA.get(style_id, {})
-        
-        if metadata.name is not None:
-            current_meta["name"] = metadata.name
-        if metadata.tags is not None:
-            current_meta["tags"] = metadata.tags
-        if metadata.gender is not None:
-            current_meta["gender"] = metadata.gender
-        if metadata.category is not None:
-            current_meta["category"] = metadata.category
-            
-        style_service.STYLE_METADATA[style_id] = current_meta
-        style_service.save_style_metadata()
-        
+        current_meta = await asyncio.to_thread(_update_catalog, _update_metadata, style_id, metadata)
         return {"message": "Style updated successfully", "style": current_meta}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _update_metadata(style_id: str, metadata: schemas.StyleUpdate):
+    """Apply a metadata update; the caller holds the catalog lock"""
+    if style_id not in style_service.STYLE_IMAGES:
+        raise HTTPException(status_code=404, detail="Style not found")
+
+    if not metadata:
+         raise HTTPException(status_code=400, detail="No metadata provided")
+
+    current_meta = style_service.STYLE_METADATA.get(style_id, {})
+
+    if metadata.name is not None:
+        current_meta["name"] = metadata.name
+    if metadata.tags is not None:
+        current_meta["tags"] = metadata.tags
+    if metadata.gender is not None:
+        current_meta["gender"] = metadata.gender
+    if metadata.category is not None:
+        current_meta["category"] = metadata.category
+
+    style_service.STYLE_METADATA[style_id] = current_meta
+    style_service.save_style_metadata()
+    return current_meta
+
 @router.delete("/{style_id}")
 async def delete_style(
     style_id: str,
@@ -148,25 +284,30 @@ async def delete_style(
 ):
     """Delete a hairstyle reference image"""
     try:
-        if style_id not in style_service.STYLE_IMAGES:
-            raise HTTPException(status_code=404, detail="Style not found")
-
-        file_path = style_service.STYLE_IMAGES[style_id]
-
-        # Delete file if exists
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-        # Remove from mapping
-        del style_service.STYLE_IMAGES[style_id]
-        
-        # Remove from metadata
-        if style_id in style_service.STYLE_METADATA:
-            del style_service.STYLE_METADATA[style_id]
-            style_service.save_style_metadata()
-
+        await asyncio.to_thread(_update_catalog, _delete_style, style_id)
         return {"message": "Style deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def _delete_style(style_id: str):
+    """Remove a style's image, index entry and metadata; the caller holds the catalog lock"""
+    if style_id not in style_service.STYLE_IMAGES:
+        raise HTTPException(status_code=404, detail="Style not found")
+
+    file_path = style_service.STYLE_IMAGES[style_id]
+
+    # Delete file if exists
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    # Remove from mapping and similarity index
+    del style_service.STYLE_IMAGES[style_id]
+    style_service.STYLE_INDEX.remove(style_id)
+    style_service.STYLE_INDEX.save()
+
+    # Remove from metadata
+    if style_id in style_service.STYLE_METADATA:
+        del style_service.STYLE_METADATA[style_id]
+        style_service.save_style_metadata()
@@ -0,0 +1,42 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, auth_utils as auth, database
+from utils import get_user_salon_async
+from services import sync_service
+
+router = APIRouter()
+
+@router.get("/sync", response_model=schemas.SyncPullResponse)
+async def pull_changes(
+    since: Optional[str] = None,
+    limit: int = Query(sync_service.DEFAULT_PULL_LIMIT, ge=1, le=sync_service.MAX_PULL_LIMIT),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Members and history changed since the cursor (omit it for a full sync).
+
+    Keep calling with the returned cursor while has_more is true; small pages
+    let a flaky connection resume without re-downloading what it already got.
+    """
+    try:
+        since_id = sync_service.parse_cursor(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    salon = await get_user_salon_async(current_user, db)
+    return await db.run_sync(sync_service.pull_changes, salon.id, since_id, limit)
+
+@router.post("/sync", response_model=schemas.SyncPushResult)
+async def push_changes(
+    push: schemas.SyncPush,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Apply a batch of offline changes; safe to retry after a dropped connection"""
+    if len(push.members) + len(push.history) + len(push.deleted_members) > sync_service.MAX_PUSH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {sync_service.MAX_PUSH_ITEMS} changes per request")
+
+    salon = await get_user_salon_async(current_user, db)
+    return await db.run_sync(sync_service.push_changes, salon.id, push)
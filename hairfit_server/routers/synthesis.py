@@ -1,34 +1,84 @@
 import os
 import base64
 import io
-import google.generativeai as genai
+import math
+import uuid
+from datetime import datetime
 from PIL import Image
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-import models, schemas, auth_utils as auth, database
+import models, schemas, auth_utils as auth, database, metrics
 from dependencies import limiter
-from services import style_service
-from utils import get_user_salon
+from services import (
+    style_service, popularity_service, sync_service, gemini_service, admission_service, image_service, hedging_service
+)
+from serialization import list_response, schema_fields
+from utils import get_user_salon_async
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CountMode, apply_keyset, fetch_page, count_rows, set_page_headers
 
 router = APIRouter()
+SYNTHESIS_RATE_LIMIT = "10/hour"  # 10 synthesis requests per hour per salon
+history_fields = schema_fields(schemas.SynthesisHistoryResponse)
 
-# Gemini API 설정
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+def _synthesis_busy(rejected: admission_service.AdmissionRejected) -> HTTPException:
+    # The salon's own queue is full -> 429; the whole server is saturated -> 503
+    status_code = (status.HTTP_429_TOO_MANY_REQUESTS if rejected.reason == "salon_queue_full"
+                   else status.HTTP_503_SERVICE_UNAVAILABLE)
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "message": "Synthesis capacity is busy, please retry shortly",
+            "reason": rejected.reason,
+            "queue_position": rejected.queue_position,
+            "estimated_wait_seconds": round(rejected.estimated_wait, 1),
+        },
+        headers={"Retry-After": str(max(1, math.ceil(rejected.estimated_wait)))},
+    )
+
+async def synthesis_slot(
+    request: Request,
+    deadline_seconds: Optional[float] = Form(None, gt=0, description="Time budget in seconds, capped by the server"),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Hold one fair-share synthesis slot for the caller's salon while the endpoint runs"""
+    # Charged before queueing: a salon over its hourly quota must not take a queue place or slot
+    await limiter.hit_async(request, SYNTHESIS_RATE_LIMIT, "synthesize")
+    salon = await get_user_salon_async(current_user, db)
+    # Don't keep a pooled connection checked out while queued or waiting on Gemini
+    await db.close()
+    # Queueing past the request's deadline is pointless
+    queue_timeout = min(admission_service.CONTROLLER.queue_timeout, hedging_service.resolve_deadline(deadline_seconds))
+    controller = admission_service.CONTROLLER
+    try:
+        waited = await controller.acquire(salon.id, queue_timeout)
+    except admission_service.AdmissionRejected as e:
+        raise _synthesis_busy(e)
+    slot = admission_service.Slot(controller, salon.id, waited)
+    try:
+        yield slot
+    finally:
+        # Returned to the controller once an abandoned Gemini call on it has finished too
+        slot.close()
 
 @router.post("/synthesize")
-@limiter.limit("10/hour")  # 10 synthesis requests per hour per IP
 async def synthesize_hair(
     request: Request,
+    response: Response,
     file: UploadFile = File(...),
     style_id: str = Form(...),
-    current_user: models.User = Depends(auth.get_current_user)
+    inline: bool = Form(True, description="Include the full result as base64; otherwise fetch result_photo_path"),
+    deadline_seconds: Optional[float] = Form(None, gt=0, description="Time budget in seconds, capped by the server"),
+    slot: admission_service.Slot = Depends(synthesis_slot, scope="function")
 ):
     print(f"Request received. Style ID: {style_id}")
+    queue_wait = slot.waited
+    response.headers["X-Queue-Wait-Ms"] = str(round(queue_wait * 1000))
     
-    if not GEMINI_API_KEY:
+    if not gemini_service.GEMINI_API_KEY:
         print("Error: GEMINI_API_KEY is not set")
         return {"error": "GEMINI_API_KEY is not set"}
 
@@ -36,11 +86,13 @@ async def synthesize_hair(
         # 변경 대상 이미지 데이터 읽기
         image_bytes = await file.read()
         print(f"Input image read successfully. Size: {len(image_bytes)} bytes")
+        metrics.record_upload("synthesis_input", len(image_bytes))
 
         # PIL 이미지로 변환 (Gemini 입력용)
         input_image = Image.open(io.BytesIO(image_bytes))
 
-        # 참조 스타일 이미지 로드
+        # 참조 스타일 이미지 로드 (다른 워커가 추가/삭제한 스타일 반영)
+        await style_service.refresh_catalog_async()
         style_image_path = style_service.STYLE_IMAGES.get(style_id)
         if not style_image_path:
             return {"error": f"Invalid style_id: {style_id}"}
@@ -63,15 +115,21 @@ async def synthesize_hair(
         )
         print(f"Prompt: {prompt}")
 
-        # Gemini 모델 로드
-        model_name = 'gemini-3-pro-image-preview'
-        print(f"Loading Gemini model: {model_name}...")
-        model = genai.GenerativeModel(model_name)
+        # 남은 시간 예산 (대기열에서 보낸 시간 제외)
+        deadline = hedging_service.resolve_deadline(deadline_seconds)
+        remaining = deadline - queue_wait
+        if remaining <= 0:
+            raise hedging_service.DeadlineExceeded(deadline, [])
 
-        # API 호출 - 변경 대상 이미지와 참조 스타일 이미지 함께 전송
-        print("Calling Gemini API with input image and reference style image...")
-        response = model.generate_content([prompt, input_image, reference_image])
-        print("Gemini API call completed.")
+        # API 호출 - 변경 대상 이미지와 참조 스타일 이미지 함께 전송 (느리면 다음 모델 티어로 헤징)
+        print(f"Calling Gemini API ({', '.join(gemini_service.image_model_tiers())}) within {remaining:.1f}s...")
+        response, model_outcome = await hedging_service.generate(
+            [prompt, input_image, reference_image], remaining,
+            sent_bytes=len(image_bytes) + os.path.getsize(style_image_path), slot=slot,
+        )
+        model_name = model_outcome["model"]
+        print(f"Gemini API call completed by {model_name} (tier {model_outcome['tier']}, "
+              f"hedged: {model_outcome['hedged']}) in {model_outcome['elapsed_seconds']}s")
 
         # 응답 디버깅 정보 출력
         print(f"Response object: {response}")
@@ -83,11 +141,13 @@ async def synthesize_hair(
 
         # 응답 처리
         ai_message = "No response"
-        generated_image_base64 = None
+        generated_image = None
 
         if response.candidates:
             candidate = response.candidates[0]
             print(f"Candidate finish_reason: {candidate.finish_reason}")
+            finish_reason = getattr(candidate.finish_reason, "name", str(candidate.finish_reason))
+            metrics.GEMINI_FINISH_REASONS.labels(model_name, finish_reason).inc()
             print(f"Candidate safety_ratings: {candidate.safety_ratings if hasattr(candidate, 'safety_ratings') else 'N/A'}")
 
             if candidate.content and candidate.content.parts:
@@ -99,28 +159,48 @@ async def synthesize_hair(
                     # 이미지 데이터 확인 (inline_data 또는 다른 형식)
                     if hasattr(part, 'inline_data') and part.inline_data:
                         print("Image response received!")
-                        generated_image_base64 = base64.b64encode(part.inline_data.data).decode('utf-8')
+                        metrics.GEMINI_BYTES.labels(model_name, "received").observe(len(part.inline_data.data))
+                        generated_image = part.inline_data.data
                         ai_message = "Image generated successfully"
                         break
             else:
                 ai_message = f"No content. Finish reason: {candidate.finish_reason}"
         else:
             ai_message = "No candidates returned"
+            metrics.GEMINI_FINISH_REASONS.labels(model_name, "NO_CANDIDATES").inc()
             # Check if blocked by safety filters
             if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
                 ai_message += f" - Prompt feedback: {response.prompt_feedback}"
 
         print(f"Gemini Response Message: {ai_message}")
 
-        # 생성된 이미지가 있으면 그것을 사용, 없으면 에러 반환
-        if generated_image_base64:
-            final_image_data = generated_image_base64
-        else:
+        # 생성된 이미지가 없으면 에러 반환
+        if generated_image is None:
             print("Error: No image generated by AI.")
             raise HTTPException(status_code=500, detail=f"Failed to generate image: {ai_message}")
 
-        return {"result_image": final_image_data}
+        # WebP/JPEG 변환 후 원본 크기 + 미리보기 저장 (history 저장 시 result_photo_path 그대로 사용)
+        stored = await image_service.store_result(generated_image)
+        encoding = stored["encoding"]
+        print(f"Result stored as {stored['photo_path']}: {encoding['original_bytes']} -> "
+              f"{encoding['full_bytes']} bytes (preview {encoding['preview_bytes']}) in {encoding['encode_ms']}ms")
+        result = {
+            "result_mime_type": stored["mime_type"],
+            "result_photo_path": stored["photo_path"],
+            "preview_photo_path": stored["preview_path"],
+            "encoding": encoding,
+            "model": model_outcome,
+        }
+        if inline:
+            result["result_image"] = base64.b64encode(stored["full"]).decode('utf-8')
+        return result
 
+    except hedging_service.DeadlineExceeded as e:
+        print(f"Error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail={"message": str(e), "deadline_seconds": e.deadline, "attempts": e.attempts},
+        )
     except Exception as e:
         print(f"Error occurred: {e}")
         import traceback
@@ -129,11 +209,16 @@ async def synthesize_hair(
 
 @router.get("/synthesis-history", response_model=list[schemas.SynthesisHistoryResponse])
 async def get_synthesis_history(
+    response: Response,
     member_id: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    count: CountMode = "none",
+    fields: Optional[frozenset] = Depends(history_fields),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
+    salon = await get_user_salon_async(current_user, db)
 
     # Use LEFT JOIN to include synthesis history without member_id
     # Filter to show only records for the current user's salon
@@ -150,30 +235,81 @@ async def get_synthesis_history(
     # The original code might have been flawed or incomplete for histories without members.
     # Assuming the original code worked, I'll copy it.
     
-    query = db.query(models.SynthesisHistory).outerjoin(models.Member).filter(
+    query = select(models.SynthesisHistory).outerjoin(models.Member).where(
         (models.Member.salon_id == salon.id) | (models.SynthesisHistory.member_id == None)
     )
     
     if member_id:
-        query = query.filter(models.SynthesisHistory.member_id == member_id)
-        
-    return query.order_by(models.SynthesisHistory.created_at.desc()).all()
+        query = query.where(models.SynthesisHistory.member_id == member_id)
+
+    # Keyset pagination, newest first; the next page's cursor goes in X-Next-Cursor
+    page_query = apply_keyset(query, models.SynthesisHistory.created_at, models.SynthesisHistory.id, cursor)
+    histories, next_cursor = await fetch_page(db, page_query, limit)
+
+    total, estimated = await count_rows(db, query, count)
+    set_page_headers(response, next_cursor, total, estimated)
+    return list_response(histories, schemas.SynthesisHistoryResponse, response, fields)
+
+@router.post("/synthesis-history", response_model=schemas.SynthesisHistoryResponse)
+async def create_synthesis_history(
+    history: schemas.SynthesisHistoryCreate,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    salon = await get_user_salon_async(current_user, db)
+
+    if history.member_id:
+        result = await db.execute(
+            select(models.Member.id).where(
+                models.Member.id == history.member_id,
+                models.Member.salon_id == salon.id
+            )
+        )
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Member not found")
+
+    now = datetime.utcnow()
+    new_history = models.SynthesisHistory(
+        id=str(uuid.uuid4()),
+        member_id=history.member_id,
+        original_photo_path=history.original_photo_path,
+        reference_style_id=history.reference_style_id,
+        result_photo_path=history.result_photo_path,
+        created_at=now
+    )
+    db.add(new_history)
+
+    # Popularity counters are updated in the same transaction as the history row
+    await db.run_sync(
+        popularity_service.record_style_usage,
+        history.reference_style_id,
+        salon.id if history.member_id else None,
+        now
+    )
+    await db.run_sync(sync_service.record_changes, salon.id, sync_service.HISTORY, [new_history.id])
+    await db.commit()
+    await db.refresh(new_history)
+
+    return new_history
 
 @router.get("/synthesis-history/{history_id}", response_model=schemas.SynthesisHistoryResponse)
 async def get_synthesis_history_detail(
     history_id: str,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    salon = get_user_salon(current_user, db)
+    salon = await get_user_salon_async(current_user, db)
 
     # Allow access if it belongs to the salon OR if it has no member_id (likely testing/anonymous if that's allowed)
     # But usually we want to ensure ownership.
     # Following the pattern of list endpoint:
-    history = db.query(models.SynthesisHistory).outerjoin(models.Member).filter(
-        models.SynthesisHistory.id == history_id,
-        (models.Member.salon_id == salon.id) | (models.SynthesisHistory.member_id == None)
-    ).first()
+    result = await db.execute(
+        select(models.SynthesisHistory).outerjoin(models.Member).where(
+            models.SynthesisHistory.id == history_id,
+            (models.Member.salon_id == salon.id) | (models.SynthesisHistory.member_id == None)
+        )
+    )
+    history = result.scalars().first()
 
     if not history:
         raise HTTPException(status_code=404, detail="Synthesis history not found")
@@ -35,6 +35,8 @@ class TokenRefresh(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    salon_id: Optional[int] = None
 
 # Salon Schemas
 class SalonBase(BaseModel):
@@ -76,6 +78,27 @@ class MemberResponse(MemberBase):
     class Config:
         from_attributes = True
 
+class MemberImportError(BaseModel):
+    row: int
+    error: str
+    phone: Optional[str] = None
+
+class MemberImportResult(BaseModel):
+    inserted: int
+    updated: int
+    skipped: int
+    error_count: int
+    errors: List[MemberImportError]
+
+class MemberBulkDelete(BaseModel):
+    member_ids: List[str]
+
+class MemberBulkDeleteResult(BaseModel):
+    deleted: int
+    history_deleted: int
+    files_queued: int
+    not_found: List[str]
+
 # SynthesisHistory Schemas
 class SynthesisHistoryBase(BaseModel):
     member_id: Optional[str] = None
@@ -94,6 +117,56 @@ class SynthesisHistoryResponse(SynthesisHistoryBase):
     class Config:
         from_attributes = True
 
+class SynthesisHistoryItem(SynthesisHistoryResponse):
+    original_url: Optional[str] = None
+    result_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+
+class MemberDetailResponse(MemberResponse):
+    photo_url: Optional[str] = None
+    history_count: int
+    recent_history: List[SynthesisHistoryItem]
+
+# Sync Schemas
+class SyncMember(BaseModel):
+    id: str
+    name: str
+    phone: str
+    memo: Optional[str] = None
+    photo_path: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SyncHistory(SynthesisHistoryBase):
+    id: str
+    created_at: Optional[datetime] = None
+
+class SyncPush(BaseModel):
+    members: List[SyncMember] = []
+    history: List[SyncHistory] = []
+    deleted_members: List[str] = []
+
+class SyncConflict(BaseModel):
+    entity: str
+    id: str
+    reason: str
+
+class SyncPushResult(BaseModel):
+    inserted_members: int
+    updated_members: int
+    deleted_members: int
+    inserted_history: int
+    unchanged: int
+    conflicts: List[SyncConflict]
+
+class SyncPullResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    members: List[MemberResponse]
+    history: List[SynthesisHistoryResponse]
+    deleted_members: List[str]
+    deleted_history: List[str]
+
 # Style Schemas
 class StyleUpdate(BaseModel):
     name: Optional[str] = None
@@ -0,0 +1,63 @@
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+# JSON 직렬화 + 필드 선택 (fields=)
+# FastJSONResponse is the app's default response class: bodies are encoded by
+# orjson instead of json.dumps. The paged list endpoints skip the intermediate
+# dicts altogether: list_response validates the ORM rows and writes JSON bytes
+# in one pydantic-core call, applying fields= on the way.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        # Types orjson doesn't know (Decimal, sets, models) go through FastAPI's encoder
+        return orjson.dumps(content, default=jsonable_encoder, option=ORJSON_OPTIONS)
+
+class FieldSet:
+    """`fields=` query parameter: comma-separated columns to return; id is always included"""
+
+    def __init__(self, allowed: Iterable[str]):
+        self.allowed = frozenset(allowed)
+
+    def __call__(self, fields: Optional[str] = Query(
+        None, description="Comma-separated fields to include in each item (default: all)"
+    )) -> Optional[frozenset]:
+        if not fields:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - self.allowed
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return frozenset(requested | ({"id"} & self.allowed))
+
+def schema_fields(schema) -> FieldSet:
+    return FieldSet(schema.model_fields)
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+def list_response(items, schema, response: Response, fields: Optional[frozenset] = None) -> Response:
+    """JSON list of `schema` items, limited to `fields` when given.
+
+    Headers set on `response` (X-Next-Cursor, counts) are carried over, since
+    FastAPI does not merge them into a returned Response.
+    """
+    adapter = _list_adapter(schema)
+    include = {"__all__": set(fields)} if fields is not None else None
+    body = adapter.dump_json(adapter.validate_python(items, from_attributes=True), include=include)
+    result = Response(content=body, media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    return result
+
+def select_fields(items: list, fields: Optional[frozenset]) -> list:
+    """Drop unrequested keys from plain dict items"""
+    if fields is None:
+        return items
+    return [{key: value for key, value in item.items() if key in fields} for item in items]
@@ -0,0 +1,325 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# 합성 요청 입장 제어 (살롱별 공정 분배)
+# Gemini calls are the scarce resource. At most SYNTHESIS_MAX_CONCURRENCY run
+# at once in this process; one salon may hold SYNTHESIS_SALON_CONCURRENCY of
+# them and queue SYNTHESIS_SALON_QUEUE more. Queued requests are served by
+# weighted fair queuing: a request is tagged max(virtual clock, its salon's
+# last tag) + 1/weight and the smallest tag whose salon is under its running
+# cap goes next, so one salon's batch session interleaves with the others
+# instead of running ahead of them. Requests that cannot queue are rejected
+# at once with their would-be queue position and an estimated wait.
+# Under gunicorn every worker has its own controller (see gunicorn.conf.py).
+SYNTHESIS_MAX_CONCURRENCY = int(os.getenv("SYNTHESIS_MAX_CONCURRENCY", "4"))
+SYNTHESIS_SALON_CONCURRENCY = int(os.getenv("SYNTHESIS_SALON_CONCURRENCY", "2"))
+SYNTHESIS_SALON_QUEUE = int(os.getenv("SYNTHESIS_SALON_QUEUE", "4"))
+SYNTHESIS_MAX_QUEUE = int(os.getenv("SYNTHESIS_MAX_QUEUE", "64"))
+SYNTHESIS_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SYNTHESIS_QUEUE_TIMEOUT_SECONDS", "60"))
+# Starting point of the wait estimate; replaced by a moving average of real calls
+SYNTHESIS_EXPECTED_SECONDS = float(os.getenv("SYNTHESIS_EXPECTED_SECONDS", "20"))
+SERVICE_TIME_SMOOTHING = 0.2
+STATS_MAX_SALONS = 1000
+
+def parse_weights(value: str) -> dict:
+    """"12:3,40:2" -> {12: 3.0, 40: 2.0}; salons not listed have weight 1"""
+    weights = {}
+    for item in value.split(","):
+        salon_id, _, weight = item.strip().partition(":")
+        if salon_id and weight:
+            weights[int(salon_id)] = float(weight)
+    return weights
+
+SYNTHESIS_SALON_WEIGHTS = parse_weights(os.getenv("SYNTHESIS_SALON_WEIGHTS", ""))
+
+class AdmissionRejected(Exception):
+    """The request can't be queued (429 for the salon's own limit, 503 when the server is saturated)"""
+
+    def __init__(self, reason: str, queue_position: int, estimated_wait: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.queue_position = queue_position
+        self.estimated_wait = estimated_wait
+
+class _Waiter:
+    __slots__ = ("salon_id", "start_tag", "finish_tag", "seq", "future")
+
+    def __init__(self, salon_id, start_tag: float, finish_tag: float, seq: int, future):
+        self.salon_id = salon_id
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.future = future
+
+class _SalonState:
+    __slots__ = ("running", "queued", "last_tag")
+
+    def __init__(self):
+        self.running = 0
+        self.queued = 0
+        self.last_tag = 0.0
+
+class AdmissionStats:
+    """Per-salon wait times and rejections, for tuning weights (/health/synthesis)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = {}
+        self.salons = OrderedDict()
+
+    def _salon(self, salon_id) -> dict:
+        entry = self.salons.pop(salon_id, None) or {
+            "admitted": 0, "rejected": 0, "weight": 1.0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+        }
+        self.salons[salon_id] = entry
+        while len(self.salons) > STATS_MAX_SALONS:
+            self.salons.popitem(last=False)
+        return entry
+
+    def record_admit(self, salon_id, weight: float, wait: float):
+        metrics.SYNTHESIS_QUEUE_WAIT.labels(f"{weight:g}").observe(wait)
+        with self._lock:
+            self.admitted += 1
+            self.waited += wait > 0
+            entry = self._salon(salon_id)
+            entry["admitted"] += 1
+            entry["weight"] = weight
+            entry["wait_seconds_total"] += wait
+            entry["wait_seconds_max"] = max(entry["wait_seconds_max"], wait)
+
+    def record_reject(self, salon_id, reason: str):
+        metrics.SYNTHESIS_REJECTIONS.labels(reason).inc()
+        with self._lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            self._salon(salon_id)["rejected"] += 1
+
+    def snapshot(self, top: int = 50) -> dict:
+        with self._lock:
+            salons = sorted(self.salons.items(), key=lambda item: item[1]["wait_seconds_total"], reverse=True)
+            return {
+                "admitted": self.admitted,
+                "waited": self.waited,
+                "rejected": dict(self.rejected),
+                "salons": {
+                    str(salon_id): {
+                        "admitted": entry["admitted"],
+                        "rejected": entry["rejected"],
+                        "weight": entry["weight"],
+                        "wait_seconds_avg": round(entry["wait_seconds_total"] / entry["admitted"], 3)
+                        if entry["admitted"] else 0.0,
+                        "wait_seconds_max": round(entry["wait_seconds_max"], 3),
+                    }
+                    for salon_id, entry in salons[:top]
+                },
+            }
+
+class FairAdmission:
+    """Global concurrency cap + per-salon caps + weighted fair queue; runs on the event loop"""
+
+    def __init__(self, max_concurrency: int = SYNTHESIS_MAX_CONCURRENCY,
+                 salon_concurrency: int = SYNTHESIS_SALON_CONCURRENCY, salon_queue: int = SYNTHESIS_SALON_QUEUE,
+                 max_queue: int = SYNTHESIS_MAX_QUEUE, queue_timeout: float = SYNTHESIS_QUEUE_TIMEOUT_SECONDS,
+                 weights: dict = None):
+        self.max_concurrency = max_concurrency
+        self.salon_concurrency = salon_concurrency
+        self.salon_queue = salon_queue
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.weights = SYNTHESIS_SALON_WEIGHTS if weights is None else weights
+        self.running = 0
+        self.waiters = []
+        self.salons = {}
+        self.virtual_time = 0.0
+        self.service_seconds = SYNTHESIS_EXPECTED_SECONDS
+        self.stats = AdmissionStats()
+        self._seq = itertools.count()
+
+    def weight(self, salon_id) -> float:
+        return self.weights.get(salon_id, 1.0)
+
+    def _position(self, finish_tag: float) -> int:
+        """Place in line of a request tagged finish_tag (1 = next to run)"""
+        return 1 + sum(1 for waiter in self.waiters if waiter.finish_tag <= finish_tag)
+
+    def estimate_wait(self, position: int, salon_queued: int = 0) -> float:
+        # Slots free up every service_seconds / cap on average; the salon's own cap can be the tighter one
+        return self.service_seconds * max(position / self.max_concurrency,
+                                          (salon_queued + 1) / self.salon_concurrency)
+
+    def _reject(self, salon_id, reason: str, position: int, salon_queued: int):
+        self.stats.record_reject(salon_id, reason)
+        self._forget(salon_id)
+        raise AdmissionRejected(reason, position, self.estimate_wait(position, salon_queued))
+
+    def _start(self, salon_id, state: _SalonState, start_tag: float):
+        self.running += 1
+        state.running += 1
+        self.virtual_time = max(self.virtual_time, start_tag)
+        metrics.SYNTHESIS_RUNNING.inc()
+
+    async def acquire(self, salon_id, timeout: float = None) -> float:
+        """Wait for a synthesis slot (at most timeout, default queue_timeout); returns the seconds spent queued.
+
+        Raises AdmissionRejected.
+        """
+        state = self.salons.setdefault(salon_id, _SalonState())
+        start_tag = max(self.virtual_time, state.last_tag)
+        finish_tag = start_tag + 1 / self.weight(salon_id)
+
+        # Waiters only remain queued while slots are full or their salon is at its cap
+        if self.running < self.max_concurrency and state.running < self.salon_concurrency:
+            state.last_tag = finish_tag
+            self._start(salon_id, state, start_tag)
+            self.stats.record_admit(salon_id, self.weight(salon_id), 0.0)
+            return 0.0
+
+        position = self._position(finish_tag)
+        if state.queued >= self.salon_queue:
+            self._reject(salon_id, "salon_queue_full", position, state.queued)
+        if len(self.waiters) >= self.max_queue:
+            self._reject(salon_id, "queue_full", position, state.queued)
+
+        waiter = _Waiter(salon_id, start_tag, finish_tag, next(self._seq), asyncio.get_running_loop().create_future())
+        self.waiters.append(waiter)
+        state.queued += 1
+        state.last_tag = finish_tag
+        metrics.SYNTHESIS_QUEUED.inc()
+        enqueued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout if timeout is None else timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the wait ended: give the slot back
+                self.release(salon_id, None)
+            else:
+                self._dequeue(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(salon_id, "queue_timeout", self._position(finish_tag), state.queued)
+        wait = time.perf_counter() - enqueued_at
+        self.stats.record_admit(salon_id, self.weight(salon_id), wait)
+        return wait
+
+    def _dequeue(self, waiter: _Waiter):
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+            self.salons[waiter.salon_id].queued -= 1
+            metrics.SYNTHESIS_QUEUED.dec()
+            self._forget(waiter.salon_id)
+
+    def _forget(self, salon_id):
+        state = self.salons.get(salon_id)
+        if state and not state.running and not state.queued:
+            del self.salons[salon_id]
+
+    def release(self, salon_id, seconds: float = None):
+        """Return a slot; seconds (time spent in the slot) feeds the wait estimate"""
+        state = self.salons[salon_id]
+        self.running -= 1
+        state.running -= 1
+        metrics.SYNTHESIS_RUNNING.dec()
+        if seconds is not None:
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (seconds - self.service_seconds)
+        self._forget(salon_id)
+        self._dispatch()
+
+    def try_acquire(self, salon_id) -> bool:
+        """Take a slot only if one is free right now and no queued request is waiting for it"""
+        state = self.salons.get(salon_id)
+        if (self.waiters or self.running >= self.max_concurrency
+                or (state is not None and state.running >= self.salon_concurrency)):
+            return False
+        state = self.salons.setdefault(salon_id, _SalonState())
+        self._start(salon_id, state, self.virtual_time)
+        return True
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency:
+            eligible = [w for w in self.waiters if self.salons[w.salon_id].running < self.salon_concurrency]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w.finish_tag, w.seq))
+            self.waiters.remove(waiter)
+            state = self.salons[waiter.salon_id]
+            state.queued -= 1
+            metrics.SYNTHESIS_QUEUED.dec()
+            if waiter.future.done():
+                # Cancelled while queued (the client went away)
+                self._forget(waiter.salon_id)
+                continue
+            self._start(waiter.salon_id, state, waiter.start_tag)
+            waiter.future.set_result(None)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "salon_concurrency": self.salon_concurrency,
+            "salon_queue": self.salon_queue,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": len(self.waiters),
+            "service_seconds_estimate": round(self.service_seconds, 3),
+            **self.stats.snapshot(),
+        }
+
+class Slot:
+    """One admitted slot. Returned once its holder closes it and the model call
+    running on it, if any, has actually returned: an abandoned call's thread
+    keeps using the upstream API after the request is done with it.
+    Runs on the event loop, like FairAdmission.
+    """
+
+    def __init__(self, controller: FairAdmission, salon_id, waited: float = 0.0):
+        self.controller = controller
+        self.salon_id = salon_id
+        self.waited = waited
+        self.busy = False
+        self.closed = False
+        self._started = time.perf_counter()
+
+    def attach(self, future):
+        """Mark the slot busy until a worker-thread call (concurrent.futures.Future) completes"""
+        loop = asyncio.get_running_loop()
+        self.busy = True
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._call_returned)
+            except RuntimeError:
+                pass  # loop already closed
+
+        future.add_done_callback(done)
+
+    def try_extra(self):
+        """Another slot for the same salon if one is free right now, else None"""
+        if self.controller.try_acquire(self.salon_id):
+            return Slot(self.controller, self.salon_id)
+        return None
+
+    def _call_returned(self):
+        self.busy = False
+        if self.closed:
+            self._release()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if not self.busy:
+            self._release()
+
+    def _release(self):
+        self.controller.release(self.salon_id, time.perf_counter() - self._started)
+
+CONTROLLER = FairAdmission()
+
+def get_stats() -> dict:
+    return CONTROLLER.snapshot()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import process_lock
+
+# Gemini 클라이언트 (지연 초기화 + 모델 목록 캐시)
+# google.generativeai takes about a second to import, so it is imported and
+# configured on first use, or by the discovery task once the server is up,
+# instead of at startup. The models supporting generateContent are listed in
+# the background and cached in the runtime dir, so restarted and sibling
+# workers skip the network call while the list is fresh.
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+IMAGE_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "gemini-3-pro-image-preview")
+# Faster tiers tried after IMAGE_MODEL when it is slow or fails (see hedging_service); empty disables them
+FALLBACK_MODELS = [name.strip() for name in os.getenv("GEMINI_FALLBACK_MODELS", "").split(",")
+                   if name.strip() and name.strip() != IMAGE_MODEL]
+
+MODEL_DISCOVERY_TTL_SECONDS = float(os.getenv("MODEL_DISCOVERY_TTL_SECONDS", "21600"))
+MODEL_DISCOVERY_TIMEOUT_SECONDS = float(os.getenv("MODEL_DISCOVERY_TIMEOUT_SECONDS", "20"))
+MODEL_DISCOVERY_RETRY_SECONDS = float(os.getenv("MODEL_DISCOVERY_RETRY_SECONDS", "300"))
+MODEL_DISCOVERY_ENABLED = os.getenv("MODEL_DISCOVERY_ENABLED", "true").lower() in ("1", "true", "yes")
+MODELS_CACHE_FILE = process_lock.RUNTIME_DIR / "gemini_models.json"
+# Workers starting together wait for one listing instead of each making the call
+DISCOVERY_LOCK = process_lock.ProcessLock(process_lock.RUNTIME_DIR / "gemini-models.lock")
+
+_genai = None
+_client_lock = threading.Lock()
+
+def client():
+    """The configured google.generativeai module, imported on first use"""
+    global _genai
+    if _genai is None:
+        with _client_lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+def is_loaded() -> bool:
+    return _genai is not None
+
+def generative_model(model_name: str):
+    return client().GenerativeModel(model_name)
+
+def image_model_tiers() -> list:
+    """IMAGE_MODEL followed by the fallback tiers the API lists (all of them until discovery has run)"""
+    listed = set(DISCOVERY.models)
+    return [IMAGE_MODEL] + [name for name in FALLBACK_MODELS if not listed or name in listed]
+
+class ModelDiscovery:
+    """Outcome of the last model listing in this process"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.models = []
+        self.checked_at = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def succeed(self, models: list, checked_at: float):
+        with self._lock:
+            self.status = "ready"
+            self.models = models
+            self.checked_at = checked_at
+            self.error = None
+
+    def fail(self, error: str):
+        with self._lock:
+            # Keep serving the last known list; only the error is new
+            self.status = "error" if not self.models else "stale"
+            self.error = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status if GEMINI_API_KEY and MODEL_DISCOVERY_ENABLED
+                else "unlisted" if GEMINI_API_KEY else "disabled",
+                "client_loaded": is_loaded(),
+                "image_model": IMAGE_MODEL,
+                "image_model_listed": IMAGE_MODEL in self.models if self.models else None,
+                "fallback_models": FALLBACK_MODELS,
+                "models": len(self.models),
+                "checked_at": self.checked_at,
+                "error": self.error,
+            }
+
+DISCOVERY = ModelDiscovery()
+
+def _read_cached_models():
+    try:
+        data = json.loads(MODELS_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if time.time() - data.get("checked_at", 0) > MODEL_DISCOVERY_TTL_SECONDS:
+        return None
+    return data
+
+def _write_cached_models(data: dict):
+    tmp_path = MODELS_CACHE_FILE.with_name(f"{MODELS_CACHE_FILE.name}.{os.getpid()}")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp_path, MODELS_CACHE_FILE)
+
+def discover_models() -> dict:
+    """Model names supporting generateContent, from the cache file or the API (blocking)"""
+    genai = client()
+    process_lock.RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+    with DISCOVERY_LOCK:
+        data = _read_cached_models()
+        if data is None:
+            from google.api_core import retry
+
+            # timeout alone bounds each attempt; the default retry policy keeps trying for 60s
+            options = {"timeout": MODEL_DISCOVERY_TIMEOUT_SECONDS,
+                       "retry": retry.Retry(timeout=MODEL_DISCOVERY_TIMEOUT_SECONDS)}
+            listed = genai.list_models(request_options=options)
+            names = sorted(m.name.removeprefix("models/") for m in listed
+                           if "generateContent" in m.supported_generation_methods)
+            data = {"checked_at": time.time(), "models": names}
+            _write_cached_models(data)
+    return data
+
+def _start_discovery() -> asyncio.Future:
+    """Run discover_models in a daemon thread, so a hung call can't hold up shutdown"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, error):
+        if not future.done():
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def run():
+        result, error = None, None
+        try:
+            result = discover_models()
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            pass  # loop already closed
+
+    threading.Thread(target=run, name="gemini-discovery", daemon=True).start()
+    return future
+
+async def run_model_discovery():
+    """Refresh the model list every MODEL_DISCOVERY_TTL_SECONDS (retrying sooner after errors)"""
+    pending = None
+    while True:
+        try:
+            # A call that outlived its timeout is waited on again rather than started twice
+            if pending is None or pending.done():
+                pending = _start_discovery()
+            data = await asyncio.wait_for(asyncio.shield(pending), MODEL_DISCOVERY_TIMEOUT_SECONDS * 2)
+            DISCOVERY.succeed(data["models"], data["checked_at"])
+            print(f"Gemini models available: {len(data['models'])}")
+            delay = MODEL_DISCOVERY_TTL_SECONDS
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error listing Gemini models: {e!r}")
+            DISCOVERY.fail(repr(e))
+            delay = MODEL_DISCOVERY_RETRY_SECONDS
+        await asyncio.sleep(delay)
+
+def get_status() -> dict:
+    return DISCOVERY.snapshot()
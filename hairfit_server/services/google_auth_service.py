@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt as google_jwt
+
+import metrics
+from cache import TTLCache
+
+# 구글 로그인 검증 (공유 HTTP 세션 + 인증서 캐시 + access token 캐시)
+# Endpoints are configurable so tests and staging can point at a stub issuer.
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v3/userinfo")
+GOOGLE_ISSUERS = tuple(os.getenv("GOOGLE_ISSUERS", "accounts.google.com,https://accounts.google.com").split(","))
+
+GOOGLE_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_CONNECT_TIMEOUT", "3"))
+GOOGLE_READ_TIMEOUT = float(os.getenv("GOOGLE_READ_TIMEOUT", "5"))
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "10"))
+GOOGLE_ACCESS_TOKEN_CACHE_TTL = float(os.getenv("GOOGLE_ACCESS_TOKEN_CACHE_TTL", "300"))
+
+CERTS_DEFAULT_MAX_AGE = 3600
+# An unknown key id triggers an early refetch (key rotation), at most this often
+CERTS_MIN_REFETCH_SECONDS = 60
+CLOCK_SKEW_SECONDS = 10
+
+class GoogleAuthError(Exception):
+    """The token is invalid, expired or not meant for us (401)"""
+
+class GoogleUnavailable(Exception):
+    """Google could not be reached or answered with an error (503)"""
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=GOOGLE_HTTP_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Shared across requests so TLS connections to Google are reused
+SESSION = _build_session()
+
+def _get(url: str, **kwargs) -> requests.Response:
+    try:
+        return SESSION.get(url, timeout=(GOOGLE_CONNECT_TIMEOUT, GOOGLE_READ_TIMEOUT), **kwargs)
+    except requests.RequestException as e:
+        raise GoogleUnavailable(f"Request to {url} failed: {e}")
+
+def cache_lifetime(response: requests.Response) -> float:
+    """Seconds a response may be cached, from Cache-Control max-age minus Age"""
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if not match:
+        return CERTS_DEFAULT_MAX_AGE
+    try:
+        age = int(response.headers.get("Age", "0"))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+class CertCache:
+    """Google's signing certificates, refreshed when the upstream cache lifetime ends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.certs = {}
+        self.expires_at = 0.0
+        self.fetched_at = float("-inf")
+        self.fetches = 0
+
+    def get(self, key_id: str = None) -> dict:
+        now = time.monotonic()
+        # One thread refreshes while the others wait for its result
+        with self._lock:
+            expired = now >= self.expires_at
+            rotated = (
+                key_id is not None and key_id not in self.certs
+                and now - self.fetched_at >= CERTS_MIN_REFETCH_SECONDS
+            )
+            metrics.record_cache("google_certs", not (expired or rotated))
+            if expired or rotated:
+                try:
+                    self._refresh(now)
+                except GoogleUnavailable:
+                    # Keep verifying with the previous keys while Google is unreachable
+                    if not self.certs:
+                        raise
+            return self.certs
+
+    def _refresh(self, now: float):
+        response = _get(GOOGLE_CERTS_URL)
+        if response.status_code != 200:
+            raise GoogleUnavailable(f"Certificate endpoint returned {response.status_code}")
+        self.certs = response.json()
+        self.fetched_at = now
+        self.expires_at = now + cache_lifetime(response)
+        self.fetches += 1
+
+    def clear(self):
+        with self._lock:
+            self.certs = {}
+            self.expires_at = 0.0
+            self.fetched_at = float("-inf")
+
+CERTS = CertCache()
+ACCESS_TOKEN_CACHE = TTLCache(maxsize=10000, ttl=GOOGLE_ACCESS_TOKEN_CACHE_TTL, name="google_access_token")
+
+def verify_id_token(token: str) -> dict:
+    """Verify a Google ID token's signature, audience, expiry and issuer; returns its claims"""
+    try:
+        header = google_jwt.decode_header(token)
+    except (ValueError, TypeError) as e:
+        raise GoogleAuthError(f"Malformed ID token: {e}")
+
+    certs = CERTS.get(header.get("kid"))
+    try:
+        claims = google_jwt.decode(
+            token, certs=certs, audience=GOOGLE_CLIENT_ID, clock_skew_in_seconds=CLOCK_SKEW_SECONDS
+        )
+    except (ValueError, google_exceptions.GoogleAuthError) as e:
+        raise GoogleAuthError(str(e))
+
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise GoogleAuthError(f"Wrong issuer: {claims.get('iss')}")
+    return claims
+
+def verify_access_token(token: str) -> dict:
+    """Resolve an OAuth access token to Google's userinfo, cached briefly by token hash"""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    userinfo = ACCESS_TOKEN_CACHE.get(key)
+    if userinfo is not None:
+        return userinfo
+
+    response = _get(GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {token}"})
+    if response.status_code in (400, 401, 403):
+        raise GoogleAuthError("Invalid Google Access Token")
+    if response.status_code != 200:
+        raise GoogleUnavailable(f"Userinfo endpoint returned {response.status_code}")
+
+    userinfo = response.json()
+    ACCESS_TOKEN_CACHE.set(key, userinfo)
+    return userinfo
+
+def get_stats() -> dict:
+    return {
+        "cert_fetches": CERTS.fetches,
+        "cert_keys": len(CERTS.certs),
+        "access_token_cache": ACCESS_TOKEN_CACHE.stats(),
+    }
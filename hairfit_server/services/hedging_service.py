@@ -0,0 +1,299 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import metrics
+from services import admission_service, gemini_service
+
+# 합성 모델 호출 (요청별 시간 예산 + 모델 티어 헤징)
+# Every synthesis request gets a deadline: SYNTHESIS_DEADLINE_SECONDS unless
+# the client asks for a shorter or longer one, capped at
+# SYNTHESIS_MAX_DEADLINE_SECONDS. The primary model is called first; if it
+# has not answered by its SYNTHESIS_HEDGE_PERCENTILE latency (or soon enough
+# for the next tier to still finish in time), the next tier is called:
+#   hedge  - both calls race and the first answer wins
+#   switch - the slow call is abandoned and only the next tier is awaited
+#   off    - only the primary model is used
+# A tier that fails outright hands over to the next one in every mode but off.
+# Abandoned calls cannot be interrupted in their thread; the SDK request
+# timeout (the remaining budget) bounds how long they linger. Every call holds
+# an admission slot until its thread returns, so a hedge or switch only starts
+# when the controller has a spare slot, and calls run in their own bounded pool.
+SYNTHESIS_DEADLINE_SECONDS = float(os.getenv("SYNTHESIS_DEADLINE_SECONDS", "45"))
+SYNTHESIS_MAX_DEADLINE_SECONDS = float(os.getenv("SYNTHESIS_MAX_DEADLINE_SECONDS", "90"))
+SYNTHESIS_HEDGE_MODE = os.getenv("SYNTHESIS_HEDGE_MODE", "hedge").lower()
+SYNTHESIS_HEDGE_PERCENTILE = float(os.getenv("SYNTHESIS_HEDGE_PERCENTILE", "0.9"))
+# Hedge delay until a model has LATENCY_MIN_SAMPLES answers in this process
+SYNTHESIS_HEDGE_DELAY_SECONDS = float(os.getenv("SYNTHESIS_HEDGE_DELAY_SECONDS", "25"))
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+HEDGE_MODES = ("hedge", "switch", "off")
+# One thread per admission slot is enough: a call never runs without one
+GEMINI_CALL_WORKERS = int(os.getenv("GEMINI_CALL_WORKERS", str(admission_service.SYNTHESIS_MAX_CONCURRENCY)))
+
+class DeadlineExceeded(Exception):
+    """No model tier answered within the request's deadline"""
+
+    def __init__(self, deadline: float, attempts: list):
+        super().__init__(f"No model answered within {deadline:g}s")
+        self.deadline = deadline
+        self.attempts = attempts
+
+class HedgeStats:
+    """Recent latencies per model and how requests were served (/health/synthesis)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.requests = 0
+        self.hedged = 0
+        self.switched = 0
+        self.failed_over = 0
+        self.deadline_exceeded = 0
+        self.failed = 0
+        self.hedges_skipped = 0
+        self.served = {}
+
+    def add_latency(self, model: str, seconds: float):
+        with self._lock:
+            self.latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """q-quantile of the model's recent latencies, None until LATENCY_MIN_SAMPLES are known"""
+        with self._lock:
+            samples = sorted(self.latencies.get(model, ()))
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def record(self, outcome: dict):
+        with self._lock:
+            self.requests += 1
+            for attempt in outcome["attempts"][1:]:
+                name = {"hedge": "hedged", "switch": "switched", "failover": "failed_over"}[attempt["reason"]]
+                setattr(self, name, getattr(self, name) + 1)
+            self.hedges_skipped += outcome["hedge_skipped"]
+            if outcome["model"]:
+                self.served[outcome["model"]] = self.served.get(outcome["model"], 0) + 1
+            elif outcome["deadline_exceeded"]:
+                self.deadline_exceeded += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "switched": self.switched,
+                "failed_over": self.failed_over,
+                "deadline_exceeded": self.deadline_exceeded,
+                "failed": self.failed,
+                "hedges_skipped": self.hedges_skipped,
+                "served": dict(self.served),
+            }
+            models = list(self.latencies)
+        latencies = {
+            model: {
+                "p50": self.percentile(model, 0.5),
+                f"p{SYNTHESIS_HEDGE_PERCENTILE * 100:g}": self.percentile(model, SYNTHESIS_HEDGE_PERCENTILE),
+            }
+            for model in models
+        }
+        return {
+            "mode": SYNTHESIS_HEDGE_MODE,
+            "tiers": gemini_service.image_model_tiers(),
+            "deadline_seconds": SYNTHESIS_DEADLINE_SECONDS,
+            "max_deadline_seconds": SYNTHESIS_MAX_DEADLINE_SECONDS,
+            "call_workers": GEMINI_CALL_WORKERS,
+            **counts,
+            "hedge_rate": round((counts["hedged"] + counts["switched"]) / counts["requests"], 4)
+            if counts["requests"] else 0.0,
+            "latency_seconds": latencies,
+        }
+
+STATS = HedgeStats()
+_executor = ThreadPoolExecutor(max_workers=GEMINI_CALL_WORKERS, thread_name_prefix="gemini-call")
+
+def resolve_deadline(requested: Optional[float]) -> float:
+    """The client's deadline (or the default), capped by SYNTHESIS_MAX_DEADLINE_SECONDS"""
+    if requested is None or requested <= 0:
+        requested = SYNTHESIS_DEADLINE_SECONDS
+    return min(requested, SYNTHESIS_MAX_DEADLINE_SECONDS)
+
+def hedge_delay(model: str, next_model: str, remaining: float) -> float:
+    """Seconds to wait on `model` before calling `next_model`"""
+    delay = STATS.percentile(model, SYNTHESIS_HEDGE_PERCENTILE)
+    if delay is None:
+        delay = SYNTHESIS_HEDGE_DELAY_SECONDS
+    # Leave the next tier its typical latency before the deadline
+    typical = STATS.percentile(next_model, 0.5)
+    if typical is not None:
+        delay = min(delay, remaining - typical)
+    return max(0.0, min(delay, remaining))
+
+def _call(model_name: str, contents, timeout: float):
+    """One blocking generate_content call; runs in a worker thread"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        model = gemini_service.generative_model(model_name)
+        response = model.generate_content(contents, request_options={"timeout": max(1.0, timeout)})
+        outcome = "ok"
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.GEMINI_LATENCY.labels(model_name, outcome).observe(elapsed)
+        # Timed-out calls count too, or the percentile would only see the fast ones
+        if outcome == "ok" or elapsed >= timeout:
+            STATS.add_latency(model_name, elapsed)
+
+async def generate(contents, deadline: float, sent_bytes: int = 0, tiers: list = None, mode: str = None,
+                   slot: admission_service.Slot = None):
+    """(response, outcome) from the first model tier to answer within deadline seconds.
+
+    outcome holds the serving model and tier, whether a later tier was called
+    and every attempt made. Raises DeadlineExceeded, or the last tier's error
+    when every tier failed. The primary call runs on `slot`; hedges and
+    switches need a spare one from its controller and are skipped without.
+    """
+    tiers = tiers or gemini_service.image_model_tiers()
+    mode = mode or SYNTHESIS_HEDGE_MODE
+    if mode not in HEDGE_MODES:
+        mode = "hedge"
+    started = time.perf_counter()
+    deadline_at = started + deadline
+    attempts = []
+    running = {}
+    held = [slot] if slot is not None else []
+    last_error = None
+
+    def take_slot():
+        """(slot or None, ok): an idle slot this request holds, else a spare one from the controller"""
+        if slot is None:
+            return None, True
+        for candidate in held:
+            if not candidate.busy:
+                return candidate, True
+        extra = slot.try_extra()
+        if extra is None:
+            return None, False
+        held.append(extra)
+        return extra, True
+
+    def launch(tier: int, reason: str):
+        """Start a call on tiers[tier]; returns its task, or None when no slot is free"""
+        call_slot, ok = take_slot()
+        if not ok:
+            return None
+        now = time.perf_counter()
+        attempt = {"model": tiers[tier], "tier": tier, "reason": reason,
+                   "started_after": round(now - started, 3), "outcome": "pending", "_started": now}
+        metrics.GEMINI_BYTES.labels(tiers[tier], "sent").observe(sent_bytes)
+        if reason != "primary":
+            metrics.SYNTHESIS_HEDGES.labels(tiers[tier], reason).inc()
+        future = _executor.submit(_call, tiers[tier], contents, deadline_at - now)
+        if call_slot is not None:
+            # Attached before wrapping, so the slot is idle again by the time the task completes
+            call_slot.attach(future)
+        task = asyncio.wrap_future(future)
+        running[task] = attempt
+        attempts.append(attempt)
+        return task
+
+    def finish(model: Optional[str], tier: Optional[int], exceeded: bool = False) -> dict:
+        for attempt in attempts:
+            attempt.pop("_started", None)
+        outcome = {
+            "model": model,
+            "tier": tier,
+            "hedged": any(attempt["reason"] in ("hedge", "switch") for attempt in attempts),
+            "hedge_skipped": hedge_skipped,
+            "deadline_seconds": round(deadline, 3),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "deadline_exceeded": exceeded,
+            "attempts": attempts,
+        }
+        STATS.record(outcome)
+        return outcome
+
+    launch(0, "primary")
+    next_tier = 1
+    exceeded = False
+    hedge_skipped = False
+    try:
+        while True:
+            now = time.perf_counter()
+            remaining = deadline_at - now
+            if remaining <= 0:
+                exceeded = True
+                break
+            escalate = mode != "off" and next_tier < len(tiers)
+            if not running:
+                # The failed call's slot is idle again, so a failover always finds one
+                if not escalate or launch(next_tier, "failover") is None:
+                    break
+                next_tier += 1
+                continue
+
+            timeout = remaining
+            hedge = escalate and not hedge_skipped
+            if hedge:
+                latest = attempts[-1]
+                delay = hedge_delay(latest["model"], tiers[next_tier], deadline_at - latest["_started"])
+                timeout = min(remaining, max(0.0, latest["_started"] + delay - now))
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            failed = False
+            for task in done:
+                attempt = running.pop(task)
+                try:
+                    response = task.result()
+                except Exception as e:
+                    attempt["outcome"] = "error"
+                    attempt["error"] = str(e) or repr(e)
+                    last_error = e
+                    failed = True
+                    continue
+                attempt["outcome"] = "ok"
+                metrics.SYNTHESIS_MODEL_SERVED.labels(attempt["model"], str(attempt["tier"])).inc()
+                return response, finish(attempt["model"], attempt["tier"])
+
+            if failed and escalate:
+                if launch(next_tier, "failover") is not None:
+                    next_tier += 1
+            elif not done and hedge and time.perf_counter() < deadline_at:
+                task = launch(next_tier, mode)
+                if task is None:
+                    # Every slot is taken: keep waiting on the calls already running
+                    hedge_skipped = True
+                    continue
+                next_tier += 1
+                if mode == "switch":
+                    for other, attempt in list(running.items()):
+                        if other is not task:
+                            other.cancel()
+                            attempt["outcome"] = "abandoned"
+                            del running[other]
+    finally:
+        for task, attempt in running.items():
+            task.cancel()
+            if attempt["outcome"] == "pending":
+                attempt["outcome"] = "abandoned"
+        # Spare slots go back once their calls return; the caller closes its own
+        for extra in held[1:]:
+            extra.close()
+
+    if not exceeded:
+        # Every tier failed before the deadline
+        finish(None, None)
+        raise last_error
+    metrics.SYNTHESIS_DEADLINE_EXCEEDED.inc()
+    raise DeadlineExceeded(deadline, finish(None, None, exceeded=True)["attempts"])
+
+def get_stats() -> dict:
+    return STATS.snapshot()
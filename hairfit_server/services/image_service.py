@@ -0,0 +1,285 @@
+import asyncio
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from PIL import Image, ImageOps
+from sqlalchemy import select
+
+import database, metrics, models
+from services import storage_service
+
+# 합성 결과 이미지 인코딩 (WebP/JPEG + 미리보기)
+# Gemini returns large PNGs. Results are transcoded in a dedicated worker pool
+# and stored in two size classes: the full image (long side capped at
+# RESULT_FULL_MAX_SIZE) and a preview for history grids and thumbnails.
+# Full-size JPEGs keep 4:4:4 chroma so skin tones and hair edges don't bleed;
+# the preview uses the encoder defaults. If transcoding would not make an
+# unresized image smaller, the original bytes are kept.
+RESULT_IMAGE_FORMAT = os.getenv("RESULT_IMAGE_FORMAT", "webp").lower()
+RESULT_IMAGE_QUALITY = int(os.getenv("RESULT_IMAGE_QUALITY", "90"))
+RESULT_FULL_MAX_SIZE = int(os.getenv("RESULT_FULL_MAX_SIZE", "2048"))
+RESULT_PREVIEW_MAX_SIZE = int(os.getenv("RESULT_PREVIEW_MAX_SIZE", "512"))
+RESULT_PREVIEW_QUALITY = int(os.getenv("RESULT_PREVIEW_QUALITY", "80"))
+IMAGE_ENCODE_WORKERS = int(os.getenv("IMAGE_ENCODE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Results are written at synthesis time; those never saved to a history are removed after this long
+RESULT_ORPHAN_TTL_SECONDS = int(os.getenv("RESULT_ORPHAN_TTL_SECONDS", "86400"))
+RESULT_SWEEP_INTERVAL_SECONDS = int(os.getenv("RESULT_SWEEP_INTERVAL_SECONDS", "3600"))
+WEBP_METHOD = 4
+PREVIEW_SUFFIX = ".preview"
+RESULTS_DIR = "results"
+
+# Pillow format name -> (file extension, MIME type)
+FORMATS = {
+    "WEBP": ("webp", "image/webp"),
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+}
+
+class ImageEncodeError(Exception):
+    """The model output could not be decoded as an image"""
+
+class EncodeStats:
+    """Bytes saved and encode time for synthesis results"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.kept_original = 0
+        self.failed = 0
+        self.original_bytes = 0
+        self.full_bytes = 0
+        self.preview_bytes = 0
+        self.encode_seconds_total = 0.0
+        self.encode_seconds_max = 0.0
+        self.orphans_removed = 0
+
+    def record(self, original: int, full: int, preview: int, seconds: float, kept_original: bool):
+        with self._lock:
+            self.encoded += 1
+            self.kept_original += kept_original
+            self.original_bytes += original
+            self.full_bytes += full
+            self.preview_bytes += preview
+            self.encode_seconds_total += seconds
+            self.encode_seconds_max = max(self.encode_seconds_max, seconds)
+
+    def increment(self, name: str, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "format": RESULT_IMAGE_FORMAT,
+                "quality": RESULT_IMAGE_QUALITY,
+                "full_max_size": RESULT_FULL_MAX_SIZE,
+                "preview_max_size": RESULT_PREVIEW_MAX_SIZE,
+                "workers": IMAGE_ENCODE_WORKERS,
+                "encoded": self.encoded,
+                "kept_original": self.kept_original,
+                "failed": self.failed,
+                "original_bytes": self.original_bytes,
+                "full_bytes": self.full_bytes,
+                "preview_bytes": self.preview_bytes,
+                "bytes_saved": self.original_bytes - self.full_bytes,
+                "full_ratio": round(self.full_bytes / self.original_bytes, 4) if self.original_bytes else None,
+                "encode_seconds_total": round(self.encode_seconds_total, 6),
+                "encode_seconds_max": round(self.encode_seconds_max, 6),
+                "encode_seconds_avg": round(self.encode_seconds_total / self.encoded, 6) if self.encoded else 0.0,
+                "orphans_removed": self.orphans_removed,
+            }
+
+STATS = EncodeStats()
+_executor = ThreadPoolExecutor(max_workers=IMAGE_ENCODE_WORKERS, thread_name_prefix="image-encode")
+
+def preview_path(photo_path: Optional[str], ext: str = None) -> Optional[str]:
+    """results/x.png -> results/x.preview.<ext> (same extension by default); None for other directories"""
+    if not photo_path or not photo_path.startswith(f"{RESULTS_DIR}/"):
+        return None
+    stem, dot, own_ext = photo_path.rpartition(".")
+    if not dot or stem.endswith(PREVIEW_SUFFIX):
+        return None
+    return f"{stem}{PREVIEW_SUFFIX}.{ext or own_ext}"
+
+def find_preview(photo_path: Optional[str]) -> Optional[str]:
+    """Stored preview of a result path, or None (uploaded results and older rows have none)"""
+    for ext, _ in FORMATS.values():
+        preview = preview_path(photo_path, ext)
+        path = storage_service.resolve_upload_path(preview)
+        if path is None:
+            return None
+        if path.exists():
+            return preview
+    return None
+
+def preview_paths(photo_paths: Iterable[str]) -> set:
+    """Existing preview files of the given result paths"""
+    return {preview for preview in map(find_preview, photo_paths) if preview}
+
+def _prepare(image: Image.Image, image_format: str) -> Image.Image:
+    if image_format == "JPEG":
+        return image if image.mode in ("RGB", "L") else image.convert("RGB")
+    if image.mode in ("RGB", "RGBA", "L"):
+        return image
+    return image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+def _encode(image: Image.Image, image_format: str, quality: int, max_size: int, full: bool, icc) -> tuple:
+    """(encoded bytes, resized?)"""
+    resized = max(image.size) > max_size
+    if resized:
+        image = image.copy()
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    options = {"quality": quality}
+    if icc:
+        options["icc_profile"] = icc
+    if image_format == "JPEG":
+        options.update(optimize=True, progressive=True)
+        if full:
+            options["subsampling"] = 0
+    else:
+        options["method"] = WEBP_METHOD
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue(), resized
+
+def encode_result(data: bytes, image_format: str = None, quality: int = None) -> dict:
+    """Full and preview encodings of a model output image (blocking; runs in the encode pool)"""
+    image_format = (image_format or RESULT_IMAGE_FORMAT).upper()
+    if image_format == "JPG":
+        image_format = "JPEG"
+    if image_format not in ("WEBP", "JPEG"):
+        raise ValueError(f"Unsupported result format: {image_format}")
+    quality = quality or RESULT_IMAGE_QUALITY
+
+    started = time.perf_counter()
+    try:
+        source = Image.open(io.BytesIO(data))
+        source.load()
+    except Exception as e:
+        STATS.increment("failed")
+        raise ImageEncodeError(f"Model returned an unreadable image: {e}") from e
+    icc = source.info.get("icc_profile")
+    image = _prepare(ImageOps.exif_transpose(source), image_format)
+
+    full, resized = _encode(image, image_format, quality, RESULT_FULL_MAX_SIZE, True, icc)
+    full_format = image_format
+    kept_original = not resized and len(full) >= len(data) and source.format in FORMATS
+    if kept_original:
+        full, full_format = data, source.format
+    preview, _ = _encode(image, image_format, RESULT_PREVIEW_QUALITY, RESULT_PREVIEW_MAX_SIZE, False, icc)
+    seconds = time.perf_counter() - started
+
+    STATS.record(len(data), len(full), len(preview), seconds, kept_original)
+    metrics.RESULT_ENCODE_LATENCY.labels(image_format.lower()).observe(seconds)
+    for size_class, size in (("original", len(data)), ("full", len(full)), ("preview", len(preview))):
+        metrics.RESULT_IMAGE_BYTES.labels(size_class).observe(size)
+    return {
+        "full": full,
+        "full_format": full_format,
+        "preview": preview,
+        "preview_format": image_format,
+        "width": image.width,
+        "height": image.height,
+        "original_bytes": len(data),
+        "encode_ms": round(seconds * 1000, 2),
+    }
+
+def _write(photo_path: str, data: bytes):
+    path = storage_service.UPLOAD_DIR / photo_path
+    temp = path.with_name(f".{path.name}.tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+def _store(data: bytes) -> dict:
+    encoded = encode_result(data)
+    name = uuid.uuid4()
+    full_ext, mime_type = FORMATS[encoded["full_format"]]
+    full_path = f"{RESULTS_DIR}/{name}.{full_ext}"
+    # Named after the full file so it can be found (and removed) from the history row alone
+    preview = preview_path(full_path, FORMATS[encoded["preview_format"]][0])
+    # Preview first: the sweeper finds pipeline results through their previews
+    _write(preview, encoded["preview"])
+    _write(full_path, encoded["full"])
+    return {
+        "photo_path": full_path,
+        "preview_path": preview,
+        "mime_type": mime_type,
+        "full": encoded["full"],
+        "encoding": {
+            "format": encoded["full_format"].lower(),
+            "width": encoded["width"],
+            "height": encoded["height"],
+            "original_bytes": encoded["original_bytes"],
+            "full_bytes": len(encoded["full"]),
+            "preview_bytes": len(encoded["preview"]),
+            "encode_ms": encoded["encode_ms"],
+        },
+    }
+
+async def store_result(data: bytes) -> dict:
+    """Transcode a synthesis result and write both size classes under uploads/results"""
+    return await asyncio.wrap_future(_executor.submit(_store, data))
+
+def _full_path_of(preview_file) -> Optional[str]:
+    """Stored full-size path of a preview file (either extension)"""
+    stem = preview_file.name[:-len(preview_file.suffix)][:-len(PREVIEW_SUFFIX)]
+    for ext, _ in FORMATS.values():
+        if (preview_file.parent / f"{stem}.{ext}").exists():
+            return f"{RESULTS_DIR}/{stem}.{ext}"
+    return None
+
+def sweep_orphan_results(db, ttl: int = RESULT_ORPHAN_TTL_SECONDS, now: float = None) -> int:
+    """Remove pipeline results older than ttl that no history row references; returns files queued"""
+    cutoff = (now or time.time()) - ttl
+    candidates = {}
+    for preview_file in (storage_service.UPLOAD_DIR / RESULTS_DIR).glob(f"*{PREVIEW_SUFFIX}.*"):
+        try:
+            if preview_file.stat().st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        candidates[f"{RESULTS_DIR}/{preview_file.name}"] = _full_path_of(preview_file)
+
+    full_paths = [path for path in candidates.values() if path]
+    referenced = set()
+    for start in range(0, len(full_paths), 500):
+        batch = full_paths[start:start + 500]
+        referenced.update(db.execute(
+            select(models.SynthesisHistory.result_photo_path)
+            .where(models.SynthesisHistory.result_photo_path.in_(batch))
+        ).scalars())
+
+    orphaned = set()
+    for preview, full in candidates.items():
+        if full not in referenced:
+            orphaned.add(preview)
+            if full:
+                orphaned.add(full)
+    queued = storage_service.queue_removal(orphaned)
+    STATS.increment("orphans_removed", queued)
+    return queued
+
+def _sweep_once():
+    db = database.SessionLocal()
+    try:
+        queued = sweep_orphan_results(db)
+        if queued:
+            print(f"Queued {queued} unsaved result images for removal")
+    finally:
+        db.close()
+
+async def run_result_sweeper(interval: int = RESULT_SWEEP_INTERVAL_SECONDS):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_sweep_once)
+        except Exception as e:
+            print(f"Error sweeping result images: {e}")
+
+def get_stats() -> dict:
+    return STATS.snapshot()
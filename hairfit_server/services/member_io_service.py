@@ -0,0 +1,253 @@
+import codecs
+import csv
+import io
+import os
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Iterator, Literal, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+import models
+from services import search_service, sync_service
+
+# 회원 일괄 가져오기/내보내기 (CSV, XLSX)
+# Files are read row by row and written in batches, so memory use does not
+# grow with the size of the salon's customer list.
+IMPORT_BATCH_SIZE = int(os.getenv("MEMBER_IMPORT_BATCH_SIZE", "500"))
+MAX_IMPORT_ROWS = int(os.getenv("MEMBER_IMPORT_MAX_ROWS", "50000"))
+MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+
+FileFormat = Literal["csv", "xlsx"]
+DuplicateMode = Literal["skip", "update"]
+
+EXPORT_COLUMNS = ["name", "phone", "memo", "created_at"]
+# Header aliases seen in exports from other POS systems
+HEADER_ALIASES = {
+    "name": "name", "이름": "name", "고객명": "name", "성명": "name",
+    "phone": "phone", "전화번호": "phone", "연락처": "phone", "휴대폰": "phone", "휴대폰번호": "phone",
+    "memo": "memo", "메모": "memo", "비고": "memo",
+}
+MIN_PHONE_DIGITS, MAX_PHONE_DIGITS = 7, 15
+
+class ImportFormatError(ValueError):
+    """The file cannot be read as a member list at all (as opposed to bad rows)"""
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> FileFormat:
+    if requested:
+        return requested
+    if filename and filename.lower().endswith((".xlsx", ".xlsm")):
+        return "xlsx"
+    return "csv"
+
+def _detect_encoding(sample: bytes) -> str:
+    """utf-8 (with or without BOM), falling back to cp949 for older Korean Excel exports"""
+    try:
+        sample.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still utf-8
+        if e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+            return "utf-8-sig"
+        return "cp949"
+
+def _iter_csv_rows(file) -> Iterator[list]:
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    reader = codecs.getreader(_detect_encoding(sample))(file, errors="strict")
+    try:
+        yield from csv.reader(reader)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Could not read CSV: {e}")
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        text = str(value)
+        # Excel stores 010-... numbers typed without dashes as integers and drops the leading 0
+        if text.startswith("1") and len(text) in (9, 10):
+            text = "0" + text
+        return text
+    return str(value)
+
+def _iter_xlsx_rows(file) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import requires openpyxl")
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Could not read XLSX: {e}")
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+def iter_member_rows(file, file_format: FileFormat) -> Iterator[tuple]:
+    """Yield (row_number, {"name", "phone", "memo"}) for each non-empty data row"""
+    rows = _iter_xlsx_rows(file) if file_format == "xlsx" else _iter_csv_rows(file)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("File is empty")
+    columns = [HEADER_ALIASES.get((cell or "").strip().lower()) for cell in header]
+    if "name" not in columns or "phone" not in columns:
+        raise ImportFormatError("Header row must contain name and phone columns")
+
+    for row_number, row in enumerate(rows, start=2):
+        values = {}
+        for field, cell in zip(columns, row):
+            if field and field not in values:
+                values[field] = (cell or "").strip()
+        if any(values.values()):
+            yield row_number, values
+
+def validate_row(values: dict) -> Optional[str]:
+    if not values.get("name"):
+        return "name is required"
+    digits = search_service.phone_digits(values.get("phone"))
+    if not MIN_PHONE_DIGITS <= len(digits) <= MAX_PHONE_DIGITS:
+        return "phone must contain 7-15 digits"
+    return None
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row: int, error: str, phone: Optional[str] = None):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error, "phone": phone})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+def _existing_phones(db: Session, salon_id: int) -> dict:
+    """Map phone digits -> member id for the salon's current members"""
+    rows = db.execute(
+        select(models.Member.id, models.Member.phone)
+        .where(models.Member.salon_id == salon_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    return {search_service.phone_digits(phone): member_id for member_id, phone in rows}
+
+def _flush_batch(db: Session, salon_id: int, inserts: list, updates: list):
+    now = datetime.utcnow()
+    if inserts:
+        rows = [
+            {"id": str(uuid.uuid4()), "salon_id": salon_id, "created_at": now, "updated_at": now, **values}
+            for values in inserts
+        ]
+        db.execute(insert(models.Member), rows)
+        search_service.index_members(db, [SimpleNamespace(**row) for row in rows])
+        sync_service.record_changes(db, salon_id, sync_service.MEMBER, [row["id"] for row in rows])
+    if updates:
+        db.execute(update(models.Member), [{**values, "updated_at": now} for values in updates])
+        search_service.index_members(db, [
+            SimpleNamespace(salon_id=salon_id, **values) for values in updates
+        ])
+        sync_service.record_changes(db, salon_id, sync_service.MEMBER, [values["id"] for values in updates])
+    # Commit per batch so a large import never holds the write lock for long
+    db.commit()
+
+def import_members(db: Session, salon_id: int, file, file_format: FileFormat,
+                   on_duplicate: DuplicateMode = "skip") -> dict:
+    """Import members from an uploaded CSV/XLSX file.
+
+    Rows are deduplicated by phone digits against the salon and earlier rows
+    of the same file; duplicates are skipped or, with on_duplicate="update",
+    overwrite the existing member's name and memo. Invalid rows are reported
+    and do not stop the import.
+    """
+    report = ImportReport()
+    phones = _existing_phones(db, salon_id)
+    seen_in_file = set()
+    inserts, updates = [], []
+
+    for row_number, values in iter_member_rows(file, file_format):
+        if report.inserted + report.updated + len(inserts) + len(updates) >= MAX_IMPORT_ROWS:
+            report.add_error(row_number, f"row limit of {MAX_IMPORT_ROWS} reached; remaining rows ignored")
+            break
+        error = validate_row(values)
+        if error:
+            report.add_error(row_number, error, values.get("phone"))
+            continue
+
+        digits = search_service.phone_digits(values["phone"])
+        values = {"name": values["name"], "phone": values["phone"], "memo": values.get("memo") or None}
+        if digits in seen_in_file:
+            report.skipped += 1
+            report.add_error(row_number, "duplicate phone in file", values["phone"])
+            continue
+        seen_in_file.add(digits)
+
+        if digits in phones:
+            if on_duplicate == "update":
+                updates.append({"id": phones[digits], **values})
+            else:
+                report.skipped += 1
+        else:
+            inserts.append(values)
+
+        if len(inserts) + len(updates) >= IMPORT_BATCH_SIZE:
+            _flush_batch(db, salon_id, inserts, updates)
+            report.inserted += len(inserts)
+            report.updated += len(updates)
+            inserts, updates = [], []
+
+    _flush_batch(db, salon_id, inserts, updates)
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    return report.as_dict()
+
+def _export_rows(db: Session, salon_id: int):
+    result = db.execute(
+        select(models.Member.name, models.Member.phone, models.Member.memo, models.Member.created_at)
+        .where(models.Member.salon_id == salon_id)
+        .order_by(models.Member.created_at, models.Member.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for name, phone, memo, created_at in result:
+        yield [name, phone, memo or "", created_at.isoformat() if created_at else ""]
+
+def iter_members_csv(db: Session, salon_id: int) -> Iterator[bytes]:
+    """Stream the salon's members as CSV (utf-8 with BOM so Excel shows Hangul correctly)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(EXPORT_COLUMNS)
+    for index, row in enumerate(_export_rows(db, salon_id), start=1):
+        writer.writerow(row)
+        if index % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def write_members_xlsx(db: Session, salon_id: int, path: str):
+    """Write the salon's members to an XLSX file using openpyxl's streaming writer"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("members")
+    sheet.append(EXPORT_COLUMNS)
+    for row in _export_rows(db, salon_id):
+        sheet.append(row)
+    workbook.save(path)
@@ -0,0 +1,101 @@
+import time
+
+from sqlalchemy import delete, select, union
+from sqlalchemy.orm import Session
+
+import models
+from services import image_service, search_service, storage_service, sync_service
+
+# 회원 일괄 삭제 (집합 단위 DELETE + 사진 파일 비동기 정리)
+MAX_BULK_DELETE = 1000
+# Each lookup binds its batch three times; 3 x 300 stays under SQLite's historical 999-variable default
+REFERENCE_BATCH_SIZE = 300
+
+def _referenced_paths(db: Session, paths: set) -> set:
+    """Subset of paths still referenced by a remaining member or history row"""
+    paths = list(paths)
+    referenced = set()
+    for start in range(0, len(paths), REFERENCE_BATCH_SIZE):
+        batch = paths[start:start + REFERENCE_BATCH_SIZE]
+        query = union(
+            select(models.Member.photo_path).where(models.Member.photo_path.in_(batch)),
+            select(models.SynthesisHistory.original_photo_path).where(models.SynthesisHistory.original_photo_path.in_(batch)),
+            select(models.SynthesisHistory.result_photo_path).where(models.SynthesisHistory.result_photo_path.in_(batch)),
+        )
+        referenced.update(row[0] for row in db.execute(query))
+    return referenced
+
+def delete_members_in_transaction(db: Session, salon_id: int, member_ids):
+    """Delete the salon's members and their history without committing.
+
+    Returns (result, orphaned_paths); the caller commits and then queues the
+    orphaned photo files for removal.
+    """
+    member_ids = list(dict.fromkeys(member_ids))
+
+    members = db.execute(
+        select(models.Member.id, models.Member.photo_path).where(
+            models.Member.id.in_(member_ids),
+            models.Member.salon_id == salon_id
+        )
+    ).all()
+    owned_ids = [row.id for row in members]
+    owned = set(owned_ids)
+    not_found = [member_id for member_id in member_ids if member_id not in owned]
+    if not owned_ids:
+        return {"deleted": 0, "history_deleted": 0, "files_queued": 0, "not_found": not_found}, set()
+
+    histories = db.execute(
+        select(
+            models.SynthesisHistory.id,
+            models.SynthesisHistory.original_photo_path,
+            models.SynthesisHistory.result_photo_path
+        ).where(models.SynthesisHistory.member_id.in_(owned_ids))
+    ).all()
+    paths = {row.photo_path for row in members if row.photo_path}
+    for _, original, result in histories:
+        paths.update(path for path in (original, result) if path)
+
+    history_deleted = db.execute(
+        delete(models.SynthesisHistory)
+        .where(models.SynthesisHistory.member_id.in_(owned_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    search_service.remove_members(db, owned_ids)
+    deleted = db.execute(
+        delete(models.Member)
+        .where(models.Member.id.in_(owned_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Tombstones for offline clients
+    sync_service.record_changes(db, salon_id, sync_service.HISTORY, [row.id for row in histories], sync_service.DELETE)
+    sync_service.record_changes(db, salon_id, sync_service.MEMBER, owned_ids, sync_service.DELETE)
+
+    orphaned = paths - _referenced_paths(db, paths)
+    # Previews of synthesis results go with their full-size file
+    orphaned |= image_service.preview_paths(orphaned)
+    result = {"deleted": deleted, "history_deleted": history_deleted, "files_queued": 0, "not_found": not_found}
+    return result, orphaned
+
+def delete_members(db: Session, salon_id: int, member_ids) -> dict:
+    """Delete the salon's members and their synthesis history in one transaction.
+
+    Uses set-based DELETEs instead of the ORM cascade (which loads and
+    deletes history rows one by one). Photo files no longer referenced by
+    any row are queued for background removal after the commit. Ids that
+    do not exist or belong to another salon are reported as not_found.
+    """
+    start = time.perf_counter()
+    result, orphaned = delete_members_in_transaction(db, salon_id, member_ids)
+    if not result["deleted"]:
+        return result
+    db.commit()
+
+    # Files are removed only after the rows are gone for good
+    result["files_queued"] = storage_service.queue_removal(orphaned)
+    elapsed = time.perf_counter() - start
+    storage_service.STATS.record_delete(result["deleted"], elapsed)
+    print(f"Deleted {result['deleted']} members ({result['history_deleted']} history rows) in {elapsed * 1000:.1f}ms, "
+          f"queued {result['files_queued']} files for removal")
+    return result
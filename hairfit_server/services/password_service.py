@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+import metrics
+
+# 비밀번호 해시 전용 스레드 풀 (FastAPI 공용 threadpool과 분리)
+# bcrypt releases the GIL, so a few threads use a few cores; callers beyond
+# PASSWORD_HASH_MAX_PENDING are rejected immediately instead of queueing.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+RETRY_AFTER_SECONDS = 1
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing executor already has PASSWORD_HASH_MAX_PENDING jobs"""
+
+class HashStats:
+    """Latency and rejection counters for password hashing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.operations = {
+            name: {"count": 0, "seconds_total": 0.0, "seconds_max": 0.0}
+            for name in ("hash", "verify")
+        }
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= PASSWORD_HASH_MAX_PENDING:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+        metrics.PASSWORD_HASH_PENDING.inc()
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        metrics.PASSWORD_HASH_PENDING.dec()
+
+    def record(self, operation: str, seconds: float):
+        metrics.PASSWORD_HASH_LATENCY.labels(operation).observe(seconds)
+        with self._lock:
+            entry = self.operations[operation]
+            entry["count"] += 1
+            entry["seconds_total"] += seconds
+            entry["seconds_max"] = max(entry["seconds_max"], seconds)
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            operations = {
+                name: {
+                    "count": entry["count"],
+                    "seconds_total": round(entry["seconds_total"], 6),
+                    "seconds_max": round(entry["seconds_max"], 6),
+                    "seconds_avg": round(entry["seconds_total"] / entry["count"], 6) if entry["count"] else 0.0,
+                }
+                for name, entry in self.operations.items()
+            }
+            return {
+                "rounds": BCRYPT_ROUNDS,
+                "workers": PASSWORD_HASH_WORKERS,
+                "max_pending": PASSWORD_HASH_MAX_PENDING,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                **operations,
+            }
+
+STATS = HashStats()
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def _hash(password: str) -> str:
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+    STATS.record("hash", time.perf_counter() - start)
+    return hashed
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    start = time.perf_counter()
+    try:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        # Malformed stored hash
+        return False
+    finally:
+        STATS.record("verify", time.perf_counter() - start)
+
+def _submit(fn, *args):
+    if not STATS.acquire():
+        raise PasswordHasherBusy()
+    future = _executor.submit(fn, *args)
+    future.add_done_callback(lambda _: STATS.release())
+    return future
+
+async def hash_password(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_submit(_verify, plain_password, hashed_password))
+
+def hash_password_blocking(password: str) -> str:
+    """For sync routes; still bounded by the executor's backpressure"""
+    return _submit(_hash, password).result()
+
+def verify_password_blocking(plain_password: str, hashed_password: str) -> bool:
+    return _submit(_verify, plain_password, hashed_password).result()
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the stored bcrypt hash uses a different cost than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def get_stats() -> dict:
+    return STATS.snapshot()
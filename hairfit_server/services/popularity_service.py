@@ -0,0 +1,208 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models, database
+
+# 스타일 인기도 카운터 (SynthesisHistory 기반, 증분 갱신 + 주기적 보정)
+GLOBAL_SCOPE = 0
+WINDOWS = {"total": None, "7d": 7, "30d": 30}
+WINDOW_COLUMNS = {
+    "total": models.StyleUsageCounter.total_count,
+    "7d": models.StyleUsageCounter.count_7d,
+    "30d": models.StyleUsageCounter.count_30d,
+}
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("STYLE_POPULARITY_RECONCILE_SECONDS", "3600"))
+
+def _scopes(salon_id: Optional[int]):
+    return [GLOBAL_SCOPE] if salon_id is None else [GLOBAL_SCOPE, salon_id]
+
+def _insert(db: Session, model):
+    """INSERT supporting ON CONFLICT for the session's database"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+def record_style_usage(db: Session, style_id: str, salon_id: Optional[int], used_at: datetime = None):
+    """Increment the global (and salon) counters for one synthesis.
+
+    Each counter and daily bucket is bumped with a single upsert, so
+    concurrent history writes neither lose increments nor collide on the
+    first insert of a row. Does not commit; the caller commits together with
+    the SynthesisHistory row.
+    """
+    used_at = used_at or datetime.utcnow()
+    day = used_at.date()
+    counter = models.StyleUsageCounter.__table__
+    bucket = models.StyleUsageDaily.__table__
+    for scope in _scopes(salon_id):
+        stmt = _insert(db, models.StyleUsageCounter).values(
+            salon_id=scope, style_id=style_id, total_count=1, count_7d=1, count_30d=1, last_used_at=used_at
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[counter.c.salon_id, counter.c.style_id],
+            set_={
+                "total_count": counter.c.total_count + 1,
+                "count_7d": counter.c.count_7d + 1,
+                "count_30d": counter.c.count_30d + 1,
+                "last_used_at": case(
+                    (or_(counter.c.last_used_at.is_(None), counter.c.last_used_at < used_at), used_at),
+                    else_=counter.c.last_used_at,
+                ),
+            },
+        ))
+
+        stmt = _insert(db, models.StyleUsageDaily).values(salon_id=scope, style_id=style_id, day=day, count=1)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[bucket.c.salon_id, bucket.c.style_id, bucket.c.day],
+            set_={"count": bucket.c.count + 1},
+        ))
+
+def reconcile_windows(db: Session, today=None):
+    """Recompute the rolling windows from daily buckets and prune expired buckets"""
+    today = today or datetime.utcnow().date()
+    window_sums = {}
+    for window, days in WINDOWS.items():
+        if days is None:
+            continue
+        rows = db.query(
+            models.StyleUsageDaily.salon_id,
+            models.StyleUsageDaily.style_id,
+            func.sum(models.StyleUsageDaily.count)
+        ).filter(
+            models.StyleUsageDaily.day > today - timedelta(days=days)
+        ).group_by(models.StyleUsageDaily.salon_id, models.StyleUsageDaily.style_id).all()
+        window_sums[window] = {(salon_id, style_id): int(total) for salon_id, style_id, total in rows}
+
+    for counter in db.query(models.StyleUsageCounter).all():
+        key = (counter.salon_id, counter.style_id)
+        counter.count_7d = window_sums["7d"].get(key, 0)
+        counter.count_30d = window_sums["30d"].get(key, 0)
+
+    db.query(models.StyleUsageDaily).filter(
+        models.StyleUsageDaily.day <= today - timedelta(days=max(d for d in WINDOWS.values() if d))
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def reconcile_totals(db: Session):
+    """Recompute total_count and last_used_at from SynthesisHistory.
+
+    Repairs drift from deleted members/histories and from usage that was
+    never counted; counters missing for a used style are created.
+    """
+    rows = db.query(
+        models.SynthesisHistory.reference_style_id,
+        models.Member.salon_id,
+        func.count(models.SynthesisHistory.id),
+        func.max(models.SynthesisHistory.created_at)
+    ).outerjoin(models.Member).group_by(models.SynthesisHistory.reference_style_id, models.Member.salon_id)
+
+    totals = {}
+    for style_id, salon_id, count, last_used_at in rows:
+        for scope in _scopes(salon_id):
+            total = totals.setdefault((scope, style_id), {"total_count": 0, "last_used_at": None})
+            total["total_count"] += count
+            if last_used_at and (total["last_used_at"] is None or total["last_used_at"] < last_used_at):
+                total["last_used_at"] = last_used_at
+
+    for counter in db.query(models.StyleUsageCounter).all():
+        total = totals.pop((counter.salon_id, counter.style_id), None)
+        counter.total_count = total["total_count"] if total else 0
+        if total and total["last_used_at"]:
+            counter.last_used_at = total["last_used_at"]
+
+    # Upserts may create the same counters meanwhile; theirs stand until the next pass
+    for (scope, style_id), total in totals.items():
+        db.execute(_insert(db, models.StyleUsageCounter).values(
+            salon_id=scope, style_id=style_id, count_7d=0, count_30d=0, **total
+        ).on_conflict_do_nothing())
+    db.flush()
+
+def rebuild_from_history(db: Session):
+    """Rebuild all counters and buckets with a full scan of SynthesisHistory.
+
+    Used to backfill on first run and to repair drift; histories without a
+    member only count towards the global scope.
+    """
+    db.query(models.StyleUsageCounter).delete(synchronize_session=False)
+    db.query(models.StyleUsageDaily).delete(synchronize_session=False)
+
+    cutoff = datetime.utcnow() - timedelta(days=max(d for d in WINDOWS.values() if d))
+    rows = db.query(
+        models.SynthesisHistory.reference_style_id,
+        models.Member.salon_id,
+        models.SynthesisHistory.created_at
+    ).outerjoin(models.Member).yield_per(1000)
+
+    counters = {}
+    buckets = {}
+    for style_id, salon_id, created_at in rows:
+        for scope in _scopes(salon_id):
+            key = (scope, style_id)
+            counter = counters.setdefault(key, {"total_count": 0, "last_used_at": None})
+            counter["total_count"] += 1
+            if created_at and (counter["last_used_at"] is None or counter["last_used_at"] < created_at):
+                counter["last_used_at"] = created_at
+            if created_at and created_at.replace(tzinfo=None) > cutoff:
+                bucket_key = (scope, style_id, created_at.date())
+                buckets[bucket_key] = buckets.get(bucket_key, 0) + 1
+
+    db.bulk_insert_mappings(models.StyleUsageCounter, [
+        {"salon_id": scope, "style_id": style_id, "count_7d": 0, "count_30d": 0, **values}
+        for (scope, style_id), values in counters.items()
+    ])
+    db.bulk_insert_mappings(models.StyleUsageDaily, [
+        {"salon_id": scope, "style_id": style_id, "day": day, "count": count}
+        for (scope, style_id, day), count in buckets.items()
+    ])
+    db.flush()
+    reconcile_windows(db)
+
+def reconcile(db: Session):
+    """Periodic maintenance: backfill when counters are missing, otherwise refresh totals and windows"""
+    has_counters = db.query(models.StyleUsageCounter.id).first() is not None
+    has_history = db.query(models.SynthesisHistory.id).first() is not None
+    if has_history and not has_counters:
+        rebuild_from_history(db)
+    else:
+        reconcile_totals(db)
+        reconcile_windows(db)
+
+def get_usage_counts(db: Session, salon_id: Optional[int] = None, window: str = "total") -> dict:
+    """Return {style_id: count} for the given scope and window"""
+    column = WINDOW_COLUMNS[window]
+    scope = GLOBAL_SCOPE if salon_id is None else salon_id
+    rows = db.query(models.StyleUsageCounter.style_id, column).filter(
+        models.StyleUsageCounter.salon_id == scope
+    ).all()
+    return {style_id: count for style_id, count in rows}
+
+def get_top_styles(db: Session, salon_id: Optional[int] = None, window: str = "total", limit: int = 10):
+    """Return [(style_id, count)] of the most used styles, most used first"""
+    column = WINDOW_COLUMNS[window]
+    scope = GLOBAL_SCOPE if salon_id is None else salon_id
+    return db.query(models.StyleUsageCounter.style_id, column).filter(
+        models.StyleUsageCounter.salon_id == scope,
+        column > 0
+    ).order_by(column.desc(), models.StyleUsageCounter.last_used_at.desc()).limit(limit).all()
+
+def _reconcile_once():
+    db = database.SessionLocal()
+    try:
+        reconcile(db)
+    finally:
+        db.close()
+
+async def run_reconciler(interval: int = RECONCILE_INTERVAL_SECONDS):
+    """Background loop that reconciles the popularity counters at startup and then periodically"""
+    while True:
+        try:
+            await asyncio.to_thread(_reconcile_once)
+        except Exception as e:
+            print(f"Error reconciling style popularity: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,214 @@
+import re
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+import models
+
+# 회원 검색 인덱스 (SQLite: FTS5 trigram, PostgreSQL: pg_trgm)
+# 이름은 한글 자모 단위로 분해해서 저장하므로 "김ㅊ", "ㄱㅊㅅ" 같은 입력 중간 상태도 검색된다.
+SEARCH_TABLE = "member_search"
+MAX_SEARCH_RESULTS = 100
+TRIGRAM = 3
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = [
+    "ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ",
+    "ㅗㅣ", "ㅛ", "ㅜ", "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ",
+]
+JONGSEONG = [
+    "", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ", "ㄹㅂ",
+    "ㄹㅅ", "ㄹㅌ", "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ",
+    "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+]
+# Compound compatibility jamo typed directly (e.g. a trailing "ㄺ") split the same way
+COMPOUND_JAMO = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ", "ㅘ": "ㅗㅏ",
+    "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+}
+HANGUL_BASE, HANGUL_LAST = 0xAC00, 0xD7A3
+
+def decompose_hangul(value: str) -> str:
+    """Lower-case, drop whitespace and spell Hangul syllables out as basic jamo"""
+    out = []
+    for ch in value.lower():
+        code = ord(ch)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            index = code - HANGUL_BASE
+            out.append(CHOSEONG[index // 588])
+            out.append(JUNGSEONG[(index % 588) // 28])
+            out.append(JONGSEONG[index % 28])
+        elif not ch.isspace():
+            out.append(COMPOUND_JAMO.get(ch, ch))
+    return "".join(out)
+
+def hangul_initials(value: str) -> str:
+    """Initial consonants of each syllable (초성), e.g. 김철수 -> ㄱㅊㅅ"""
+    return "".join(
+        CHOSEONG[(ord(ch) - HANGUL_BASE) // 588]
+        for ch in value
+        if HANGUL_BASE <= ord(ch) <= HANGUL_LAST
+    )
+
+def phone_digits(value: str) -> str:
+    return re.sub(r"\D", "", value or "")
+
+def _salon_key(salon_id: int) -> str:
+    # Delimited so the trigram phrase for salon 1 never matches salon 12
+    return f"~{salon_id}~"
+
+def _is_sqlite(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+def create_search_table(connection):
+    """Create the search table for the connection's dialect (used by migrations and tests)"""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "member_id UNINDEXED, salon_key, name_jamo, initials, phone_digits, "
+            "tokenize='trigram')"
+        ))
+    else:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "member_id VARCHAR PRIMARY KEY REFERENCES members(id) ON DELETE CASCADE, "
+            "salon_id INTEGER NOT NULL, name_jamo TEXT NOT NULL, "
+            "initials TEXT NOT NULL, phone_digits TEXT NOT NULL)"
+        ))
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_salon ON {SEARCH_TABLE} (salon_id)"))
+        for column in ("name_jamo", "initials", "phone_digits"):
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_{column}_trgm "
+                f"ON {SEARCH_TABLE} USING gin ({column} gin_trgm_ops)"
+            ))
+
+def drop_search_table(connection):
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+def _document(member) -> dict:
+    return {
+        "member_id": member.id,
+        "salon_id": member.salon_id,
+        "salon_key": _salon_key(member.salon_id),
+        "name_jamo": decompose_hangul(member.name or ""),
+        "initials": hangul_initials(member.name or ""),
+        "phone_digits": phone_digits(member.phone),
+    }
+
+def index_members(db: Session, members):
+    """Insert or replace search rows; runs inside the caller's transaction"""
+    documents = [_document(member) for member in members]
+    if not documents:
+        return
+    remove_members(db, [d["member_id"] for d in documents])
+    if _is_sqlite(db):
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (member_id, salon_key, name_jamo, initials, phone_digits) "
+            "VALUES (:member_id, :salon_key, :name_jamo, :initials, :phone_digits)"
+        )
+    else:
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (member_id, salon_id, name_jamo, initials, phone_digits) "
+            "VALUES (:member_id, :salon_id, :name_jamo, :initials, :phone_digits)"
+        )
+    db.execute(statement, documents)
+
+def index_member(db: Session, member):
+    index_members(db, [member])
+
+def remove_members(db: Session, member_ids):
+    member_ids = list(member_ids)
+    if not member_ids:
+        return
+    statement = text(f"DELETE FROM {SEARCH_TABLE} WHERE member_id IN :member_ids").bindparams(
+        bindparam("member_ids", expanding=True)
+    )
+    db.execute(statement, {"member_ids": member_ids})
+
+def remove_member(db: Session, member_id: str):
+    remove_members(db, [member_id])
+
+def rebuild_search_index(db: Session, batch_size: int = 1000):
+    """Re-index every member (backfill after migration or repair)"""
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    query = db.query(models.Member).order_by(models.Member.id)
+    batch = []
+    for member in query.yield_per(batch_size):
+        batch.append(member)
+        if len(batch) >= batch_size:
+            index_members(db, batch)
+            batch = []
+    index_members(db, batch)
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _fts_phrase(column: str, value: str) -> str:
+    return f'{column}:"{value.replace(chr(34), chr(34) * 2)}"'
+
+def search_member_ids(db: Session, salon_id: int, q: str, limit: int = 20):
+    """Return member ids of the salon matching q, best match first.
+
+    Matches name substrings at jamo level, 초성 initials and phone-number
+    fragments. Ranking: exact name, name prefix, name substring / initials,
+    phone match; ties go to the shorter name (SQLite) or the higher trigram
+    similarity (Postgres).
+    """
+    jamo = decompose_hangul(q)
+    digits = phone_digits(q)
+    initials = q.replace(" ", "") if q.strip() and all(ch in CHOSEONG for ch in q.replace(" ", "")) else ""
+    if not (jamo or digits):
+        return []
+
+    params = {
+        "jamo": jamo,
+        "jamo_prefix": _escape_like(jamo) + "%",
+        "jamo_like": "%" + _escape_like(jamo) + "%",
+        "initials_like": "%" + _escape_like(initials) + "%",
+        "digits_like": "%" + _escape_like(digits) + "%",
+        "limit": min(limit, MAX_SEARCH_RESULTS),
+    }
+    rank_case = (
+        "CASE WHEN name_jamo = :jamo THEN 0 "
+        "WHEN name_jamo LIKE :jamo_prefix ESCAPE '\\' THEN 1 "
+        "WHEN name_jamo LIKE :jamo_like ESCAPE '\\' THEN 2 "
+        + ("WHEN initials LIKE :initials_like ESCAPE '\\' THEN 2 " if initials else "")
+        + "ELSE 3 END"
+    )
+
+    terms = [
+        (column, value, like_param)
+        for column, value, like_param in (
+            ("name_jamo", jamo, "jamo_like"),
+            ("initials", initials, "initials_like"),
+            ("phone_digits", digits, "digits_like"),
+        )
+        if value
+    ]
+    like_terms = " OR ".join(f"{column} LIKE :{like_param} ESCAPE '\\'" for column, _, like_param in terms)
+
+    if _is_sqlite(db):
+        # The salon_key phrase narrows every query to the caller's salon. Trigram
+        # MATCH needs >= 3 characters, so shorter terms are filtered with LIKE.
+        match = _fts_phrase("salon_key", _salon_key(salon_id))
+        conditions = [f"{SEARCH_TABLE} MATCH :match"]
+        if all(len(value) >= TRIGRAM for _, value, _ in terms):
+            match += " AND (" + " OR ".join(_fts_phrase(column, value) for column, value, _ in terms) + ")"
+        else:
+            conditions.append(f"({like_terms})")
+        params["match"] = match
+        sql = (
+            f"SELECT member_id FROM {SEARCH_TABLE} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {rank_case}, length(name_jamo) LIMIT :limit"
+        )
+    else:
+        params["salon_id"] = salon_id
+        sql = (
+            f"SELECT member_id FROM {SEARCH_TABLE} WHERE salon_id = :salon_id "
+            f"AND ({like_terms}) "
+            f"ORDER BY {rank_case}, similarity(name_jamo, :jamo) DESC LIMIT :limit"
+        )
+
+    return [row[0] for row in db.execute(text(sql), params)]
@@ -0,0 +1,114 @@
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+# 업로드 파일 비동기 삭제 큐 (회원 삭제 후 사진 파일 정리)
+UPLOAD_DIR = Path("uploads")
+
+class StorageStats:
+    """Counters for queued file removals and member deletions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files_queued = 0
+        self.files_removed = 0
+        self.files_missing = 0
+        self.files_failed = 0
+        self.bytes_reclaimed = 0
+        self.member_deletes = 0
+        self.members_deleted = 0
+        self.delete_seconds_total = 0.0
+        self.delete_seconds_max = 0.0
+
+    def increment(self, name: str, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_delete(self, members: int, seconds: float):
+        with self._lock:
+            self.member_deletes += 1
+            self.members_deleted += members
+            self.delete_seconds_total += seconds
+            self.delete_seconds_max = max(self.delete_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "files_queued": self.files_queued,
+                "files_removed": self.files_removed,
+                "files_missing": self.files_missing,
+                "files_failed": self.files_failed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "files_pending": _queue.unfinished_tasks,
+                "member_deletes": self.member_deletes,
+                "members_deleted": self.members_deleted,
+                "delete_seconds_total": round(self.delete_seconds_total, 6),
+                "delete_seconds_max": round(self.delete_seconds_max, 6),
+                "delete_seconds_avg": round(self.delete_seconds_total / self.member_deletes, 6) if self.member_deletes else 0.0,
+            }
+
+STATS = StorageStats()
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+def resolve_upload_path(photo_path: Optional[str]) -> Optional[Path]:
+    """Absolute path for an uploads-relative photo path, or None if it points outside uploads/"""
+    if not photo_path:
+        return None
+    root = UPLOAD_DIR.resolve()
+    path = (root / photo_path).resolve()
+    if path == root or root not in path.parents:
+        return None
+    return path
+
+def _remove(path: Path):
+    try:
+        size = path.stat().st_size
+        path.unlink()
+    except FileNotFoundError:
+        STATS.increment("files_missing")
+    except OSError as e:
+        STATS.increment("files_failed")
+        print(f"Error removing {path}: {e}")
+    else:
+        STATS.increment("files_removed")
+        STATS.increment("bytes_reclaimed", size)
+
+def _run_worker():
+    while True:
+        path = _queue.get()
+        try:
+            _remove(path)
+        finally:
+            _queue.task_done()
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="upload-reaper", daemon=True)
+            _worker.start()
+
+def queue_removal(photo_paths: Iterable[str]) -> int:
+    """Queue upload files for deletion in the background; returns how many were queued.
+
+    Call only after the transaction that dropped the last reference has committed.
+    """
+    paths = {path for path in map(resolve_upload_path, photo_paths) if path is not None}
+    if not paths:
+        return 0
+    _ensure_worker()
+    for path in paths:
+        _queue.put(path)
+    STATS.increment("files_queued", len(paths))
+    return len(paths)
+
+def wait_for_removals():
+    """Block until every queued file has been processed (tests and shutdown)"""
+    _queue.join()
+
+def get_storage_stats() -> dict:
+    return STATS.snapshot()
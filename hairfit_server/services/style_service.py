@@ -1,12 +1,277 @@
+import asyncio
 import json
 import os
 import shutil
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+import numpy as np
+from PIL import Image
+
+from process_lock import ProcessLock
+
 # 스타일 ID와 참조 이미지 경로 매핑 (동적으로 관리)
 STYLE_IMAGES = {}
 STYLE_METADATA = {}
 METADATA_FILE = Path("assets/styles/metadata.json")
+FEATURE_CACHE_FILE = Path("assets/styles/features.npz")
+
+# 워커 간 카탈로그 공유: 파일이 원본이고, 변경한 워커가 버전 파일을 교체하면
+# 다른 워커는 다음 요청에서 다시 읽는다 (stat 한 번으로 확인)
+CATALOG_VERSION_FILE = Path("assets/styles/.catalog_version")
+CATALOG_LOCK = ProcessLock(Path("assets/styles/.catalog.lock"))
+_loaded_version = None
+_loaded_at = None
+
+# 유사 스타일 검색 / 중복 검출 설정
+HASH_SIZE = 8  # dHash 8x8 -> 64 bit
+COLOR_BINS = (8, 3, 3)  # HSV: hue, saturation, value
+ORIENTATION_BINS = 8
+MAGNITUDE_EDGES = (0.0, 8.0, 32.0, 96.0, np.inf)
+FEATURE_DIM = int(np.prod(COLOR_BINS)) + ORIENTATION_BINS + len(MAGNITUDE_EDGES) - 1
+TEXTURE_WEIGHT = 0.5
+DUPLICATE_HASH_DISTANCE = int(os.getenv("STYLE_DUPLICATE_HASH_DISTANCE", "6"))
+INDEX_INITIAL_CAPACITY = 64
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Count set bits of each uint64 value"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def compute_image_signature(image: Image.Image):
+    """Return (dhash, feature_vector) for a style image.
+
+    The dHash is a 64-bit perceptual hash used for near-duplicate detection.
+    The feature vector is an L2-normalised HSV colour histogram followed by a
+    gradient orientation/magnitude histogram, compared with cosine similarity.
+    """
+    rgb = image.convert("RGB")
+
+    gray_small = np.asarray(
+        rgb.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS),
+        dtype=np.int16,
+    )
+    bits = (gray_small[:, 1:] > gray_small[:, :-1]).flatten()
+    dhash = int(np.packbits(bits).view(">u8")[0])
+
+    thumb = rgb.resize((64, 64), Image.Resampling.BILINEAR)
+
+    hsv = np.asarray(thumb.convert("HSV"), dtype=np.int32)
+    h_bins, s_bins, v_bins = COLOR_BINS
+    color_idx = (
+        (hsv[..., 0] * h_bins // 256) * s_bins + (hsv[..., 1] * s_bins // 256)
+    ) * v_bins + (hsv[..., 2] * v_bins // 256)
+    color_hist = np.bincount(color_idx.ravel(), minlength=h_bins * s_bins * v_bins)
+    color_hist = _normalize(np.sqrt(color_hist.astype(np.float32)))
+
+    gray = np.asarray(thumb.convert("L"), dtype=np.float32)
+    gx = gray[:-1, 1:] - gray[:-1, :-1]
+    gy = gray[1:, :-1] - gray[:-1, :-1]
+    magnitude = np.hypot(gx, gy)
+    orientation = np.mod(np.arctan2(gy, gx), np.pi)
+    orient_idx = np.minimum((orientation / np.pi * ORIENTATION_BINS).astype(np.int32), ORIENTATION_BINS - 1)
+    orient_hist = np.bincount(orient_idx.ravel(), weights=magnitude.ravel(), minlength=ORIENTATION_BINS)
+    mag_hist, _ = np.histogram(magnitude, bins=MAGNITUDE_EDGES)
+    texture = np.concatenate([
+        _normalize(orient_hist.astype(np.float32)),
+        _normalize(np.sqrt(mag_hist.astype(np.float32))),
+    ])
+
+    vector = _normalize(np.concatenate([color_hist, TEXTURE_WEIGHT * _normalize(texture)]))
+    return dhash, vector.astype(np.float32)
+
+
+class StyleIndex:
+    """In-memory similarity index over style images.
+
+    Hashes and feature vectors are kept in contiguous NumPy arrays (one row per
+    style) so that similarity and duplicate queries are single vectorized passes.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.rows = {}
+        # Backing arrays grow geometrically; the first len(ids) rows are live
+        self._hashes = np.zeros(INDEX_INITIAL_CAPACITY, dtype=np.uint64)
+        self._vectors = np.zeros((INDEX_INITIAL_CAPACITY, FEATURE_DIM), dtype=np.float32)
+        self._mtimes = np.zeros(INDEX_INITIAL_CAPACITY, dtype=np.float64)
+
+    @property
+    def hashes(self) -> np.ndarray:
+        return self._hashes[:len(self.ids)]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:len(self.ids)]
+
+    @property
+    def mtimes(self) -> np.ndarray:
+        return self._mtimes[:len(self.ids)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, style_id):
+        return style_id in self.rows
+
+    def clear(self):
+        self.__init__()
+
+    def _grow(self):
+        capacity = max(INDEX_INITIAL_CAPACITY, len(self._hashes) * 2)
+        count = len(self.ids)
+        hashes = np.zeros(capacity, dtype=np.uint64)
+        vectors = np.zeros((capacity, FEATURE_DIM), dtype=np.float32)
+        mtimes = np.zeros(capacity, dtype=np.float64)
+        hashes[:count] = self._hashes[:count]
+        vectors[:count] = self._vectors[:count]
+        mtimes[:count] = self._mtimes[:count]
+        self._hashes, self._vectors, self._mtimes = hashes, vectors, mtimes
+
+    def add(self, style_id: str, dhash: int, vector: np.ndarray, mtime: float = 0.0):
+        """Insert or replace the signature of a style (amortized O(1))"""
+        row = self.rows.get(style_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self._hashes):
+                self._grow()
+        self._hashes[row] = dhash
+        self._vectors[row] = vector
+        self._mtimes[row] = mtime
+        if style_id not in self.rows:
+            # The row is filled before it becomes visible through ids
+            self.ids.append(style_id)
+            self.rows[style_id] = row
+
+    def remove(self, style_id: str):
+        """Remove a style by moving the last row into its slot"""
+        row = self.rows.pop(style_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+            self._hashes[row] = self._hashes[last]
+            self._vectors[row] = self._vectors[last]
+            self._mtimes[row] = self._mtimes[last]
+        self.ids.pop()
+
+    def similar(self, style_id: str, k: int = 5):
+        """Return up to k (style_id, score) pairs most similar to style_id, best first"""
+        row = self.rows.get(style_id)
+        if row is None:
+            return None
+        k = min(k, len(self.ids) - 1)
+        if k <= 0:
+            return []
+        scores = self.vectors @ self.vectors[row]
+        scores[row] = -np.inf
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def duplicates(self, dhash: int, vector: np.ndarray, max_distance: int = None):
+        """Return styles whose perceptual hash is within max_distance bits, closest first"""
+        if max_distance is None:
+            max_distance = DUPLICATE_HASH_DISTANCE
+        if not self.ids:
+            return []
+        distances = _popcount(self.hashes ^ np.uint64(dhash))
+        matches = np.flatnonzero(distances <= max_distance)
+        if matches.size == 0:
+            return []
+        scores = self.vectors[matches] @ vector
+        order = np.lexsort((-scores, distances[matches]))
+        return [
+            {
+                "style_id": self.ids[matches[i]],
+                "hash_distance": int(distances[matches[i]]),
+                "similarity": float(scores[i]),
+            }
+            for i in order
+        ]
+
+    def save(self, path: Path = FEATURE_CACHE_FILE):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                np.savez(
+                    f,
+                    ids=np.array(self.ids, dtype=str),
+                    hashes=self.hashes,
+                    vectors=self.vectors,
+                    mtimes=self.mtimes,
+                )
+        except Exception as e:
+            print(f"Error saving style features: {e}")
+
+    def load(self, path: Path = FEATURE_CACHE_FILE):
+        """Load cached signatures; returns {style_id: (dhash, vector, mtime)}"""
+        if not path.exists():
+            return {}
+        try:
+            with np.load(path) as data:
+                if data["vectors"].shape[1:] != (FEATURE_DIM,):
+                    return {}
+                return {
+                    str(style_id): (int(dhash), vector, float(mtime))
+                    for style_id, dhash, vector, mtime in zip(
+                        data["ids"], data["hashes"], data["vectors"], data["mtimes"]
+                    )
+                }
+        except Exception as e:
+            print(f"Error loading style features: {e}")
+            return {}
+
+
+STYLE_INDEX = StyleIndex()
+
+
+def index_style_image(style_id: str, image_path: str, image: Image.Image = None, signature=None, index=None):
+    """Compute (unless given) and store the signature of a style image in index (STYLE_INDEX by default)"""
+    try:
+        if signature is None:
+            if image is None:
+                with Image.open(image_path) as img:
+                    signature = compute_image_signature(img)
+            else:
+                signature = compute_image_signature(image)
+        mtime = os.path.getmtime(image_path) if os.path.exists(image_path) else 0.0
+        (index if index is not None else STYLE_INDEX).add(style_id, signature[0], signature[1], mtime)
+    except Exception as e:
+        print(f"Error indexing style {style_id}: {e}")
+
+
+def build_style_index():
+    """Rebuild the similarity index from STYLE_IMAGES, reusing cached signatures"""
+    global STYLE_INDEX
+    # Built aside and swapped in: requests keep querying the old index meanwhile
+    index = StyleIndex()
+    cached = index.load(FEATURE_CACHE_FILE)
+    computed = 0
+    for style_id, image_path in STYLE_IMAGES.items():
+        entry = cached.get(style_id)
+        mtime = os.path.getmtime(image_path)
+        if entry and entry[2] == mtime:
+            index.add(style_id, entry[0], entry[1], mtime)
+        else:
+            index_style_image(style_id, image_path, index=index)
+            computed += 1
+    if computed or len(cached) != len(index):
+        index.save(FEATURE_CACHE_FILE)
+    STYLE_INDEX = index
+    print(f"Indexed {len(STYLE_INDEX)} style images ({computed} computed)")
 
 def load_style_metadata():
     """Load style metadata from JSON file"""
@@ -35,21 +300,24 @@ def save_style_metadata():
 def load_style_images():
     """Load all style images from assets/styles directory"""
     global STYLE_IMAGES
-    STYLE_IMAGES.clear()
+    # Filled aside and swapped in, since reloads run in a worker thread while requests read the catalog
+    images = {}
 
     styles_dir = Path("assets/styles")
     if not styles_dir.exists():
         styles_dir.mkdir(parents=True, exist_ok=True)
+        STYLE_IMAGES = images
         return
 
     # Scan for image files
+    initialized = False
     for file_path in styles_dir.glob("*"):
         if file_path.is_file() and file_path.suffix.lower() in ['.jpg', '.jpeg', '.png']:
             # Extract style_id from filename (e.g., style_1.jpg -> style_1)
             style_id = file_path.stem
             if style_id.startswith("style_"):
                 # Convert Windows backslashes to forward slashes for consistency
-                STYLE_IMAGES[style_id] = str(file_path).replace('\\', '/')
+                images[style_id] = str(file_path).replace('\\', '/')
                 
                 # Initialize metadata if not exists
                 if style_id not in STYLE_METADATA:
@@ -58,7 +326,83 @@ def load_style_images():
                         "gender": "neutral",
                         "category": "unknown"
                     }
+                    initialized = True
+
+    STYLE_IMAGES = images
 
     # Save initialized metadata
-    save_style_metadata()
+    if initialized:
+        save_style_metadata()
     print(f"Loaded {len(STYLE_IMAGES)} style images: {list(STYLE_IMAGES.keys())}")
+
+    # Build perceptual hash / feature index for similarity search
+    build_style_index()
+
+def _catalog_version():
+    try:
+        stat = CATALOG_VERSION_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+def _load_catalog():
+    global _loaded_version, _loaded_at
+    # Read the version first so a change made while loading triggers another reload
+    version = _catalog_version()
+    load_style_metadata()
+    load_style_images()
+    _loaded_version = version
+    _loaded_at = time.time()
+
+def _publish_catalog():
+    """Replace the version file so other workers reload the catalog"""
+    global _loaded_version
+    CATALOG_VERSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CATALOG_VERSION_FILE.with_name(f"{CATALOG_VERSION_FILE.name}.{os.getpid()}")
+    tmp_path.write_text(f"{time.time_ns()} {os.getpid()}")
+    os.replace(tmp_path, CATALOG_VERSION_FILE)
+    _loaded_version = _catalog_version()
+
+def load_catalog():
+    """Load metadata, style images and the similarity index (startup)"""
+    with CATALOG_LOCK:
+        _load_catalog()
+
+def catalog_changed() -> bool:
+    """Whether another worker published a catalog change this process has not loaded (one stat())"""
+    return _catalog_version() != _loaded_version
+
+def refresh_catalog():
+    """Reload the catalog if another worker changed it since this process loaded it
+
+    Blocks on CATALOG_LOCK and reloads every style; async callers use
+    refresh_catalog_async.
+    """
+    if not catalog_changed():
+        return
+    with CATALOG_LOCK:
+        if _catalog_version() != _loaded_version:
+            _load_catalog()
+
+async def refresh_catalog_async():
+    """refresh_catalog without blocking the event loop while another worker holds the lock"""
+    if catalog_changed():
+        await asyncio.to_thread(refresh_catalog)
+
+def catalog_status() -> dict:
+    """Whether this process has loaded the catalog and if it matches the published version"""
+    return {
+        "loaded": _loaded_at is not None,
+        "current": _loaded_at is not None and _catalog_version() == _loaded_version,
+        "styles": len(STYLE_IMAGES),
+        "loaded_at": _loaded_at,
+    }
+
+@contextmanager
+def catalog_update():
+    """Apply a catalog change on top of the latest files and publish it to the other workers"""
+    with CATALOG_LOCK:
+        if _catalog_version() != _loaded_version:
+            _load_catalog()
+        yield
+        _publish_catalog()
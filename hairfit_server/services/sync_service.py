@@ -0,0 +1,195 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+
+import models
+from services import search_service, popularity_service, member_service, storage_service
+
+# 오프라인 태블릿 클라이언트용 델타 동기화 (변경 피드 + 삭제 tombstone)
+DEFAULT_PULL_LIMIT = 200
+MAX_PULL_LIMIT = 1000
+MAX_PUSH_ITEMS = 500
+
+MEMBER, HISTORY = "member", "history"
+UPSERT, DELETE = "upsert", "delete"
+
+def record_changes(db: Session, salon_id: int, entity: str, entity_ids, op: str = UPSERT):
+    """Append changes to the salon's feed in the caller's transaction.
+
+    The entity's previous feed row is dropped, so a client that is behind
+    only receives the latest state of each entity.
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    if not entity_ids:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # Serialize feed writers per salon until commit, so cursor ids become
+        # visible in order and a pulling client cannot skip past an open write
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": salon_id})
+    db.execute(
+        delete(models.SyncChange)
+        .where(models.SyncChange.entity == entity, models.SyncChange.entity_id.in_(entity_ids))
+        .execution_options(synchronize_session=False)
+    )
+    now = datetime.utcnow()
+    db.execute(insert(models.SyncChange), [
+        {"salon_id": salon_id, "entity": entity, "entity_id": entity_id, "op": op, "changed_at": now}
+        for entity_id in entity_ids
+    ])
+
+def parse_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    value = int(cursor)
+    if value < 0:
+        raise ValueError("negative cursor")
+    return value
+
+def pull_changes(db: Session, salon_id: int, since: int, limit: int = DEFAULT_PULL_LIMIT) -> dict:
+    """Changes to the salon's members and history after the cursor, oldest first"""
+    changes = db.execute(
+        select(models.SyncChange.id, models.SyncChange.entity, models.SyncChange.entity_id, models.SyncChange.op)
+        .where(models.SyncChange.salon_id == salon_id, models.SyncChange.id > since)
+        .order_by(models.SyncChange.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    upserts = {MEMBER: [], HISTORY: []}
+    deletes = {MEMBER: [], HISTORY: []}
+    for change in changes:
+        (upserts if change.op == UPSERT else deletes)[change.entity].append(change.entity_id)
+
+    members = []
+    if upserts[MEMBER]:
+        members = db.execute(
+            select(models.Member).where(
+                models.Member.id.in_(upserts[MEMBER]),
+                models.Member.salon_id == salon_id
+            )
+        ).scalars().all()
+    histories = []
+    if upserts[HISTORY]:
+        histories = db.execute(
+            select(models.SynthesisHistory).where(models.SynthesisHistory.id.in_(upserts[HISTORY]))
+        ).scalars().all()
+
+    # Keep feed order so clients apply changes oldest first
+    position = {change.entity_id: index for index, change in enumerate(changes)}
+    members = sorted(members, key=lambda member: position[member.id])
+    histories = sorted(histories, key=lambda history: position[history.id])
+
+    return {
+        "cursor": str(changes[-1].id if changes else since),
+        "has_more": has_more,
+        "members": members,
+        "history": histories,
+        "deleted_members": deletes[MEMBER],
+        "deleted_history": deletes[HISTORY],
+    }
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; clients may send offsets"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def push_changes(db: Session, salon_id: int, push) -> dict:
+    """Apply a batch of client-side changes in one transaction.
+
+    Idempotent: members are matched by their client-generated id and
+    last-writer-wins on updated_at (an equal timestamp is a replay and a
+    no-op; an older one is reported as a conflict); history rows are
+    immutable and inserted once; deleting an already deleted member is a
+    no-op.
+    """
+    result = {
+        "inserted_members": 0, "updated_members": 0, "deleted_members": 0,
+        "inserted_history": 0, "unchanged": 0, "conflicts": [],
+    }
+    now = datetime.utcnow()
+
+    # Members
+    existing = {}
+    if push.members:
+        existing = {
+            member.id: member for member in db.execute(
+                select(models.Member).where(models.Member.id.in_([item.id for item in push.members]))
+            ).scalars()
+        }
+    changed = []
+    for item in push.members:
+        updated_at = _naive_utc(item.updated_at) or now
+        member = existing.get(item.id)
+        if member is not None and member.salon_id != salon_id:
+            result["conflicts"].append({"entity": MEMBER, "id": item.id, "reason": "not found"})
+            continue
+        if member is None:
+            member = models.Member(
+                id=item.id, salon_id=salon_id, created_at=_naive_utc(item.created_at) or now
+            )
+            db.add(member)
+            existing[item.id] = member
+            result["inserted_members"] += 1
+        elif member.updated_at is not None and updated_at <= _naive_utc(member.updated_at):
+            if updated_at == _naive_utc(member.updated_at):
+                result["unchanged"] += 1
+            else:
+                result["conflicts"].append({"entity": MEMBER, "id": item.id, "reason": "stale"})
+            continue
+        else:
+            result["updated_members"] += 1
+        member.name, member.phone, member.memo, member.photo_path = item.name, item.phone, item.memo, item.photo_path
+        member.updated_at = updated_at
+        changed.append(member)
+    db.flush()
+    search_service.index_members(db, changed)
+    record_changes(db, salon_id, MEMBER, [member.id for member in changed])
+
+    # History
+    if push.history:
+        known = set(db.execute(
+            select(models.SynthesisHistory.id)
+            .where(models.SynthesisHistory.id.in_([item.id for item in push.history]))
+        ).scalars())
+        member_ids = {item.member_id for item in push.history if item.member_id}
+        salon_members = set(db.execute(
+            select(models.Member.id).where(models.Member.id.in_(member_ids), models.Member.salon_id == salon_id)
+        ).scalars()) if member_ids else set()
+
+        inserted = []
+        for item in push.history:
+            if item.id in known:
+                result["unchanged"] += 1
+                continue
+            if item.member_id and item.member_id not in salon_members:
+                result["conflicts"].append({"entity": HISTORY, "id": item.id, "reason": "member not found"})
+                continue
+            created_at = _naive_utc(item.created_at) or now
+            db.add(models.SynthesisHistory(
+                id=item.id, member_id=item.member_id, original_photo_path=item.original_photo_path,
+                reference_style_id=item.reference_style_id, result_photo_path=item.result_photo_path,
+                is_synced=True, created_at=created_at
+            ))
+            db.flush()
+            popularity_service.record_style_usage(
+                db, item.reference_style_id, salon_id if item.member_id else None, created_at
+            )
+            known.add(item.id)
+            inserted.append(item.id)
+        record_changes(db, salon_id, HISTORY, inserted)
+        result["inserted_history"] = len(inserted)
+
+    # Deletions last, so a member created and deleted in one batch ends up deleted
+    orphaned = set()
+    if push.deleted_members:
+        deleted, orphaned = member_service.delete_members_in_transaction(db, salon_id, push.deleted_members)
+        result["deleted_members"] = deleted["deleted"]
+        result["unchanged"] += len(deleted["not_found"])
+
+    db.commit()
+    storage_service.queue_removal(orphaned)
+    return result
@@ -0,0 +1,52 @@
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+import models, database
+
+# 만료/폐기된 refresh token 정리 (배치 단위 삭제)
+SWEEP_INTERVAL_SECONDS = int(os.getenv("REFRESH_TOKEN_SWEEP_SECONDS", "3600"))
+SWEEP_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_SWEEP_BATCH_SIZE", "1000"))
+
+def _delete_in_batches(db: Session, condition, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.query(models.RefreshToken.id).filter(condition).limit(batch_size)]
+        if not ids:
+            break
+        db.query(models.RefreshToken).filter(models.RefreshToken.id.in_(ids)).delete(synchronize_session=False)
+        # Commit per batch so each write transaction stays short
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+def purge_refresh_tokens(db: Session, batch_size: int = SWEEP_BATCH_SIZE, now: datetime = None) -> int:
+    """Delete expired and revoked refresh tokens; returns the number of rows removed"""
+    now = now or datetime.utcnow()
+    # Expired rows are found through the expires_at index; revoked rows only
+    # remain from before tokens were deleted on logout/rotation
+    deleted = _delete_in_batches(db, models.RefreshToken.expires_at < now, batch_size)
+    deleted += _delete_in_batches(db, models.RefreshToken.revoked == True, batch_size)
+    return deleted
+
+def _sweep_once():
+    db = database.SessionLocal()
+    try:
+        deleted = purge_refresh_tokens(db)
+        if deleted:
+            print(f"Purged {deleted} expired/revoked refresh tokens")
+    finally:
+        db.close()
+
+async def run_token_sweeper(interval: int = SWEEP_INTERVAL_SECONDS):
+    """Background loop that periodically deletes dead refresh tokens"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_sweep_once)
+        except Exception as e:
+            print(f"Error purging refresh tokens: {e}")
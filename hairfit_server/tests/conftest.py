@@ -1,31 +1,46 @@
 import pytest
 import sys
 import os
+import tempfile
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 # Assuming running from hairfit_server directory
 # Helper to allow importing from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No model listing calls from tests, even when a dev .env provides GEMINI_API_KEY
+os.environ["MODEL_DISCOVERY_ENABLED"] = "false"
 
-from database import Base, get_db
+from database import Base, get_db, get_async_db
 from main import app
+from dependencies import limiter
+from services import admission_service, search_service
+import principal_cache
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# A temporary file database is shared by the sync and async engines
+# (an in-memory SQLite database is private to a single connection).
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="hairfit-test-"), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: each TestClient runs its own event loop, so connections must not be reused across tests
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create tables
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        search_service.create_search_table(connection)
     db = TestingSessionLocal()
     try:
         yield db
@@ -33,16 +48,43 @@ def db_session():
         db.close()
         # Drop tables after each test to ensure clean state
         Base.metadata.drop_all(bind=engine)
+        with engine.begin() as connection:
+            search_service.drop_search_table(connection)
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, monkeypatch):
     def override_get_db():
         try:
             yield db_session
         finally:
             pass
-    
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Rate limit counters are process-wide; start every test with a clean slate
+    limiter.reset()
+    principal_cache.clear()
+    # Slots of abandoned model calls are returned on the loop that took them, which ends with the test
+    monkeypatch.setattr(admission_service, "CONTROLLER", admission_service.FairAdmission())
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def auth_headers(client):
+    """Register and log in a user; returns a function giving that user's Authorization header"""
+    def login(email="user@example.com", username=None):
+        client.post("/register", json={
+            "email": email, "username": username or email.split("@")[0], "password": "password123"
+        })
+        token = client.post("/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return login
+
+@pytest.fixture(scope="function")
+def async_session_factory(db_session):
+    return TestingAsyncSessionLocal
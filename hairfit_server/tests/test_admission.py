@@ -0,0 +1,120 @@
+"""Synthesis admission: global/per-salon caps, weighted fair queuing and fast rejections."""
+import asyncio
+
+import pytest
+
+from services import admission_service
+from services.admission_service import AdmissionRejected, FairAdmission
+
+
+async def serve_in_order(controller, requests, blocker="blocker"):
+    """Queue `requests` (salon ids) behind a held slot and return the order they are admitted in"""
+    order = []
+    await controller.acquire(blocker)
+
+    async def request(salon_id):
+        await controller.acquire(salon_id)
+        order.append(salon_id)
+        await asyncio.sleep(0)
+        controller.release(salon_id, 1.0)
+
+    tasks = []
+    for salon_id in requests:
+        tasks.append(asyncio.create_task(request(salon_id)))
+        await asyncio.sleep(0)
+    controller.release(blocker, 1.0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_batch_session_interleaves_with_other_salons():
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=10, max_queue=20, weights={})
+    order = asyncio.run(serve_in_order(controller, ["a", "a", "a", "a", "b", "b"]))
+    assert order == ["a", "b", "a", "b", "a", "a"]
+    assert controller.running == 0 and not controller.waiters and not controller.salons
+
+
+def test_weights_share_slots_proportionally():
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=10, max_queue=20,
+                               weights={"a": 2.0})
+    order = asyncio.run(serve_in_order(controller, ["a"] * 6 + ["b"] * 3))
+    assert order[:6] == ["a", "a", "b", "a", "a", "b"]
+
+
+def test_full_queues_reject_with_position_and_wait():
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=1, max_queue=2, weights={})
+
+    async def scenario():
+        await controller.acquire("a")
+        queued = [asyncio.create_task(controller.acquire("a")), asyncio.create_task(controller.acquire("b"))]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as salon_full:
+            await controller.acquire("a")
+        with pytest.raises(AdmissionRejected) as server_full:
+            await controller.acquire("c")
+        controller.release("a", 10.0)
+        controller.release("b" if queued[1].done() else "a", 10.0)
+        await asyncio.gather(*queued)
+        return salon_full.value, server_full.value
+
+    salon_full, server_full = asyncio.run(scenario())
+    assert salon_full.reason == "salon_queue_full"
+    assert server_full.reason == "queue_full"
+    # "c" has no backlog, so it would be served after "b" but ahead of "a"'s second request
+    assert server_full.queue_position == 2
+    assert server_full.estimated_wait > 0
+    assert controller.stats.rejected == {"salon_queue_full": 1, "queue_full": 1}
+
+
+def test_queue_timeout_and_cancel_leave_no_waiters():
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=5, max_queue=5,
+                               queue_timeout=0.05, weights={})
+
+    async def scenario():
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("b")
+        waiting = asyncio.create_task(controller.acquire("c"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        controller.release("a", 1.0)
+        return timed_out.value
+
+    assert asyncio.run(scenario()).reason == "queue_timeout"
+    assert controller.running == 0 and not controller.waiters and not controller.salons
+
+
+def test_synthesize_rejects_fast_when_salon_queue_is_full(client, auth_headers, monkeypatch):
+    headers = auth_headers("admission@example.com")
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=0, max_queue=10)
+    controller.running = 1  # another salon holds the only slot
+    monkeypatch.setattr(admission_service, "CONTROLLER", controller)
+    response = client.post("/synthesize", files={"file": ("face.jpg", b"x", "image/jpeg")},
+                           data={"style_id": "style_1"}, headers=headers)
+    assert response.status_code == 429
+    detail = response.json()["detail"]
+    assert detail["reason"] == "salon_queue_full"
+    assert detail["queue_position"] == 1
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health/synthesis").json()["rejected"] == {"salon_queue_full": 1}
+
+
+def test_salon_over_its_hourly_quota_is_not_queued(client, auth_headers, monkeypatch):
+    from dependencies import limiter
+    from routers import synthesis
+
+    headers = auth_headers("quota@example.com")
+    controller = FairAdmission(max_concurrency=1, salon_concurrency=1, salon_queue=5, max_queue=10)
+    controller.running = 1  # the queue would make this request wait
+    monkeypatch.setattr(admission_service, "CONTROLLER", controller)
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(synthesis, "SYNTHESIS_RATE_LIMIT", "1/hour")
+    upload = {"file": ("face.jpg", b"x", "image/jpeg")}
+
+    first = client.post("/synthesize", files=upload, data={"style_id": "style_1", "deadline_seconds": "0.05"},
+                        headers=headers)
+    assert first.status_code == 503 and first.json()["detail"]["reason"] == "queue_timeout"
+    second = client.post("/synthesize", files=upload, data={"style_id": "style_1"}, headers=headers)
+    assert second.status_code == 429 and "Rate limit exceeded" in second.json()["detail"]
+    assert client.get("/health/synthesis").json()["rejected"] == {"queue_timeout": 1}
@@ -0,0 +1,110 @@
+"""Equivalence checks: async-session routes return what the sync queries return."""
+import asyncio
+from datetime import datetime, timedelta
+
+import models, schemas
+from utils import get_user_salon, get_user_salon_async
+
+
+def seed(db_session, salon_id, members=12, histories_per_member=3):
+    base = datetime(2024, 1, 1)
+    for i in range(members):
+        member = models.Member(
+            id=f"member-{i}", salon_id=salon_id, name=f"Member {i}", phone=f"010-{i:04d}",
+            created_at=base + timedelta(minutes=i), updated_at=base
+        )
+        db_session.add(member)
+        for j in range(histories_per_member):
+            db_session.add(models.SynthesisHistory(
+                id=f"history-{i}-{j}", member_id=member.id, original_photo_path="originals/a.jpg",
+                reference_style_id=f"style_{j}", created_at=base + timedelta(minutes=i, seconds=j)
+            ))
+    db_session.add(models.SynthesisHistory(
+        id="history-orphan", member_id=None, original_photo_path="originals/b.jpg",
+        reference_style_id="style_1", created_at=base
+    ))
+    db_session.commit()
+
+
+def as_json(schema, rows):
+    return [schema.model_validate(row).model_dump(mode="json") for row in rows]
+
+
+def test_members_match_sync_queries(client, auth_headers, db_session):
+    headers = auth_headers("async@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "async@example.com").first()
+    salon = get_user_salon(user, db_session)
+    seed(db_session, salon.id)
+
+    expected = db_session.query(models.Member).filter(models.Member.salon_id == salon.id)\
+        .order_by(models.Member.created_at.desc()).offset(3).limit(5).all()
+    response = client.get("/members/?skip=3&limit=5", headers=headers)
+    assert response.json() == as_json(schemas.MemberResponse, expected)
+
+    member = db_session.query(models.Member).filter(models.Member.id == "member-4").first()
+    response = client.get("/members/member-4", headers=headers)
+    assert response.json() == as_json(schemas.MemberResponse, [member])[0]
+
+
+def test_history_matches_sync_queries(client, auth_headers, db_session):
+    headers = auth_headers("async@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "async@example.com").first()
+    salon = get_user_salon(user, db_session)
+    seed(db_session, salon.id)
+
+    base_query = db_session.query(models.SynthesisHistory).outerjoin(models.Member).filter(
+        (models.Member.salon_id == salon.id) | (models.SynthesisHistory.member_id == None)
+    )
+    expected = base_query.order_by(models.SynthesisHistory.created_at.desc()).all()
+    assert client.get("/synthesis-history", headers=headers).json() == \
+        as_json(schemas.SynthesisHistoryResponse, expected)
+
+    expected = base_query.filter(models.SynthesisHistory.member_id == "member-2")\
+        .order_by(models.SynthesisHistory.created_at.desc()).all()
+    assert client.get("/synthesis-history?member_id=member-2", headers=headers).json() == \
+        as_json(schemas.SynthesisHistoryResponse, expected)
+
+    detail = client.get("/synthesis-history/history-2-1", headers=headers).json()
+    assert detail["id"] == "history-2-1"
+
+
+def test_salon_isolation_is_preserved(client, auth_headers, db_session):
+    owner_headers = auth_headers("async@example.com")
+    other_headers = auth_headers("async-other@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "async@example.com").first()
+    seed(db_session, get_user_salon(user, db_session).id, members=2)
+
+    assert client.get("/members/", headers=other_headers).json() == []
+    assert client.get("/members/member-0", headers=other_headers).status_code == 404
+    assert client.get("/synthesis-history/history-0-0", headers=other_headers).status_code == 404
+    assert client.get("/members/member-0", headers=owner_headers).status_code == 200
+
+
+def test_current_user_and_salon_resolution_match(client, auth_headers, db_session, async_session_factory):
+    headers = auth_headers("async@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "async@example.com").first()
+    me = client.get("/users/me", headers=headers).json()
+    assert me["id"] == user.id and me["email"] == user.email
+
+    sync_salon = get_user_salon(user, db_session)
+
+    async def resolve():
+        async with async_session_factory() as db:
+            return (await get_user_salon_async(user, db)).id
+
+    assert asyncio.run(resolve()) == sync_salon.id
+
+
+def test_member_write_paths(client, auth_headers, db_session):
+    headers = auth_headers("async@example.com")
+    created = client.post("/members/", json={"name": "Park", "phone": "010-1111"}, headers=headers).json()
+    updated = client.put(f"/members/{created['id']}", json={"memo": "VIP"}, headers=headers).json()
+    assert updated["memo"] == "VIP" and updated["name"] == "Park"
+
+    db_session.expire_all()
+    row = db_session.query(models.Member).filter(models.Member.id == created["id"]).first()
+    assert row.memo == "VIP"
+
+    assert client.delete(f"/members/{created['id']}", headers=headers).status_code == 200
+    db_session.expire_all()
+    assert db_session.query(models.Member).filter(models.Member.id == created["id"]).first() is None
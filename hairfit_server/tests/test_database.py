@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+import database
+
+
+def make_engine(url):
+    stats = database.PoolStats()
+    engine = create_engine(url, **database._engine_options(url, database.TimedQueuePool, stats, name="test"))
+    database.configure_engine(engine, url, stats, name="test")
+    return engine, stats
+
+
+def test_sqlite_pragmas_are_applied():
+    path = os.path.join(tempfile.mkdtemp(), "pragmas.db")
+    engine, _ = make_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -database.SQLITE_CACHE_SIZE_KB
+    engine.dispose()
+
+
+def test_pool_stats_track_checkouts():
+    path = os.path.join(tempfile.mkdtemp(), "stats.db")
+    engine, stats = make_engine(f"sqlite:///{path}")
+    before = database.POOL_STATS["sync"].snapshot()["checkouts"]
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    snapshot = stats.snapshot(engine.pool)
+    assert snapshot["connects"] == 1
+    assert snapshot["checkins"] == 3
+    assert snapshot["checked_out"] == 0
+    assert snapshot["pool_size"] == database.DB_POOL_SIZE
+    assert snapshot["checkouts"] == 3
+    # The app's own pool statistics are untouched by other engines
+    assert database.POOL_STATS["sync"].snapshot()["checkouts"] == before
+
+    engine.dispose()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert stats.snapshot()["checkouts"] == 4
+    engine.dispose()
+
+
+def test_postgres_urls_and_pool_options():
+    assert database.to_async_url("postgresql://u:p@db:5432/hairfit") == "postgresql+asyncpg://u:p@db:5432/hairfit"
+    assert database.to_async_url("sqlite:///./hairfit.db") == "sqlite+aiosqlite:///./hairfit.db"
+    # Explicit sync drivers are swapped too; query strings and credentials survive
+    assert (database.to_async_url("postgresql+psycopg2://u:p%40ss@db:5432/hairfit?sslmode=require")
+            == "postgresql+asyncpg://u:p%40ss@db:5432/hairfit?sslmode=require")
+    assert database.to_async_url("postgres://u:p@db/hairfit") == "postgresql+asyncpg://u:p@db/hairfit"
+    assert database.to_async_url("sqlite+pysqlite:///./hairfit.db") == "sqlite+aiosqlite:///./hairfit.db"
+    assert database.is_sqlite_memory(database.to_async_url("sqlite:///:memory:"))
+    assert database.is_sqlite_memory(database.to_async_url("sqlite://"))
+    assert not database.is_sqlite_memory(database.to_async_url("sqlite:///./hairfit.db"))
+    assert database.to_async_url("postgresql+asyncpg://u:p@db/hairfit") == "postgresql+asyncpg://u:p@db/hairfit"
+
+    options = database._engine_options("postgresql://u:p@db/hairfit", database.TimedQueuePool)
+    assert "connect_args" not in options
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["max_overflow"] == database.DB_MAX_OVERFLOW
+    assert options["pool_pre_ping"] is database.DB_POOL_PRE_PING
+    assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+
+    assert "poolclass" not in database._engine_options("sqlite:///:memory:", database.TimedQueuePool)
+
+
+def test_pool_stats_endpoint(client):
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert set(response.json()["pools"]) == {"sync", "async"}
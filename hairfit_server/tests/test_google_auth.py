@@ -0,0 +1,141 @@
+"""Google sign-in verification against a local stub issuer."""
+import datetime
+import json
+import time
+
+import pytest
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt as google_jwt
+
+from services import google_auth_service
+
+STUB = "http://stub-issuer"
+CLIENT_ID = "hairfit-test.apps.googleusercontent.com"
+
+
+def make_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "stub-issuer")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(1).not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class StubIssuer(requests.adapters.BaseAdapter):
+    """Serves /certs and /userinfo like Google's endpoints and counts requests"""
+
+    def __init__(self):
+        super().__init__()
+        self.keys = {}
+        self.userinfo = {}
+        self.calls = {"/certs": 0, "/userinfo": 0}
+        self.cache_control = "public, max-age=3600"
+
+    def add_key(self, key_id):
+        private_pem, cert_pem = make_key()
+        self.keys[key_id] = cert_pem
+        return crypt.RSASigner.from_string(private_pem, key_id)
+
+    def send(self, request, **kwargs):
+        assert kwargs.get("timeout") is not None
+        path = request.path_url.split("?")[0]
+        self.calls[path] += 1
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if path == "/certs":
+            response.status_code = 200
+            response.headers["Cache-Control"] = self.cache_control
+            response._content = json.dumps(self.keys).encode()
+        else:
+            token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            info = self.userinfo.get(token)
+            response.status_code = 200 if info else 401
+            response._content = json.dumps(info or {"error": "invalid_token"}).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def issuer(monkeypatch):
+    stub = StubIssuer()
+    google_auth_service.SESSION.mount(STUB, stub)
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CERTS_URL", f"{STUB}/certs")
+    monkeypatch.setattr(google_auth_service, "GOOGLE_USERINFO_URL", f"{STUB}/userinfo")
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    google_auth_service.CERTS.clear()
+    google_auth_service.ACCESS_TOKEN_CACHE.clear()
+    yield stub
+    google_auth_service.SESSION.adapters.pop(STUB)
+    google_auth_service.CERTS.clear()
+
+
+def id_token(signer, email="google@example.com", **overrides):
+    now = int(time.time())
+    payload = {"iss": "https://accounts.google.com", "aud": CLIENT_ID, "sub": "123",
+               "email": email, "name": "Google User", "iat": now, "exp": now + 600, **overrides}
+    return google_jwt.encode(signer, payload).decode()
+
+
+def test_id_token_login_caches_certs(client, issuer):
+    signer = issuer.add_key("k1")
+    for _ in range(3):
+        response = client.post("/login/google", json={"id_token": id_token(signer)})
+        assert response.status_code == 200
+    assert issuer.calls["/certs"] == 1
+
+
+def test_key_rotation_refetches_certs(client, issuer, monkeypatch):
+    monkeypatch.setattr(google_auth_service, "CERTS_MIN_REFETCH_SECONDS", 0)
+    client.post("/login/google", json={"id_token": id_token(issuer.add_key("k1"))})
+    rotated = issuer.add_key("k2")
+    assert client.post("/login/google", json={"id_token": id_token(rotated)}).status_code == 200
+    assert issuer.calls["/certs"] == 2
+
+
+def test_certs_follow_cache_headers(client, issuer):
+    issuer.cache_control = "no-cache"
+    signer = issuer.add_key("k1")
+    client.post("/login/google", json={"id_token": id_token(signer)})
+    client.post("/login/google", json={"id_token": id_token(signer)})
+    assert issuer.calls["/certs"] == 2
+
+
+def test_invalid_id_tokens_rejected(client, issuer):
+    signer = issuer.add_key("k1")
+    for token in (
+        id_token(signer, aud="someone-else"),
+        id_token(signer, iss="https://evil.example.com"),
+        id_token(signer, exp=int(time.time()) - 3600),
+        id_token(crypt.RSASigner.from_string(make_key()[0], "k1")),
+        "not-a-jwt",
+    ):
+        assert client.post("/login/google", json={"id_token": token}).status_code == 401
+
+
+def test_access_token_cached(client, issuer):
+    issuer.userinfo["good-token"] = {"email": "access@example.com", "name": "Access User"}
+    for _ in range(3):
+        assert client.post("/login/google", json={"access_token": "good-token"}).status_code == 200
+    assert issuer.calls["/userinfo"] == 1
+    assert client.post("/login/google", json={"access_token": "bad-token"}).status_code == 401
+
+
+def test_upstream_failure_is_503(client, issuer, monkeypatch):
+    monkeypatch.setattr(google_auth_service, "GOOGLE_USERINFO_URL", "http://127.0.0.1:9/userinfo")
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CONNECT_TIMEOUT", 0.5)
+    assert client.post("/login/google", json={"access_token": "any"}).status_code == 503
+    assert client.post("/login/google", json={}).status_code == 400
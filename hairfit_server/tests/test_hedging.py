@@ -0,0 +1,171 @@
+"""Synthesis deadlines and model tiers: hedged, switched and failed-over calls."""
+import asyncio
+import io
+import time
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from services import gemini_service, hedging_service, storage_service, style_service
+from services.admission_service import FairAdmission, Slot
+from services.hedging_service import DeadlineExceeded, HedgeStats
+
+TIERS = ["slow-pro", "fast-flash"]
+
+
+def image_response(name):
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), "green").save(buffer, format="PNG")
+    part = SimpleNamespace(text=name, inline_data=SimpleNamespace(data=buffer.getvalue()))
+    candidate = SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"), safety_ratings=[],
+                                content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(candidates=[candidate], prompt_feedback=None)
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """Fake tiers; behaviour per model name is (seconds to answer, error or None)"""
+    behaviour = {"slow-pro": (1.0, None), "fast-flash": (0.05, None)}
+
+    class FakeModel:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, contents, request_options=None):
+            seconds, error = behaviour[self.name]
+            time.sleep(seconds)
+            if error:
+                raise error
+            return image_response(self.name)
+
+    monkeypatch.setattr(gemini_service, "generative_model", FakeModel)
+    monkeypatch.setattr(gemini_service, "image_model_tiers", lambda: list(TIERS))
+    monkeypatch.setattr(hedging_service, "STATS", HedgeStats())
+    monkeypatch.setattr(hedging_service, "SYNTHESIS_HEDGE_DELAY_SECONDS", 0.1)
+    return behaviour
+
+
+def test_hedged_request_takes_the_first_answer(models):
+    response, outcome = asyncio.run(hedging_service.generate(["prompt"], 5))
+    assert response.candidates[0].content.parts[0].text == "fast-flash"
+    assert (outcome["model"], outcome["tier"], outcome["hedged"]) == ("fast-flash", 1, True)
+    assert [(a["model"], a["reason"], a["outcome"]) for a in outcome["attempts"]] == [
+        ("slow-pro", "primary", "abandoned"), ("fast-flash", "hedge", "ok"),
+    ]
+    assert 0.1 <= outcome["attempts"][1]["started_after"] < 0.5
+    stats = hedging_service.get_stats()
+    assert (stats["requests"], stats["hedged"], stats["hedge_rate"]) == (1, 1, 1.0)
+
+
+def test_fast_primary_is_not_hedged(models):
+    models["slow-pro"] = (0.01, None)
+    _, outcome = asyncio.run(hedging_service.generate(["prompt"], 5))
+    assert (outcome["model"], outcome["hedged"], len(outcome["attempts"])) == ("slow-pro", False, 1)
+
+
+def test_switch_mode_and_failover(models):
+    _, outcome = asyncio.run(hedging_service.generate(["prompt"], 5, mode="switch"))
+    assert [(a["reason"], a["outcome"]) for a in outcome["attempts"]] == [("primary", "abandoned"), ("switch", "ok")]
+
+    # A failing tier hands over right away, without waiting for the hedge delay
+    models["slow-pro"] = (0.0, RuntimeError("quota exceeded"))
+    _, outcome = asyncio.run(hedging_service.generate(["prompt"], 5, mode="switch"))
+    assert outcome["model"] == "fast-flash" and not outcome["hedged"]
+    assert outcome["attempts"][0]["error"] == "quota exceeded" and outcome["attempts"][1]["reason"] == "failover"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedging_service.generate(["prompt"], 5, mode="off"))
+
+
+def test_deadline_exceeded(models):
+    models["fast-flash"] = (1.0, None)
+
+    async def timed():
+        started = time.perf_counter()
+        try:
+            await hedging_service.generate(["prompt"], 0.3)
+        finally:
+            # Measured inside the loop: the abandoned calls keep their threads busy afterwards
+            assert time.perf_counter() - started < 0.6
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        asyncio.run(timed())
+    assert [a["outcome"] for a in excinfo.value.attempts] == ["abandoned", "abandoned"]
+    assert hedging_service.get_stats()["deadline_exceeded"] == 1
+
+
+async def admitted(controller, salon_id=1) -> Slot:
+    return Slot(controller, salon_id, await controller.acquire(salon_id))
+
+
+def test_hedges_hold_their_own_slot_until_the_thread_returns(models):
+    controller = FairAdmission(max_concurrency=2, salon_concurrency=2, weights={})
+
+    async def scenario():
+        slot = await admitted(controller)
+        _, outcome = await hedging_service.generate(["prompt"], 5, slot=slot)
+        await asyncio.sleep(0.05)
+        # The hedge's slot came back with its answer; the abandoned primary still holds the request's
+        slot.close()
+        during = controller.running
+        await asyncio.sleep(1.2)
+        return outcome, during, controller.running
+
+    outcome, during, after = asyncio.run(scenario())
+    assert outcome["model"] == "fast-flash" and outcome["hedged"]
+    assert (during, after) == (1, 0)
+
+
+def test_hedge_is_skipped_without_a_spare_slot(models):
+    models["slow-pro"] = (0.4, None)
+    controller = FairAdmission(max_concurrency=1, weights={})
+
+    async def scenario():
+        slot = await admitted(controller)
+        try:
+            return await hedging_service.generate(["prompt"], 5, slot=slot)
+        finally:
+            slot.close()
+
+    _, outcome = asyncio.run(scenario())
+    assert (outcome["model"], outcome["hedged"], outcome["hedge_skipped"]) == ("slow-pro", False, True)
+    assert len(outcome["attempts"]) == 1 and controller.running == 0
+    assert hedging_service.get_stats()["hedges_skipped"] == 1
+
+
+def test_hedge_delay_follows_latency_percentiles(monkeypatch):
+    stats = HedgeStats()
+    monkeypatch.setattr(hedging_service, "STATS", stats)
+    assert hedging_service.hedge_delay("pro", "flash", 40) == hedging_service.SYNTHESIS_HEDGE_DELAY_SECONDS
+    for seconds in range(1, 21):
+        stats.add_latency("pro", float(seconds))
+        stats.add_latency("flash", 8.0)
+    assert hedging_service.hedge_delay("pro", "flash", 40) == 19.0
+    # Hedge early enough for the faster tier to finish before the deadline
+    assert hedging_service.hedge_delay("pro", "flash", 20) == 12.0
+    assert hedging_service.resolve_deadline(None) == hedging_service.SYNTHESIS_DEADLINE_SECONDS
+    assert hedging_service.resolve_deadline(10_000) == hedging_service.SYNTHESIS_MAX_DEADLINE_SECONDS
+
+
+def test_synthesize_reports_model_tier(client, auth_headers, models, monkeypatch, tmp_path):
+    (tmp_path / "results").mkdir()
+    monkeypatch.setattr(storage_service, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(gemini_service, "GEMINI_API_KEY", "test-key")
+    headers = auth_headers("hedge@example.com")
+    style_id = next(iter(style_service.STYLE_IMAGES))
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="JPEG")
+    upload = {"file": ("face.jpg", buffer.getvalue(), "image/jpeg")}
+
+    body = client.post("/synthesize", files=upload, data={"style_id": style_id, "deadline_seconds": "5"},
+                       headers=headers).json()
+    assert (body["model"]["model"], body["model"]["tier"], body["model"]["hedged"]) == ("fast-flash", 1, True)
+    assert body["model"]["deadline_seconds"] <= 5
+
+    models["fast-flash"] = (1.0, None)
+    response = client.post("/synthesize", files=upload, data={"style_id": style_id, "deadline_seconds": "0.3"},
+                           headers=headers)
+    assert response.status_code == 504
+    assert response.json()["detail"]["deadline_seconds"] == 0.3
+    assert client.get("/health/synthesis").json()["models"]["deadline_exceeded"] == 1
@@ -0,0 +1,105 @@
+"""Set-based member deletion with background photo file removal."""
+import sqlite3
+
+from sqlalchemy import event
+
+import models
+from services import member_service, storage_service
+
+
+def make_file(root, relative, size=100):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def create_member(client, headers, name, photo_path=None, histories=()):
+    member = client.post("/members/", headers=headers,
+                         json={"name": name, "phone": "010-0000-0000", "photo_path": photo_path}).json()
+    for original, result in histories:
+        client.post("/synthesis-history", headers=headers, json={
+            "member_id": member["id"], "original_photo_path": original,
+            "reference_style_id": "style_1", "result_photo_path": result,
+        })
+    return member["id"]
+
+
+def test_bulk_delete_removes_rows_and_orphaned_files(client, auth_headers, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "UPLOAD_DIR", tmp_path)
+    headers = auth_headers()
+    files = {name: make_file(tmp_path, name) for name in (
+        "profiles/a.jpg", "originals/a1.jpg", "results/a1.png", "originals/b1.jpg", "originals/shared.jpg"
+    )}
+    outside = make_file(tmp_path.parent, "outside.txt")
+    before = storage_service.get_storage_stats()
+
+    a = create_member(client, headers, "A", "profiles/a.jpg",
+                      [("originals/a1.jpg", "results/a1.png"), ("originals/shared.jpg", None)])
+    b = create_member(client, headers, "B", "../outside.txt", [("originals/b1.jpg", None)])
+    keep = create_member(client, headers, "Keep", None, [("originals/shared.jpg", None)])
+
+    response = client.post("/members/bulk-delete", headers=headers, json={"member_ids": [a, b, "missing"]})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["deleted"], result["history_deleted"], result["not_found"]) == (2, 3, ["missing"])
+    storage_service.wait_for_removals()
+
+    assert {m["id"] for m in client.get("/members/", headers=headers).json()} == {keep}
+    assert db_session.query(models.SynthesisHistory).count() == 1
+    for name in ("profiles/a.jpg", "originals/a1.jpg", "results/a1.png", "originals/b1.jpg"):
+        assert not files[name].exists()
+    # Still referenced by another member's history, or outside uploads/
+    assert files["originals/shared.jpg"].exists()
+    assert outside.exists()
+
+    after = storage_service.get_storage_stats()
+    assert after["bytes_reclaimed"] - before["bytes_reclaimed"] == 400
+    assert after["members_deleted"] - before["members_deleted"] == 2
+    assert client.get("/members/search", headers=headers, params={"q": "A"}).json() == []
+
+
+def test_bulk_delete_is_salon_scoped(client, auth_headers, db_session):
+    owner = auth_headers()
+    member_id = create_member(client, owner, "Mine")
+    other = auth_headers("other@example.com")
+
+    result = client.post("/members/bulk-delete", headers=other, json={"member_ids": [member_id]}).json()
+    assert result["deleted"] == 0 and result["not_found"] == [member_id]
+    assert client.delete(f"/members/{member_id}", headers=other).status_code == 404
+    assert client.delete(f"/members/{member_id}", headers=owner).status_code == 200
+
+
+def test_large_bulk_delete_stays_under_the_bound_variable_limit(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "UPLOAD_DIR", tmp_path)
+    salon = models.Salon(name="Big", owner_id=1)
+    db_session.add(salon)
+    db_session.commit()
+    salon_id = salon.id
+    member_ids = [f"m{i}" for i in range(300)]
+    db_session.bulk_insert_mappings(models.Member, [
+        {"id": member_id, "salon_id": salon_id, "name": member_id, "phone": "010", "photo_path": f"profiles/{member_id}.jpg"}
+        for member_id in member_ids
+    ])
+    db_session.bulk_insert_mappings(models.SynthesisHistory, [
+        {"id": f"{member_id}-{n}", "member_id": member_id, "reference_style_id": "style_1",
+         "original_photo_path": f"originals/{member_id}-{n}.jpg", "result_photo_path": f"results/{member_id}-{n}.webp"}
+        for member_id in member_ids for n in range(2)
+    ])
+    db_session.commit()
+
+    # Older SQLite builds (and many distributions) allow 999 bound variables per statement
+    def limit_variables(dbapi_connection, connection_record, connection_proxy):
+        dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    engine = db_session.get_bind()
+    engine.dispose()
+    event.listen(engine, "checkout", limit_variables)
+    try:
+        db_session.close()
+        result = member_service.delete_members(db_session, salon_id, member_ids)
+    finally:
+        event.remove(engine, "checkout", limit_variables)
+        engine.dispose()
+    storage_service.wait_for_removals()
+    assert (result["deleted"], result["history_deleted"], result["files_queued"]) == (300, 600, 1500)
@@ -0,0 +1,68 @@
+"""Member detail aggregate: fixed query count regardless of history size."""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import models
+from utils import get_user_salon
+
+
+@contextmanager
+def count_queries(async_session_factory):
+    statements = []
+    sync_engine = async_session_factory.kw["bind"].sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_member(db_session, salon_id, member_id, histories):
+    base = datetime(2024, 1, 1)
+    db_session.add(models.Member(id=member_id, salon_id=salon_id, name=member_id, phone="010",
+                                 photo_path="profiles/p.jpg", created_at=base))
+    for i in range(histories):
+        db_session.add(models.SynthesisHistory(
+            id=f"{member_id}-h{i:03d}", member_id=member_id, original_photo_path=f"originals/{i}.jpg",
+            result_photo_path=f"results/{i}.png" if i % 2 else None,
+            reference_style_id="style_1", created_at=base + timedelta(minutes=i)
+        ))
+    db_session.commit()
+
+
+def test_member_detail_payload(client, auth_headers, db_session):
+    headers = auth_headers()
+    user = db_session.query(models.User).first()
+    seed_member(db_session, get_user_salon(user, db_session).id, "m1", histories=5)
+
+    detail = client.get("/members/m1/detail?history_limit=3", headers=headers).json()
+    assert detail["id"] == "m1"
+    assert detail["photo_url"] == "/images/profiles/p.jpg"
+    assert detail["history_count"] == 5
+    assert [h["id"] for h in detail["recent_history"]] == ["m1-h004", "m1-h003", "m1-h002"]
+    assert detail["recent_history"][0]["thumbnail_url"] == "/images/originals/4.jpg"
+    assert detail["recent_history"][1]["thumbnail_url"] == "/images/results/3.png?size=preview"
+
+    assert client.get("/members/missing/detail", headers=headers).status_code == 404
+
+
+def test_member_detail_query_count_is_constant(client, auth_headers, db_session, async_session_factory):
+    headers = auth_headers()
+    user = db_session.query(models.User).first()
+    salon_id = get_user_salon(user, db_session).id
+    seed_member(db_session, salon_id, "small", histories=2)
+    seed_member(db_session, salon_id, "large", histories=60)
+
+    counts = []
+    for member_id in ("small", "large"):
+        with count_queries(async_session_factory) as statements:
+            response = client.get(f"/members/{member_id}/detail?history_limit=50", headers=headers)
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts == [2, 2]
@@ -0,0 +1,84 @@
+import time
+
+import models
+from services import search_service
+from utils import get_user_salon
+
+
+def create(client, headers, name, phone):
+    return client.post("/members/", json={"name": name, "phone": phone}, headers=headers).json()["id"]
+
+
+def names(response):
+    assert response.status_code == 200
+    return [member["name"] for member in response.json()]
+
+
+def test_decompose_hangul():
+    assert search_service.decompose_hangul("김철수") == "ㄱㅣㅁㅊㅓㄹㅅㅜ"
+    assert search_service.decompose_hangul("닭 Kim") == "ㄷㅏㄹㄱkim"
+    assert search_service.decompose_hangul("ㄺ") == "ㄹㄱ"
+    assert search_service.hangul_initials("김철수") == "ㄱㅊㅅ"
+
+
+def test_search_by_name_jamo_initials_and_phone(client, auth_headers):
+    headers = auth_headers()
+    create(client, headers, "김철수", "010-1234-5678")
+    create(client, headers, "김철", "010-9999-0000")
+    create(client, headers, "박영희", "010-5555-1234")
+    create(client, headers, "Kim Minji", "02-777-8888")
+
+    # Exact match first, then prefix matches
+    assert names(client.get("/members/search?q=김철", headers=headers)) == ["김철", "김철수"]
+    # Jamo-level prefix while the last syllable is still being typed
+    assert names(client.get("/members/search?q=김ㅊ", headers=headers))[0] in ("김철", "김철수")
+    assert set(names(client.get("/members/search?q=김ㅊ", headers=headers))) == {"김철", "김철수"}
+    # Initial consonants (초성)
+    assert names(client.get("/members/search?q=ㅂㅇㅎ", headers=headers)) == ["박영희"]
+    # Phone fragments, with or without separators
+    assert set(names(client.get("/members/search?q=1234", headers=headers))) == {"김철수", "박영희"}
+    assert names(client.get("/members/search?q=777-8", headers=headers)) == ["Kim Minji"]
+    # Short and latin queries
+    assert names(client.get("/members/search?q=박", headers=headers)) == ["박영희"]
+    assert names(client.get("/members/search?q=minji", headers=headers)) == ["Kim Minji"]
+
+
+def test_search_index_follows_updates_and_deletes(client, auth_headers):
+    headers = auth_headers()
+    member_id = create(client, headers, "이영수", "010-1111-2222")
+    assert names(client.get("/members/search?q=이영", headers=headers)) == ["이영수"]
+
+    client.put(f"/members/{member_id}", json={"name": "최영수"}, headers=headers)
+    assert names(client.get("/members/search?q=이영", headers=headers)) == []
+    assert names(client.get("/members/search?q=최영", headers=headers)) == ["최영수"]
+
+    client.delete(f"/members/{member_id}", headers=headers)
+    assert names(client.get("/members/search?q=최영", headers=headers)) == []
+
+
+def test_search_is_scoped_to_salon(client, auth_headers):
+    create(client, auth_headers(), "정민호", "010-3333-4444")
+    other = auth_headers("search-other@example.com")
+    assert names(client.get("/members/search?q=정민호", headers=other)) == []
+    assert names(client.get("/members/search?q=4444", headers=other)) == []
+
+
+def test_search_latency_with_many_members(db_session):
+    salon = models.Salon(name="Big Salon", owner_id=1)
+    db_session.add(salon)
+    db_session.commit()
+    family, given = "김이박최정강조윤장임", "민서지현준우영수철희"
+    members = [
+        models.Member(id=f"m{i}", salon_id=salon.id, phone=f"010-{i:04d}-{i % 9999:04d}",
+                      name=family[i % 10] + given[(i // 10) % 10] + given[(i // 100) % 10])
+        for i in range(20000)
+    ]
+    db_session.add_all(members)
+    search_service.index_members(db_session, members)
+    db_session.commit()
+
+    start = time.perf_counter()
+    for q in ("김민서", "ㄱㅁㅅ", "0101", "최준"):
+        assert search_service.search_member_ids(db_session, salon.id, q, limit=20)
+    elapsed = (time.perf_counter() - start) / 4
+    assert elapsed < 0.25
@@ -0,0 +1,131 @@
+"""Prometheus metrics: HTTP middleware, Gemini calls, caches and multi-process aggregation."""
+import io
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc, text
+
+import database
+import main
+from cache import TTLCache
+from services import gemini_service, storage_service
+from services import style_service
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_http_metrics_use_route_template(client, auth_headers):
+    headers = auth_headers("metrics@example.com")
+    labels = {"method": "GET", "route": "/members/{member_id}", "status": "404"}
+    before = sample("hairfit_http_requests_total", **labels)
+    client.get("/members/unknown-1", headers=headers)
+    client.get("/members/unknown-2", headers=headers)
+    assert sample("hairfit_http_requests_total", **labels) == before + 2
+    assert sample("hairfit_http_request_duration_seconds_count", method="GET", route="/members/{member_id}") >= 2
+
+    body = client.get("/metrics").text
+    assert 'hairfit_http_requests_total{method="GET",route="/members/{member_id}",status="404"}' in body
+
+
+def test_db_query_and_checkout_metrics(tmp_path):
+    url = f"sqlite:///{tmp_path / 'metrics.db'}"
+    stats = database.PoolStats()
+    engine = create_engine(url, **database._engine_options(url, database.TimedQueuePool, stats, name="metrics_test"))
+    database.configure_engine(engine, url, stats, name="metrics_test")
+    before_queries = sample("hairfit_db_query_duration_seconds_count", pool="metrics_test", operation="SELECT")
+    before_checkouts = sample("hairfit_db_pool_checkout_seconds_count", pool="metrics_test")
+    before_app = sample("hairfit_db_pool_checkout_seconds_count", pool="sync")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    engine.dispose()
+    assert sample("hairfit_db_query_duration_seconds_count", pool="metrics_test", operation="SELECT") == before_queries + 2
+    assert sample("hairfit_db_pool_checkout_seconds_count", pool="metrics_test") == before_checkouts + 1
+    assert sample("hairfit_db_pool_checkout_seconds_count", pool="sync") == before_app
+
+
+def test_failed_queries_leave_no_timer_state(tmp_path):
+    url = f"sqlite:///{tmp_path / 'failed.db'}"
+    engine = create_engine(url, **database._engine_options(url, database.TimedQueuePool))
+    database.configure_engine(engine, url, database.PoolStats(), name="metrics_test")
+    before = sample("hairfit_db_query_duration_seconds_count", pool="metrics_test", operation="SELECT")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+    engine.dispose()
+    assert sample("hairfit_db_query_duration_seconds_count", pool="metrics_test", operation="SELECT") == before + 1
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+def test_cache_lookups_are_counted():
+    cache = TTLCache(name="metrics_test")
+    before_hits = sample("hairfit_cache_requests_total", cache="metrics_test", result="hit")
+    before_misses = sample("hairfit_cache_requests_total", cache="metrics_test", result="miss")
+    cache.get("key")
+    cache.set("key", 1)
+    cache.get("key")
+    assert sample("hairfit_cache_requests_total", cache="metrics_test", result="hit") == before_hits + 1
+    assert sample("hairfit_cache_requests_total", cache="metrics_test", result="miss") == before_misses + 1
+
+
+def test_gemini_call_metrics(client, auth_headers, monkeypatch, tmp_path):
+    headers = auth_headers("gemini-metrics@example.com")
+    (tmp_path / "results").mkdir()
+    monkeypatch.setattr(storage_service, "UPLOAD_DIR", tmp_path)
+    output = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(output, format="PNG")
+    generated = output.getvalue()
+
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, contents, request_options=None):
+            part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=generated))
+            candidate = SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"), safety_ratings=[],
+                                        content=SimpleNamespace(parts=[part]))
+            return SimpleNamespace(candidates=[candidate], prompt_feedback=None)
+
+    monkeypatch.setattr(gemini_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_service, "generative_model", FakeModel)
+    model = gemini_service.IMAGE_MODEL
+    before = sample("hairfit_gemini_finish_reasons_total", model=model, finish_reason="STOP")
+    before_received = sample("hairfit_gemini_payload_bytes_sum", model=model, direction="received")
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="JPEG")
+    style_id = next(iter(style_service.STYLE_IMAGES))
+    response = client.post("/synthesize", files={"file": ("face.jpg", buffer.getvalue(), "image/jpeg")},
+                           data={"style_id": style_id}, headers=headers)
+    assert "result_image" in response.json()
+
+    assert sample("hairfit_gemini_finish_reasons_total", model=model, finish_reason="STOP") == before + 1
+    assert sample("hairfit_gemini_payload_bytes_sum", model=model, direction="received") == before_received + len(generated)
+    assert sample("hairfit_gemini_request_duration_seconds_count", model=model, outcome="ok") >= 1
+
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), SECRET_KEY="test")
+    worker = "import metrics; metrics.record_upload('profile', 1000)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=server_dir, env=env, check=True)
+    scrape = "import metrics; print(metrics.render()[0].decode())"
+    output = subprocess.run([sys.executable, "-c", scrape], cwd=server_dir, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    assert 'hairfit_upload_bytes_sum{kind="profile"} 2000.0' in output
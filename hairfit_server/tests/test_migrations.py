@@ -0,0 +1,137 @@
+import os
+import tempfile
+from datetime import datetime
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, select, delete, text
+from sqlalchemy.dialects import sqlite
+
+import auth_utils
+import models
+import pagination
+from database import Base
+from services import search_service
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def upgraded_engine():
+    path = os.path.join(tempfile.mkdtemp(), "migrated.db")
+    engine = create_engine(f"sqlite:///{path}")
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    return engine, config
+
+
+def query_plan(engine, statement):
+    sql = str(statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_migrations_match_models():
+    engine, _ = upgraded_engine()
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={
+            "include_object": lambda obj, name, type_, reflected, compare_to:
+                not (type_ == "table" and name.startswith(search_service.SEARCH_TABLE))
+        })
+        diff = compare_metadata(context, Base.metadata)
+    assert diff == []
+
+
+def test_upgrade_existing_create_all_database():
+    path = os.path.join(tempfile.mkdtemp(), "legacy.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def test_refresh_tokens_hashed_on_upgrade():
+    path = os.path.join(tempfile.mkdtemp(), "tokens.db")
+    engine = create_engine(f"sqlite:///{path}")
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "0004")
+        connection.execute(text("INSERT INTO users (id, email, username, hashed_password) VALUES (1, 'a@b.c', 'a', 'x')"))
+        connection.execute(text(
+            "INSERT INTO refresh_tokens (token, user_id, expires_at, revoked) "
+            "VALUES ('plain-token', 1, '2099-01-01 00:00:00', 0)"
+        ))
+        command.upgrade(config, "head")
+        stored = connection.execute(text("SELECT token_hash FROM refresh_tokens")).scalar_one()
+    assert stored == auth_utils.hash_refresh_token("plain-token")
+
+
+def test_sync_feed_backfilled_on_upgrade():
+    path = os.path.join(tempfile.mkdtemp(), "sync.db")
+    engine = create_engine(f"sqlite:///{path}")
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "0005")
+        connection.execute(text("INSERT INTO members (id, salon_id, name, phone, created_at) VALUES ('m1', 1, 'A', '010', '2024-01-01')"))
+        connection.execute(text(
+            "INSERT INTO synthesis_history (id, member_id, original_photo_path, reference_style_id, created_at) "
+            "VALUES ('h1', 'm1', 'a.jpg', 's', '2024-01-02')"
+        ))
+        command.upgrade(config, "head")
+        rows = connection.execute(text("SELECT salon_id, entity, entity_id, op FROM sync_changes ORDER BY id")).fetchall()
+    assert [tuple(row) for row in rows] == [(1, "member", "m1", "upsert"), (1, "history", "h1", "upsert")]
+
+
+def test_hot_queries_use_composite_indexes():
+    engine, _ = upgraded_engine()
+
+    plan = query_plan(engine, select(models.Member).where(models.Member.salon_id == 1)
+                      .order_by(models.Member.created_at.desc()).limit(50))
+    assert "ix_members_salon_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = query_plan(engine, select(models.SynthesisHistory)
+                      .where(models.SynthesisHistory.member_id == "m1")
+                      .order_by(models.SynthesisHistory.created_at.desc()))
+    assert "ix_synthesis_history_member_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = query_plan(engine, select(models.RefreshToken).where(
+        models.RefreshToken.user_id == 1, models.RefreshToken.expires_at > datetime(2024, 1, 1)))
+    assert "ix_refresh_tokens_user_expires" in plan
+
+    plan = query_plan(engine, delete(models.RefreshToken).where(
+        models.RefreshToken.expires_at < datetime(2024, 1, 1)))
+    assert "ix_refresh_tokens_expires_at" in plan
+
+
+def test_keyset_pages_use_indexes():
+    engine, _ = upgraded_engine()
+    cursor = pagination.encode_cursor(datetime(2024, 1, 1), "m1")
+
+    plan = query_plan(engine, pagination.apply_keyset(
+        select(models.Member).where(models.Member.salon_id == 1),
+        models.Member.created_at, models.Member.id, cursor).limit(51))
+    assert "ix_members_salon_created" in plan
+
+    plan = query_plan(engine, pagination.apply_keyset(
+        select(models.SynthesisHistory).where(models.SynthesisHistory.member_id == "m1"),
+        models.SynthesisHistory.created_at, models.SynthesisHistory.id, cursor).limit(51))
+    assert "ix_synthesis_history_member_created" in plan
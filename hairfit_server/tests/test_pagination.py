@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import models
+import pagination
+from utils import get_user_salon
+
+
+def seed_members(db_session, salon_id, count=23):
+    base = datetime(2024, 5, 1)
+    for i in range(count):
+        # Groups of three share a timestamp to exercise the id tie-breaker
+        db_session.add(models.Member(
+            id=f"member-{i:03d}", salon_id=salon_id, name=f"Member {i}", phone="010",
+            created_at=base + timedelta(minutes=i // 3)
+        ))
+    db_session.commit()
+
+
+def walk(client, path, headers):
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = path + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, pages
+
+
+def test_member_cursor_walk_is_complete_and_ordered(client, auth_headers, db_session):
+    headers = auth_headers("pages@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "pages@example.com").first()
+    seed_members(db_session, get_user_salon(user, db_session).id)
+
+    ids, pages = walk(client, "/members/?limit=10", headers)
+    expected = [m.id for m in db_session.query(models.Member)
+                .order_by(models.Member.created_at.desc(), models.Member.id.desc())]
+    assert ids == expected
+    assert pages == 3
+
+
+def test_history_cursor_walk_with_member_filter(client, auth_headers, db_session):
+    headers = auth_headers("pages@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "pages@example.com").first()
+    salon = get_user_salon(user, db_session)
+    seed_members(db_session, salon.id, count=1)
+    base = datetime(2024, 6, 1)
+    for i in range(12):
+        db_session.add(models.SynthesisHistory(
+            id=f"h-{i:02d}", member_id="member-000", original_photo_path="o.jpg",
+            reference_style_id="style_1", created_at=base + timedelta(seconds=i // 2)
+        ))
+    db_session.commit()
+
+    ids, pages = walk(client, "/synthesis-history?member_id=member-000&limit=5", headers)
+    assert ids == [f"h-{i:02d}" for i in reversed(range(12))]
+    assert pages == 3
+
+
+def test_page_size_is_bounded_and_cursor_validated(client, auth_headers):
+    headers = auth_headers("pages@example.com")
+    assert client.get(f"/members/?limit={pagination.MAX_PAGE_SIZE + 1}", headers=headers).status_code == 422
+    assert client.get("/synthesis-history?limit=0", headers=headers).status_code == 422
+    assert client.get("/members/?cursor=not-a-cursor", headers=headers).status_code == 400
+
+
+def test_total_count_modes(client, auth_headers, db_session, monkeypatch):
+    headers = auth_headers("pages@example.com")
+    user = db_session.query(models.User).filter(models.User.email == "pages@example.com").first()
+    seed_members(db_session, get_user_salon(user, db_session).id, count=8)
+
+    response = client.get("/members/?limit=2", headers=headers)
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get("/members/?limit=2&count=exact", headers=headers)
+    assert response.headers["X-Total-Count"] == "8"
+
+    monkeypatch.setattr(pagination, "COUNT_ESTIMATE_CAP", 5)
+    response = client.get("/members/?limit=2&count=estimate", headers=headers)
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Total-Count-Estimated"] == "true"
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 2, 3, 4, 5, 678)
+    assert pagination.decode_cursor(pagination.encode_cursor(created_at, "abc")) == (created_at, "abc")
@@ -0,0 +1,65 @@
+"""Password hashing executor: configurable cost, rehash on login, backpressure."""
+from prometheus_client import REGISTRY
+
+import models
+from services import password_service
+
+
+def register(client, email="hash@example.com"):
+    return client.post("/register", json={"email": email, "username": "hasher", "password": "password123"})
+
+
+def login(client, email="hash@example.com", password="password123"):
+    return client.post("/login", json={"email": email, "password": password})
+
+
+def stored_cost(db_session, email="hash@example.com"):
+    db_session.expire_all()
+    user = db_session.query(models.User).filter(models.User.email == email).one()
+    return int(user.hashed_password.split("$")[2])
+
+
+def test_login_upgrades_hash_cost(client, db_session, monkeypatch):
+    monkeypatch.setattr(password_service, "BCRYPT_ROUNDS", 4)
+    register(client)
+    assert stored_cost(db_session) == 4
+
+    monkeypatch.setattr(password_service, "BCRYPT_ROUNDS", 5)
+    rehashed = password_service.get_stats()["rehashed"]
+    assert login(client, password="wrong").status_code == 401
+    assert stored_cost(db_session) == 4
+
+    assert login(client).status_code == 200
+    assert stored_cost(db_session) == 5
+    assert password_service.get_stats()["rehashed"] == rehashed + 1
+    assert login(client).status_code == 200
+
+
+def test_saturated_executor_returns_503(client, monkeypatch):
+    monkeypatch.setattr(password_service, "BCRYPT_ROUNDS", 4)
+    register(client)
+    before = password_service.get_stats()["rejected"]
+
+    monkeypatch.setattr(password_service, "PASSWORD_HASH_MAX_PENDING", 0)
+    response = login(client)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert password_service.get_stats()["rejected"] == before + 1
+
+
+def test_hash_latency_exported(client):
+    stats = client.get("/health/auth").json()
+    assert {"hash", "verify", "in_flight", "rejected"} <= set(stats)
+    assert stats["in_flight"] == 0
+
+
+def test_hash_metrics_on_prometheus(client, monkeypatch):
+    monkeypatch.setattr(password_service, "BCRYPT_ROUNDS", 4)
+    before = REGISTRY.get_sample_value("hairfit_password_hash_duration_seconds_count", {"operation": "hash"}) or 0.0
+    register(client)
+    assert REGISTRY.get_sample_value("hairfit_password_hash_duration_seconds_count", {"operation": "hash"}) == before + 1
+    assert REGISTRY.get_sample_value("hairfit_password_hash_pending") == 0
+
+    body = client.get("/metrics").text
+    assert 'hairfit_password_hash_duration_seconds_bucket{le="0.1",operation="hash"}' in body
+    assert "hairfit_password_hash_pending " in body
@@ -0,0 +1,138 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+import models
+from services import popularity_service, style_service
+
+
+def record_history(client, headers, member_id, style_id):
+    response = client.post(
+        "/synthesis-history",
+        json={"member_id": member_id, "original_photo_path": "originals/a.jpg", "reference_style_id": style_id},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_popular_sort_and_top_n(client, auth_headers):
+    headers = auth_headers()
+    member_id = client.post("/members/", json={"name": "Kim", "phone": "010"}, headers=headers).json()["id"]
+    first, second = list(style_service.STYLE_IMAGES)[-2:]
+
+    for _ in range(2):
+        record_history(client, headers, member_id, first)
+    record_history(client, headers, member_id, second)
+
+    styles = client.get("/styles/?sort=popular", headers=headers).json()["styles"]
+    assert [s["id"] for s in styles[:2]] == [first, second]
+    assert styles[0]["usage_count"] == 2
+
+    popular = client.get("/styles/popular?limit=1&window=7d", headers=headers).json()
+    assert [(s["id"], s["usage_count"]) for s in popular["styles"]] == [(first, 2)]
+
+    other_headers = auth_headers("other@example.com")
+    assert client.get("/styles/popular", headers=other_headers).json()["styles"] == []
+    global_popular = client.get("/styles/popular?scope=global", headers=other_headers).json()
+    assert global_popular["styles"][0]["id"] == first
+
+
+def test_reconcile_expires_window_counts(db_session):
+    salon = models.Salon(name="Salon", owner_id=1)
+    db_session.add(salon)
+    db_session.commit()
+
+    popularity_service.record_style_usage(db_session, "style_1", salon.id, datetime.utcnow() - timedelta(days=10))
+    popularity_service.record_style_usage(db_session, "style_1", salon.id)
+    db_session.commit()
+    assert popularity_service.get_usage_counts(db_session, salon.id, "7d") == {"style_1": 2}
+
+    popularity_service.reconcile_windows(db_session)
+    assert popularity_service.get_usage_counts(db_session, salon.id, "7d") == {"style_1": 1}
+    assert popularity_service.get_usage_counts(db_session, salon.id, "30d") == {"style_1": 2}
+    assert popularity_service.get_usage_counts(db_session, None, "total") == {"style_1": 2}
+
+
+def test_rebuild_matches_incremental_counters(db_session):
+    salon = models.Salon(name="Salon", owner_id=1)
+    db_session.add(salon)
+    db_session.commit()
+    member = models.Member(id="m1", salon_id=salon.id, name="Lee", phone="010")
+    db_session.add(member)
+
+    now = datetime.utcnow()
+    for i, (member_id, style_id) in enumerate([("m1", "style_1"), ("m1", "style_2"), (None, "style_1")]):
+        db_session.add(models.SynthesisHistory(
+            id=f"h{i}", member_id=member_id, original_photo_path="o.jpg",
+            reference_style_id=style_id, created_at=now
+        ))
+        popularity_service.record_style_usage(db_session, style_id, salon.id if member_id else None, now)
+    db_session.commit()
+
+    incremental = {
+        window: (popularity_service.get_usage_counts(db_session, salon.id, window),
+                 popularity_service.get_usage_counts(db_session, None, window))
+        for window in popularity_service.WINDOWS
+    }
+    popularity_service.rebuild_from_history(db_session)
+    for window, expected in incremental.items():
+        assert popularity_service.get_usage_counts(db_session, salon.id, window) == expected[0]
+        assert popularity_service.get_usage_counts(db_session, None, window) == expected[1]
+
+
+def test_reconcile_repairs_total_drift(db_session):
+    salon = models.Salon(name="Salon", owner_id=1)
+    db_session.add(salon)
+    db_session.commit()
+    db_session.add(models.Member(id="m1", salon_id=salon.id, name="Lee", phone="010"))
+    now = datetime.utcnow()
+    for i, style_id in enumerate(["style_1", "style_1", "style_2"]):
+        db_session.add(models.SynthesisHistory(
+            id=f"h{i}", member_id="m1", original_photo_path="o.jpg", reference_style_id=style_id, created_at=now
+        ))
+        popularity_service.record_style_usage(db_session, style_id, salon.id, now)
+    # A usage whose history was deleted, and one whose counter upsert was lost
+    popularity_service.record_style_usage(db_session, "style_3", salon.id, now)
+    db_session.add(models.SynthesisHistory(
+        id="h3", member_id="m1", original_photo_path="o.jpg", reference_style_id="style_4", created_at=now
+    ))
+    db_session.commit()
+
+    popularity_service.reconcile(db_session)
+    assert popularity_service.get_usage_counts(db_session, salon.id, "total") == {
+        "style_1": 2, "style_2": 1, "style_3": 0, "style_4": 1,
+    }
+    assert popularity_service.get_usage_counts(db_session, None, "total")["style_4"] == 1
+
+
+def test_concurrent_usage_increments_are_not_lost(db_session):
+    Session = sessionmaker(bind=db_session.get_bind())
+
+    def record(_):
+        db = Session()
+        try:
+            popularity_service.record_style_usage(db, "style_7", None)
+            db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(24)))
+    assert popularity_service.get_usage_counts(db_session, None, "total") == {"style_7": 24}
+    assert db_session.query(models.StyleUsageDaily.count).scalar() == 24
+
+
+def test_reconciler_runs_a_pass_at_startup(monkeypatch):
+    passes = []
+    monkeypatch.setattr(popularity_service, "_reconcile_once", lambda: passes.append(1))
+
+    async def serve():
+        task = asyncio.create_task(popularity_service.run_reconciler(interval=3600))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(serve())
+    assert passes == [1]
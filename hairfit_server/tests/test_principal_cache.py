@@ -0,0 +1,96 @@
+"""Principal cache: authenticated requests skip the users/salons lookups until invalidated."""
+from contextlib import contextmanager
+
+from jose import jwt
+from sqlalchemy import event
+
+import models
+import auth_utils
+import principal_cache
+
+
+@contextmanager
+def principal_queries(async_session_factory):
+    """Collect SELECTs against users/salons issued through the async engine"""
+    statements = []
+    sync_engine = async_session_factory.kw["bind"].sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        lowered = statement.lower()
+        if lowered.startswith("select") and ("from users" in lowered or "from salons" in lowered):
+            statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_access_token_carries_user_and_salon_ids(client, auth_headers, db_session):
+    headers = auth_headers("cache@example.com")
+    payload = jwt.decode(headers["Authorization"].split()[1], auth_utils.SECRET_KEY, algorithms=[auth_utils.ALGORITHM])
+    user = db_session.query(models.User).filter(models.User.email == "cache@example.com").first()
+    salon = db_session.query(models.Salon).filter(models.Salon.owner_id == user.id).first()
+    assert payload["uid"] == user.id
+    assert payload["sid"] == salon.id
+
+
+def test_hot_path_skips_principal_queries(client, auth_headers, async_session_factory):
+    headers = auth_headers("cache@example.com")
+    with principal_queries(async_session_factory) as statements:
+        for _ in range(3):
+            assert client.get("/members/", headers=headers).status_code == 200
+            assert client.get("/users/me", headers=headers).json()["email"] == "cache@example.com"
+    assert statements == []
+
+
+def test_cold_cache_queries_once(client, auth_headers, async_session_factory):
+    headers = auth_headers("cache@example.com")
+    principal_cache.clear()
+    with principal_queries(async_session_factory) as statements:
+        for _ in range(3):
+            assert client.get("/members/", headers=headers).status_code == 200
+    # One user lookup; the salon id comes from the token's sid claim
+    assert len(statements) == 1
+
+
+def test_user_update_invalidates(client, auth_headers, db_session):
+    headers = auth_headers("cache@example.com")
+    assert client.get("/users/me", headers=headers).json()["username"] == "cache"
+
+    user = db_session.query(models.User).filter(models.User.email == "cache@example.com").first()
+    user.username = "renamed"
+    db_session.commit()
+
+    assert client.get("/users/me", headers=headers).json()["username"] == "renamed"
+
+
+def test_user_delete_invalidates(client, auth_headers, db_session):
+    headers = auth_headers("cache@example.com")
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    user = db_session.query(models.User).filter(models.User.email == "cache@example.com").first()
+    db_session.query(models.RefreshToken).filter(models.RefreshToken.user_id == user.id).delete()
+    db_session.query(models.Salon).filter(models.Salon.owner_id == user.id).delete()
+    db_session.delete(user)
+    db_session.commit()
+
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_mismatched_user_id_claim_rejected(client, auth_headers, db_session):
+    auth_headers("cache@example.com")
+    auth_headers("other@example.com")
+    other = db_session.query(models.User).filter(models.User.email == "other@example.com").first()
+
+    forged = auth_utils.create_access_token({"sub": "cache@example.com", "uid": other.id})
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {forged}"})
+    assert response.status_code == 401
+
+
+def test_legacy_token_without_ids(client, auth_headers):
+    auth_headers("cache@example.com")
+    token = auth_utils.create_access_token({"sub": "cache@example.com"})
+    response = client.get("/members/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
@@ -0,0 +1,69 @@
+"""On-demand request profiling: triggering, component attribution and the on-disk ring."""
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "profile-secret")
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_SECONDS", 0.001)
+    return tmp_path
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/resize")
+    def resize():
+        # Sync route: runs in the threadpool, as blocking handlers do
+        image = Image.new("RGB", (1024, 1024), "blue")
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            image.resize((512, 512), Image.Resampling.LANCZOS)
+        return {"ok": True}
+
+    return app
+
+
+def test_profile_written_only_when_requested(profile_dir):
+    client = TestClient(make_app())
+    assert "x-profile-id" not in client.get("/resize").headers
+    assert "x-profile-id" not in client.get("/resize", headers={"X-Profile": "wrong"}).headers
+    assert list(profile_dir.iterdir()) == []
+
+    response = client.get("/resize", headers={"X-Profile": "profile-secret"})
+    profile_id = response.headers["x-profile-id"]
+    [summary_path] = profile_dir.glob(f"*-{profile_id}.json")
+    summary = json.loads(summary_path.read_text())
+    assert summary["route"] == "/resize" and summary["status"] == 200
+    assert summary["samples"] > 0
+    assert summary["components"]["pil"]["share"] > 0.5
+
+    folded = summary_path.with_suffix(".folded").read_text().splitlines()
+    stack, count = folded[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "resize (tests/test_profiling.py)" in stack
+
+
+def test_sampled_requests_and_ring_bound(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    client = TestClient(make_app())
+    ids = [client.get("/resize").headers["x-profile-id"] for _ in range(3)]
+    kept = sorted(path.name for path in profile_dir.iterdir())
+    assert len(kept) == 4
+    assert not any(ids[0] in name for name in kept)
+
+
+def test_main_app_is_not_profiled_by_default(client):
+    assert "x-profile-id" not in client.get("/health").headers
@@ -0,0 +1,109 @@
+"""Token-bucket rate limiting: identities, cost weights, shared stores, Retry-After."""
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+import auth_utils
+from rate_limit import (
+    TokenBucketLimiter, ClientIdentity, MemoryBucketStore, SQLiteBucketStore,
+    RateLimitExceeded, parse_networks,
+)
+
+identity = ClientIdentity(parse_networks("127.0.0.1/32,172.16.0.0/12"), auth_utils.SECRET_KEY, auth_utils.ALGORITHM)
+
+
+def make_request(peer="203.0.113.9", headers=None, method="GET", path="/members/"):
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": method, "path": path, "headers": raw_headers,
+                    "client": (peer, 1234), "query_string": b""})
+
+
+def test_identity_prefers_salon_then_trusted_forwarded_ip():
+    token = auth_utils.create_access_token({"sub": "a@b.c", "uid": 7, "sid": 3})
+    assert identity(make_request(headers={"Authorization": f"Bearer {token}"})) == "salon:3"
+    legacy = auth_utils.create_access_token({"sub": "a@b.c"})
+    assert identity(make_request(headers={"Authorization": f"Bearer {legacy}"})) == "user:a@b.c"
+
+    # Behind nginx: the rightmost untrusted hop is the client
+    proxied = make_request(peer="172.18.0.5", headers={"X-Forwarded-For": "198.51.100.1, 198.51.100.2"})
+    assert identity(proxied) == "ip:198.51.100.2"
+    # A client talking to us directly cannot spoof its address
+    direct = make_request(peer="203.0.113.9", headers={"X-Forwarded-For": "1.2.3.4"})
+    assert identity(direct) == "ip:203.0.113.9"
+    # Forged token falls back to the IP
+    assert identity(make_request(headers={"Authorization": "Bearer forged"})) == "ip:203.0.113.9"
+
+
+def test_cost_weighted_bucket_and_retry_after():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), key_func=identity)
+    request = make_request()
+    limiter.hit(request, "10/minute", "api", cost=6)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.hit(request, "10/minute", "api", cost=6)
+    # 4 tokens left, 2 missing at 1 token per 6 seconds
+    assert excinfo.value.headers["Retry-After"] == "12"
+    assert excinfo.value.status_code == 429
+
+    # Cheap requests still fit, and other callers have their own bucket
+    limiter.hit(request, "10/minute", "api", cost=1)
+    limiter.hit(make_request(peer="203.0.113.10"), "10/minute", "api", cost=6)
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    allowed, tokens = first.take("api:salon:1", 5, 5 / 60, 4, now=1000.0)
+    assert allowed and tokens == 1
+    allowed, tokens = second.take("api:salon:1", 5, 5 / 60, 4, now=1000.0)
+    assert not allowed
+    # Refills with time
+    allowed, _ = second.take("api:salon:1", 5, 5 / 60, 4, now=1036.0)
+    assert allowed
+
+
+def test_login_limit_returns_retry_after(client):
+    client.post("/register", json={"email": "rl@example.com", "username": "rl", "password": "password123"})
+    for _ in range(10):
+        client.post("/login", json={"email": "rl@example.com", "password": "wrong"})
+    response = client.post("/login", json={"email": "rl@example.com", "password": "password123"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 6
+
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_async_hits_take_from_the_store_off_the_event_loop(tmp_path):
+    store = SQLiteBucketStore(str(tmp_path / "ratelimit.db"))
+    calls = []
+    take = store.take
+    store.take = lambda *args: calls.append(on_event_loop()) or take(*args)
+    limiter = TokenBucketLimiter(store, key_func=identity)
+    asyncio.run(limiter.hit_async(make_request(), "1/minute", "api"))
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(limiter.hit_async(make_request(), "1/minute", "api"))
+    assert calls == [False, False]
+
+
+def test_store_errors_fail_open(client, monkeypatch):
+    from dependencies import limiter
+
+    def broken_take(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(limiter, "store", SimpleNamespace(take=broken_take))
+    monkeypatch.setattr(limiter, "enabled", True)
+    errors = limiter.store_errors
+    # /login is rate limited itself and also pays the app-wide budget; neither may fail the request
+    response = client.post("/login", json={"email": "nobody@example.com", "password": "password123"})
+    assert response.status_code == 401
+    assert limiter.store_errors - errors == 2
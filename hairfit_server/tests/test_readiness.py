@@ -0,0 +1,95 @@
+"""Startup and readiness: lazy Gemini client, cached model discovery and /ready."""
+import asyncio
+import json
+import threading
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from services import gemini_service, style_service
+
+
+def test_ready_reports_each_dependency(client):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert {"database", "storage", "catalog", "model"} <= set(data["checks"])
+    assert all(data["checks"][name]["ok"] for name in ("database", "storage", "catalog"))
+    # Synthesis is optional for readiness; without a key the model client is disabled
+    assert data["checks"]["model"]["required"] is False
+    assert data["startup"]["startup_seconds"] is not None
+
+
+def test_ready_fails_until_catalog_is_loaded(client, monkeypatch):
+    monkeypatch.setattr(style_service, "_loaded_at", None)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["catalog"]["ok"] is False
+    assert client.get("/health").status_code == 200
+
+
+def test_importing_the_app_does_not_load_gemini():
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SECRET_KEY="test", GEMINI_API_KEY="test-key")
+    code = "import sys, main; print('google.generativeai' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=server_dir, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    assert output.strip().endswith("False")
+
+
+def test_model_discovery_uses_fresh_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def list_models(request_options=None):
+        calls.append(request_options)
+        return [SimpleNamespace(name="models/gemini-image", supported_generation_methods=["generateContent"]),
+                SimpleNamespace(name="models/embedding", supported_generation_methods=["embedContent"])]
+
+    cache_file = tmp_path / "gemini_models.json"
+    monkeypatch.setattr(gemini_service, "MODELS_CACHE_FILE", cache_file)
+    monkeypatch.setattr(gemini_service, "client", lambda: SimpleNamespace(list_models=list_models))
+
+    assert gemini_service.discover_models()["models"] == ["gemini-image"]
+    assert gemini_service.discover_models()["models"] == ["gemini-image"]
+    assert len(calls) == 1
+
+    # An expired list is fetched again
+    cache_file.write_text(json.dumps({"checked_at": time.time() - gemini_service.MODEL_DISCOVERY_TTL_SECONDS - 1,
+                                      "models": ["old"]}))
+    assert gemini_service.discover_models()["models"] == ["gemini-image"]
+    assert len(calls) == 2
+    # The SDK's default retry would keep listing for 60s whatever the per-call timeout
+    assert calls[0]["retry"].timeout == gemini_service.MODEL_DISCOVERY_TIMEOUT_SECONDS
+
+
+def test_hung_discovery_does_not_block_shutdown(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def discover_models():
+        calls.append(threading.current_thread())
+        release.wait(5)
+        return {"checked_at": time.time(), "models": ["gemini-image"]}
+
+    monkeypatch.setattr(gemini_service, "discover_models", discover_models)
+    monkeypatch.setattr(gemini_service, "DISCOVERY", gemini_service.ModelDiscovery())
+    monkeypatch.setattr(gemini_service, "MODEL_DISCOVERY_TIMEOUT_SECONDS", 0.02)
+    monkeypatch.setattr(gemini_service, "MODEL_DISCOVERY_RETRY_SECONDS", 0.02)
+
+    async def serve():
+        task = asyncio.create_task(gemini_service.run_model_discovery())
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    started = time.perf_counter()
+    asyncio.run(serve())
+    try:
+        # asyncio.run returns without waiting for the hung call, which is retried by waiting on it again
+        assert time.perf_counter() - started < 1
+        assert len(calls) == 1 and calls[0].daemon
+        assert gemini_service.DISCOVERY.snapshot()["error"] is not None
+    finally:
+        release.set()
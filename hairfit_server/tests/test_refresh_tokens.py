@@ -0,0 +1,71 @@
+"""Refresh token lifecycle: hashed storage, rotation, per-user cap and sweeping."""
+from datetime import datetime, timedelta
+
+import models
+import auth_utils
+from services import token_service
+
+
+def register(client, email="token@example.com"):
+    response = client.post("/register", json={"email": email, "username": "tokenuser", "password": "password123"})
+    return response.json()["refresh_token"]
+
+
+def tokens(db_session):
+    db_session.expire_all()
+    return db_session.query(models.RefreshToken).all()
+
+
+def test_only_hash_is_stored(client, db_session):
+    refresh_token = register(client)
+    (row,) = tokens(db_session)
+    assert row.token_hash == auth_utils.hash_refresh_token(refresh_token)
+    assert refresh_token not in row.token_hash
+
+
+def test_rotation_replaces_token(client, db_session):
+    old_token = register(client)
+    response = client.post("/refresh", json={"refresh_token": old_token})
+    assert response.status_code == 200
+    new_token = response.json()["refresh_token"]
+
+    (row,) = tokens(db_session)
+    assert row.token_hash == auth_utils.hash_refresh_token(new_token)
+    # The old token cannot be replayed
+    assert client.post("/refresh", json={"refresh_token": old_token}).status_code == 401
+    assert client.post("/refresh", json={"refresh_token": new_token}).status_code == 200
+
+
+def test_logout_deletes_token(client, db_session):
+    refresh_token = register(client)
+    client.post("/logout", json={"refresh_token": refresh_token})
+    assert tokens(db_session) == []
+    assert client.post("/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+
+def test_per_user_cap_evicts_oldest(client, db_session, monkeypatch):
+    monkeypatch.setattr(auth_utils, "REFRESH_TOKEN_MAX_PER_USER", 3)
+    issued = [register(client)]
+    for _ in range(4):
+        response = client.post("/login", json={"email": "token@example.com", "password": "password123"})
+        issued.append(response.json()["refresh_token"])
+
+    hashes = {row.token_hash for row in tokens(db_session)}
+    assert hashes == {auth_utils.hash_refresh_token(token) for token in issued[-3:]}
+    assert client.post("/refresh", json={"refresh_token": issued[0]}).status_code == 401
+
+
+def test_sweeper_deletes_expired_and_revoked_in_batches(client, db_session):
+    register(client)
+    user = db_session.query(models.User).first()
+    now = datetime.utcnow()
+    for i in range(7):
+        db_session.add(models.RefreshToken(token_hash=f"expired-{i}", user_id=user.id, expires_at=now - timedelta(days=1)))
+    for i in range(3):
+        db_session.add(models.RefreshToken(token_hash=f"revoked-{i}", user_id=user.id,
+                                           expires_at=now + timedelta(days=1), revoked=True))
+    db_session.commit()
+
+    assert token_service.purge_refresh_tokens(db_session, batch_size=2, now=now) == 10
+    (row,) = tokens(db_session)
+    assert not row.revoked and row.expires_at > now
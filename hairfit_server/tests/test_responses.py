@@ -0,0 +1,64 @@
+"""Response encoding: negotiated compression and sparse fieldsets (fields=)."""
+import models
+from compression import choose_encoding
+from tests.test_pagination import seed_members
+from utils import get_user_salon
+
+
+def salon_headers(auth_headers, db_session, email):
+    headers = auth_headers(email)
+    user = db_session.query(models.User).filter(models.User.email == email).first()
+    return headers, get_user_salon(user, db_session).id
+
+
+def test_choose_encoding_follows_q_values():
+    assert choose_encoding("gzip, deflate, br", brotli_available=True) == "br"
+    assert choose_encoding("gzip, deflate, br", brotli_available=False) == "gzip"
+    assert choose_encoding("br;q=0.5, gzip", brotli_available=True) == "gzip"
+    assert choose_encoding("*", brotli_available=True) == "br"
+    assert choose_encoding("gzip;q=0, identity", brotli_available=False) is None
+    assert choose_encoding("", brotli_available=True) is None
+
+
+def test_large_json_is_compressed_when_accepted(client, auth_headers, db_session):
+    headers, salon_id = salon_headers(auth_headers, db_session, "gzip@example.com")
+    seed_members(db_session, salon_id, count=40)
+
+    response = client.get("/members/?limit=40", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()) == 40
+
+    response = client.get("/members/?limit=40", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    # Small bodies are not worth compressing
+    response = client.get("/members/?limit=1", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_member_fields_keep_id_and_page_headers(client, auth_headers, db_session):
+    headers, salon_id = salon_headers(auth_headers, db_session, "fields@example.com")
+    seed_members(db_session, salon_id, count=5)
+
+    response = client.get("/members/?limit=2&fields=name,phone", headers=headers)
+    assert response.status_code == 200
+    assert [set(row) for row in response.json()] == [{"id", "name", "phone"}] * 2
+    assert response.headers["X-Next-Cursor"]
+
+    full = client.get("/members/?limit=2", headers=headers).json()
+    assert {"salon_id", "created_at", "memo"} <= set(full[0])
+
+    response = client.get("/members/?fields=name,password", headers=headers)
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+
+def test_style_and_history_fields(client, auth_headers, db_session):
+    headers, _ = salon_headers(auth_headers, db_session, "style-fields@example.com")
+
+    styles = client.get("/styles/?fields=name", headers=headers).json()["styles"]
+    assert styles and all(set(style) == {"id", "name"} for style in styles)
+
+    history = client.get("/synthesis-history?fields=result_photo_path", headers=headers)
+    assert history.status_code == 200
+    assert client.get("/synthesis-history?fields=salon", headers=headers).status_code == 400
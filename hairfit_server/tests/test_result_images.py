@@ -0,0 +1,134 @@
+"""Synthesis result transcoding: size classes, stored files, preview serving and orphan cleanup."""
+import base64
+import io
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image, JpegImagePlugin
+
+import models
+from routers import files
+from services import gemini_service, image_service, storage_service, style_service
+
+
+def portrait_png(width=1600, height=1200) -> bytes:
+    """Smooth gradients with some texture, closer to a photo than a flat fill"""
+    y, x = np.mgrid[0:height, 0:width]
+    rng = np.random.default_rng(7)
+    pixels = np.stack([
+        128 + 80 * np.sin(x / 90.0),
+        128 + 60 * np.cos(y / 70.0),
+        128 + 50 * np.sin((x + y) / 120.0),
+    ], axis=-1) + rng.normal(0, 2, (height, width, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype("uint8")).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    diff = np.asarray(a.convert("RGB"), dtype=float) - np.asarray(b.convert("RGB"), dtype=float)
+    return 10 * np.log10(255 ** 2 / np.mean(diff ** 2))
+
+
+def use_upload_dir(monkeypatch, tmp_path):
+    (tmp_path / "results").mkdir()
+    monkeypatch.setattr(storage_service, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(files, "UPLOAD_DIR", tmp_path)
+
+
+def fake_model(generated: bytes):
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, contents, request_options=None):
+            part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=generated))
+            candidate = SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"), safety_ratings=[],
+                                        content=SimpleNamespace(parts=[part]))
+            return SimpleNamespace(candidates=[candidate], prompt_feedback=None)
+    return FakeModel
+
+
+def test_encode_result_size_classes(monkeypatch):
+    monkeypatch.setattr(image_service, "RESULT_FULL_MAX_SIZE", 1024)
+    original = portrait_png()
+    source = Image.open(io.BytesIO(original))
+
+    encoded = image_service.encode_result(original, "webp")
+    full = Image.open(io.BytesIO(encoded["full"]))
+    preview = Image.open(io.BytesIO(encoded["preview"]))
+    assert (full.format, full.size) == ("WEBP", (1024, 768))
+    assert max(preview.size) == image_service.RESULT_PREVIEW_MAX_SIZE
+    assert len(encoded["preview"]) < len(encoded["full"]) < len(original) / 2
+    assert psnr(full, source.resize(full.size, Image.Resampling.LANCZOS)) > 40
+
+    encoded = image_service.encode_result(original, "jpeg")
+    full = Image.open(io.BytesIO(encoded["full"]))
+    assert full.format == "JPEG" and JpegImagePlugin.get_sampling(full) == 0  # 4:4:4 chroma
+    assert psnr(full, source.resize(full.size, Image.Resampling.LANCZOS)) > 40
+
+
+def test_synthesize_stores_both_sizes(client, auth_headers, monkeypatch, tmp_path):
+    use_upload_dir(monkeypatch, tmp_path)
+    headers = auth_headers("encode@example.com")
+    original = portrait_png(800, 600)
+    monkeypatch.setattr(gemini_service, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_service, "generative_model", fake_model(original))
+    style_id = next(iter(style_service.STYLE_IMAGES))
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="JPEG")
+
+    body = client.post("/synthesize", files={"file": ("face.jpg", buffer.getvalue(), "image/jpeg")},
+                       data={"style_id": style_id}, headers=headers).json()
+    assert body["result_mime_type"] == "image/webp"
+    assert body["result_photo_path"].endswith(".webp")
+    assert body["preview_photo_path"] == image_service.preview_path(body["result_photo_path"])
+    full_bytes = base64.b64decode(body["result_image"])
+    assert (tmp_path / body["result_photo_path"]).read_bytes() == full_bytes
+    assert body["encoding"]["original_bytes"] == len(original) > body["encoding"]["full_bytes"] == len(full_bytes)
+
+    history = client.post("/synthesis-history", headers=headers, json={
+        "original_photo_path": "originals/face.jpg", "reference_style_id": style_id,
+        "result_photo_path": body["result_photo_path"],
+    })
+    assert history.status_code == 200
+    url = f"/images/{body['result_photo_path']}"
+    preview = client.get(url, params={"size": "preview"})
+    assert preview.headers["content-type"] == "image/webp"
+    assert len(preview.content) == body["encoding"]["preview_bytes"] < len(client.get(url).content)
+
+    # Without inline the client fetches result_photo_path instead
+    body = client.post("/synthesize", files={"file": ("face.jpg", buffer.getvalue(), "image/jpeg")},
+                       data={"style_id": style_id, "inline": "false"}, headers=headers).json()
+    assert "result_image" not in body and (tmp_path / body["preview_photo_path"]).exists()
+
+
+def test_preview_falls_back_to_full_image(client, monkeypatch, tmp_path):
+    use_upload_dir(monkeypatch, tmp_path)
+    (tmp_path / "results" / "uploaded.png").write_bytes(portrait_png(64, 64))
+    response = client.get("/images/results/uploaded.png", params={"size": "preview"})
+    assert response.status_code == 200 and response.headers["content-type"] == "image/png"
+
+
+def test_sweeper_removes_unsaved_results(db_session, monkeypatch, tmp_path):
+    use_upload_dir(monkeypatch, tmp_path)
+    results = tmp_path / "results"
+    for name in ("old.webp", "old.preview.webp", "saved.webp", "saved.preview.webp",
+                 "new.webp", "new.preview.webp", "uploaded.png"):
+        (results / name).write_bytes(b"x")
+    past = time.time() - 2 * image_service.RESULT_ORPHAN_TTL_SECONDS
+    for name in ("old.preview.webp", "saved.preview.webp", "uploaded.png"):
+        os.utime(results / name, (past, past))
+    db_session.add(models.SynthesisHistory(
+        id="saved", original_photo_path="originals/x.jpg",
+        reference_style_id="style_1", result_photo_path="results/saved.webp",
+    ))
+    db_session.commit()
+
+    assert image_service.sweep_orphan_results(db_session) == 2
+    storage_service.wait_for_removals()
+    assert sorted(path.name for path in results.iterdir()) == [
+        "new.preview.webp", "new.webp", "saved.preview.webp", "saved.webp", "uploaded.png",
+    ]
@@ -0,0 +1,136 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from services import style_service
+from services.style_service import StyleIndex, compute_image_signature
+
+
+def make_image(color, stripes=False, size=(128, 128)):
+    image = Image.new("RGB", size, color)
+    if stripes:
+        draw = ImageDraw.Draw(image)
+        for x in range(0, size[0], 16):
+            draw.rectangle([x, 0, x + 7, size[1]], fill=(255, 255, 255))
+    return image
+
+
+def make_gradient(size=(128, 128)):
+    x = np.linspace(0, 255, size[0], dtype=np.float32)
+    y = np.linspace(0, 255, size[1], dtype=np.float32)[:, None]
+    pixels = np.stack([np.broadcast_to(x, size[::-1]), np.broadcast_to(y, size[::-1]), (x + y) / 2], axis=-1)
+    return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+
+def test_signature_is_stable_under_resize():
+    image = make_image((120, 60, 30), stripes=True)
+    dhash, vector = compute_image_signature(image)
+    dhash_small, vector_small = compute_image_signature(image.resize((96, 96)))
+
+    assert vector.shape == (style_service.FEATURE_DIM,)
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert bin(dhash ^ dhash_small).count("1") <= style_service.DUPLICATE_HASH_DISTANCE
+    assert float(vector @ vector_small) > 0.95
+
+
+def test_index_similar_and_remove():
+    index = StyleIndex()
+    images = {
+        "style_a": make_image((200, 30, 30)),
+        "style_b": make_image((190, 40, 35)),
+        "style_c": make_image((20, 40, 220), stripes=True),
+    }
+    for style_id, image in images.items():
+        index.add(style_id, *compute_image_signature(image))
+
+    results = index.similar("style_a", k=2)
+    assert [style_id for style_id, _ in results] == ["style_b", "style_c"]
+    assert results[0][1] >= results[1][1]
+
+    index.remove("style_a")
+    assert "style_a" not in index
+    assert index.vectors.shape == (2, style_service.FEATURE_DIM)
+    assert index.similar("style_c", k=5)[0][0] == "style_b"
+
+
+def test_index_duplicates_uses_hash_distance():
+    index = StyleIndex()
+    image = make_gradient()
+    index.add("style_x", *compute_image_signature(image))
+
+    dhash, vector = compute_image_signature(image.resize((100, 100)))
+    duplicates = index.duplicates(dhash, vector)
+    assert duplicates and duplicates[0]["style_id"] == "style_x"
+
+    assert index.duplicates(dhash ^ 0xFFFFFFFF, vector) == []
+
+
+def test_rebuild_without_feature_cache(client, monkeypatch, tmp_path):
+    cache_file = tmp_path / "features.npz"
+    monkeypatch.setattr(style_service, "FEATURE_CACHE_FILE", cache_file)
+    monkeypatch.setattr(style_service, "STYLE_INDEX", style_service.STYLE_INDEX)
+    style_service.build_style_index()
+
+    index = style_service.STYLE_INDEX
+    assert len(index) == len(style_service.STYLE_IMAGES) > 1
+    style_id, image_path = next(iter(style_service.STYLE_IMAGES.items()))
+    assert index.similar(style_id, 1)
+    with Image.open(image_path) as image:
+        assert index.duplicates(*compute_image_signature(image))[0]["style_id"] == style_id
+    # The computed signatures were cached for the next start
+    assert set(StyleIndex().load(cache_file)) == set(style_service.STYLE_IMAGES)
+
+
+def test_similar_styles_endpoint(client, auth_headers):
+    headers = auth_headers()
+    style_id = next(iter(style_service.STYLE_IMAGES))
+
+    response = client.get(f"/styles/{style_id}/similar?k=3", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["style_id"] == style_id
+    assert len(data["similar"]) == min(3, len(style_service.STYLE_IMAGES) - 1)
+    assert all(item["id"] != style_id for item in data["similar"])
+
+    response = client.get("/styles/style_missing/similar", headers=headers)
+    assert response.status_code == 404
+
+
+def test_upload_rejects_near_duplicate(client, auth_headers):
+    headers = auth_headers("dupes@example.com")
+    style_id, image_path = next(iter(style_service.STYLE_IMAGES.items()))
+
+    buffer = io.BytesIO()
+    with Image.open(image_path) as image:
+        image.convert("RGB").resize((256, 256)).save(buffer, format="JPEG")
+
+    response = client.post(
+        "/styles/",
+        files={"file": ("copy.jpg", buffer.getvalue(), "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 409
+    duplicates = response.json()["detail"]["duplicates"]
+    assert style_id in [d["style_id"] for d in duplicates]
+
+
+def test_index_grows_past_initial_capacity():
+    index = StyleIndex()
+    rng = np.random.default_rng(0)
+    count = style_service.INDEX_INITIAL_CAPACITY * 3 + 5
+    vectors = rng.random((count, style_service.FEATURE_DIM), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        index.add(f"style_{i}", i, vector, float(i))
+
+    assert len(index) == count
+    assert index.vectors.shape == (count, style_service.FEATURE_DIM)
+    assert np.array_equal(index.vectors, vectors)
+    assert index.hashes.tolist() == list(range(count))
+
+    index.remove("style_0")
+    index.add("style_1", 99, vectors[1], 1.0)
+    assert len(index) == count - 1
+    assert index.ids[0] == f"style_{count - 1}"
+    assert np.array_equal(index.vectors[0], vectors[-1])
+    assert int(index.hashes[index.rows["style_1"]]) == 99
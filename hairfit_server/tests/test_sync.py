@@ -0,0 +1,102 @@
+"""Delta sync: change feed with tombstones, idempotent batched push."""
+import models
+
+
+def create_member(client, headers, name):
+    return client.post("/members/", headers=headers, json={"name": name, "phone": "010-1234-5678"}).json()["id"]
+
+
+def test_pull_returns_changes_and_tombstones(client, auth_headers, db_session):
+    headers = auth_headers()
+    a = create_member(client, headers, "A")
+    b = create_member(client, headers, "B")
+    history = client.post("/synthesis-history", headers=headers, json={
+        "member_id": b, "original_photo_path": "originals/x.jpg", "reference_style_id": "style_1"
+    }).json()["id"]
+
+    first = client.get("/sync", headers=headers).json()
+    assert {m["id"] for m in first["members"]} == {a, b}
+    assert [h["id"] for h in first["history"]] == [history]
+    assert not first["has_more"]
+
+    client.put(f"/members/{a}", headers=headers, json={"memo": "changed"})
+    client.delete(f"/members/{b}", headers=headers)
+
+    delta = client.get("/sync", headers=headers, params={"since": first["cursor"]}).json()
+    assert [(m["id"], m["memo"]) for m in delta["members"]] == [(a, "changed")]
+    assert delta["deleted_members"] == [b]
+    assert delta["deleted_history"] == [history]
+
+    empty = client.get("/sync", headers=headers, params={"since": delta["cursor"]}).json()
+    assert empty["members"] == [] and empty["cursor"] == delta["cursor"]
+
+
+def test_pull_pages_and_salon_scope(client, auth_headers):
+    headers = auth_headers()
+    ids = [create_member(client, headers, f"M{i}") for i in range(5)]
+    other = auth_headers("other@example.com")
+    create_member(client, other, "Other")
+
+    seen, cursor = [], None
+    while True:
+        page = client.get("/sync", headers=headers, params={"since": cursor, "limit": 2} if cursor else {"limit": 2}).json()
+        seen += [m["id"] for m in page["members"]]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == ids
+
+    assert client.get("/sync", headers=headers, params={"since": "abc"}).status_code == 400
+
+
+def test_push_is_idempotent(client, auth_headers, db_session):
+    headers = auth_headers()
+    push = {
+        "members": [{"id": "tablet-m1", "name": "오프라인", "phone": "010-2222-3333",
+                     "updated_at": "2026-01-01T09:00:00+09:00"}],
+        "history": [{"id": "tablet-h1", "member_id": "tablet-m1", "original_photo_path": "originals/t.jpg",
+                     "reference_style_id": "style_2"}],
+    }
+    result = client.post("/sync", headers=headers, json=push).json()
+    assert (result["inserted_members"], result["inserted_history"], result["conflicts"]) == (1, 1, [])
+
+    replay = client.post("/sync", headers=headers, json=push).json()
+    assert (replay["inserted_members"], replay["updated_members"], replay["inserted_history"]) == (0, 0, 0)
+    assert replay["unchanged"] == 2
+
+    history = db_session.query(models.SynthesisHistory).filter_by(id="tablet-h1").one()
+    assert history.is_synced
+    assert client.get("/members/search", headers=headers, params={"q": "오프"}).json()[0]["id"] == "tablet-m1"
+
+    # Older edits lose to the server copy
+    stale = {"members": [{**push["members"][0], "name": "old", "updated_at": "2025-12-31T00:00:00Z"}]}
+    assert client.post("/sync", headers=headers, json=stale).json()["conflicts"][0]["reason"] == "stale"
+
+    deleted = client.post("/sync", headers=headers, json={"deleted_members": ["tablet-m1"]}).json()
+    assert deleted["deleted_members"] == 1
+    again = client.post("/sync", headers=headers, json={"deleted_members": ["tablet-m1"]}).json()
+    assert (again["deleted_members"], again["unchanged"]) == (0, 1)
+    assert "tablet-m1" in client.get("/sync", headers=headers).json()["deleted_members"]
+
+
+def test_push_cannot_touch_other_salon(client, auth_headers):
+    owner = auth_headers()
+    member_id = create_member(client, owner, "Mine")
+    other = auth_headers("other@example.com")
+
+    result = client.post("/sync", headers=other, json={
+        "members": [{"id": member_id, "name": "hijack", "phone": "010"}],
+        "history": [{"id": "h-x", "member_id": member_id, "original_photo_path": "a.jpg", "reference_style_id": "s"}],
+        "deleted_members": [member_id],
+    }).json()
+    assert [c["reason"] for c in result["conflicts"]] == ["not found", "member not found"]
+    assert result["deleted_members"] == 0
+    assert client.get(f"/members/{member_id}", headers=owner).json()["name"] == "Mine"
+
+
+def test_sync_responses_are_compressed(client, auth_headers):
+    headers = auth_headers()
+    for i in range(20):
+        create_member(client, headers, f"Member {i}")
+    response = client.get("/sync", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
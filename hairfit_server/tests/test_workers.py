@@ -0,0 +1,108 @@
+"""Multi-worker coordination: process locks, leader loops and the shared style catalog."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+import process_lock
+from process_lock import ProcessLock, run_exclusive
+from services import style_service
+
+
+def test_process_lock_excludes_other_holders(tmp_path):
+    # flock() conflicts between separate open files, as it does between workers
+    first, second = ProcessLock(tmp_path / "a.lock"), ProcessLock(tmp_path / "a.lock")
+    assert first.acquire(blocking=False)
+    assert not second.acquire(blocking=False)
+    first.release()
+    assert second.acquire(blocking=False)
+    second.release()
+
+
+def test_run_exclusive_hands_over_when_leader_exits(tmp_path, monkeypatch):
+    monkeypatch.setattr(process_lock, "RUNTIME_DIR", tmp_path)
+    monkeypatch.setattr(process_lock, "LEADER_RETRY_SECONDS", 0.01)
+    running = []
+
+    def loop(name):
+        async def run():
+            running.append(name)
+            await asyncio.sleep(3600)
+        return run
+
+    async def scenario():
+        leader = asyncio.create_task(run_exclusive("sweeper", loop("leader")))
+        await asyncio.sleep(0.05)
+        standby = asyncio.create_task(run_exclusive("sweeper", loop("standby")))
+        await asyncio.sleep(0.05)
+        assert running == ["leader"]
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        assert running == ["leader", "standby"]
+        standby.cancel()
+        await asyncio.gather(standby, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def private_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(style_service, "METADATA_FILE", tmp_path / "metadata.json")
+    monkeypatch.setattr(style_service, "CATALOG_VERSION_FILE", tmp_path / ".catalog_version")
+    style_service.load_catalog()
+    yield tmp_path
+    monkeypatch.undo()
+    style_service.load_catalog()
+
+
+def test_catalog_change_from_another_worker_is_picked_up(client, auth_headers, private_catalog):
+    headers = auth_headers()
+    style_id = next(iter(style_service.STYLE_IMAGES))
+
+    # Another worker renames the style and publishes a new catalog version
+    metadata = json.loads((private_catalog / "metadata.json").read_text(encoding="utf-8"))
+    metadata[style_id]["name"] = "Renamed Elsewhere"
+    (private_catalog / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+    (private_catalog / ".catalog_version").write_text("other worker")
+
+    styles = client.get("/styles/", headers=headers).json()["styles"]
+    assert next(s for s in styles if s["id"] == style_id)["name"] == "Renamed Elsewhere"
+
+
+def test_catalog_update_publishes_version(client, auth_headers, private_catalog):
+    headers = auth_headers()
+    style_id = next(iter(style_service.STYLE_IMAGES))
+
+    response = client.put(f"/styles/{style_id}", json={"name": "Layered Bob"}, headers=headers)
+    assert response.status_code == 200
+    assert (private_catalog / ".catalog_version").exists()
+    saved = json.loads((private_catalog / "metadata.json").read_text(encoding="utf-8"))
+    assert saved[style_id]["name"] == "Layered Bob"
+
+
+def test_catalog_reload_waits_for_the_lock_off_the_event_loop(private_catalog):
+    from routers import styles
+
+    (private_catalog / ".catalog_version").write_text("other worker")
+    style_service.CATALOG_LOCK.acquire()
+    threading.Timer(0.3, style_service.CATALOG_LOCK.release).start()
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await styles._fresh_catalog()
+        ticker.cancel()
+        return ticks
+
+    # The loop kept serving while another holder had the catalog lock
+    assert asyncio.run(scenario()) >= 10
+    assert not style_service.catalog_changed()
@@ -1,7 +1,21 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Optional
+
 import models
+import principal_cache
+
+def image_url(photo_path: Optional[str], size: Optional[str] = None) -> Optional[str]:
+    """URL served by routers/files.get_image for an uploads-relative path like results/x.png"""
+    if not photo_path:
+        return None
+    return f"/images/{photo_path}?size={size}" if size else f"/images/{photo_path}"
 
 def get_user_salon(current_user: models.User, db: Session) -> models.Salon:
+    cached = principal_cache.get_salon(current_user.id)
+    if cached is not None:
+        return cached
     salon = db.query(models.Salon).filter(models.Salon.owner_id == current_user.id).first()
     if not salon:
         # Auto-create salon if it doesn't exist
@@ -11,4 +25,22 @@ def get_user_salon(current_user: models.User, db: Session) -> models.Salon:
         db.commit()
         db.refresh(salon)
         print(f"Auto-created salon for user {current_user.email}")
+    principal_cache.set_salon(current_user, salon)
+    return salon
+
+async def get_user_salon_async(current_user: models.User, db: AsyncSession) -> models.Salon:
+    cached = principal_cache.get_salon(current_user.id)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(models.Salon).where(models.Salon.owner_id == current_user.id))
+    salon = result.scalars().first()
+    if not salon:
+        # Auto-create salon if it doesn't exist
+        salon_name = f"{current_user.username}'s Salon"
+        salon = models.Salon(name=salon_name, owner_id=current_user.id)
+        db.add(salon)
+        await db.commit()
+        await db.refresh(salon)
+        print(f"Auto-created salon for user {current_user.email}")
+    principal_cache.set_salon(current_user, salon)
     return salon
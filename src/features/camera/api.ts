@@ -1,5 +1,10 @@
-import api from '../../services/api'
-import { Style, SynthesisHistory } from '../../types'
+import api, { getAllPages } from '../../services/api'
+import { Style, SynthesisHistory, SynthesisResponse } from '../../types'
+
+export interface SynthesizedImage {
+  image: string // data URL
+  photoPath?: string
+}
 
 const base64ToFile = (base64: string, filename: string): File => {
   const arr = base64.split(',')
@@ -25,12 +30,12 @@ export const synthesisApi = {
     }))
   },
 
-  synthesize: async (userImage: File, styleId: string): Promise<string> => {
+  synthesize: async (userImage: File, styleId: string): Promise<SynthesizedImage> => {
     const formData = new FormData()
     formData.append('file', userImage)
     formData.append('style_id', styleId)
 
-    const response = await api.post<{ result_image: string }>('/synthesize', formData, {
+    const response = await api.post<SynthesisResponse>('/synthesize', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
@@ -41,12 +46,16 @@ export const synthesisApi = {
       throw new Error('No result image returned from server')
     }
 
-    return response.data.result_image // base64 encoded
+    // Stored server-side as WebP/JPEG; saving the history reuses result_photo_path
+    const mimeType = response.data.result_mime_type || 'image/png'
+    return {
+      image: `data:${mimeType};base64,${response.data.result_image}`,
+      photoPath: response.data.result_photo_path,
+    }
   },
 
   getHistory: async (): Promise<SynthesisHistory[]> => {
-    const response = await api.get<SynthesisHistory[]>('/synthesis-history')
-    return response.data
+    return getAllPages<SynthesisHistory>('/synthesis-history')
   },
 
   saveHistory: async (data: {
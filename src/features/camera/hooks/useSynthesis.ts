@@ -10,7 +10,7 @@ export function useStyles() {
 }
 
 export function useSynthesis() {
-  const { setResultImage, setIsProcessing } = useCameraStore()
+  const { setResultImage, setResultPhotoPath, setIsProcessing } = useCameraStore()
 
   return useMutation({
     mutationFn: async ({ image, styleId }: { image: File; styleId: string }) => {
@@ -18,8 +18,9 @@ export function useSynthesis() {
       const result = await synthesisApi.synthesize(image, styleId)
       return result
     },
-    onSuccess: (resultImage) => {
-      setResultImage(resultImage)
+    onSuccess: (result) => {
+      setResultImage(result.image)
+      setResultPhotoPath(result.photoPath ?? null)
       setIsProcessing(false)
     },
     onError: () => {
@@ -35,14 +36,16 @@ export function useSaveResult() {
       originalPath,
       styleId,
       resultImage,
+      resultPhotoPath,
     }: {
       memberId?: string
       originalPath: string
       styleId: string
       resultImage: string
+      resultPhotoPath?: string | null
     }) => {
-      // First upload the result image
-      const resultPath = await synthesisApi.uploadResultPhoto(resultImage)
+      // The server already stored the result during synthesis; upload only if it didn't
+      const resultPath = resultPhotoPath || (await synthesisApi.uploadResultPhoto(resultImage))
 
       // Handle original image path
       let finalOriginalPath = originalPath
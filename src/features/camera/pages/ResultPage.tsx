@@ -21,6 +21,7 @@ export default function ResultPage() {
     selectedImagePreview,
     selectedStyle,
     resultImage,
+    resultPhotoPath,
     reset,
   } = useCameraStore()
   const saveResultMutation = useSaveResult()
@@ -34,6 +35,7 @@ export default function ResultPage() {
         originalPath: selectedImagePreview,
         styleId: selectedStyle.id,
         resultImage: resultImage,
+        resultPhotoPath,
       })
       reset()
       navigate('/gallery')
@@ -79,7 +81,7 @@ export default function ResultPage() {
       <Box sx={{ mb: 3 }}>
         <BeforeAfterSlider
           originalImage={selectedImagePreview || ''}
-          resultImage={`data:image/png;base64,${resultImage}`}
+          resultImage={resultImage}
         />
         <Typography
           variant="caption"
@@ -7,11 +7,13 @@ interface CameraState {
   selectedImagePreview: string | null
   selectedStyle: Style | null
   resultImage: string | null
+  resultPhotoPath: string | null
   isProcessing: boolean
   setSelectedMember: (member: Member | null) => void
   setSelectedImage: (file: File | null, preview: string | null) => void
   setSelectedStyle: (style: Style | null) => void
   setResultImage: (image: string | null) => void
+  setResultPhotoPath: (path: string | null) => void
   setIsProcessing: (value: boolean) => void
   reset: () => void
 }
@@ -22,6 +24,7 @@ export const useCameraStore = create<CameraState>((set) => ({
   selectedImagePreview: null,
   selectedStyle: null,
   resultImage: null,
+  resultPhotoPath: null,
   isProcessing: false,
 
   setSelectedMember: (member) => set({ selectedMember: member }),
@@ -33,6 +36,8 @@ export const useCameraStore = create<CameraState>((set) => ({
 
   setResultImage: (image) => set({ resultImage: image }),
 
+  setResultPhotoPath: (path) => set({ resultPhotoPath: path }),
+
   setIsProcessing: (value) => set({ isProcessing: value }),
 
   reset: () =>
@@ -42,6 +47,7 @@ export const useCameraStore = create<CameraState>((set) => ({
       selectedImagePreview: null,
       selectedStyle: null,
       resultImage: null,
+      resultPhotoPath: null,
       isProcessing: false,
     }),
 }))
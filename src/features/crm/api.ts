@@ -1,10 +1,9 @@
-import api from '../../services/api'
+import api, { getAllPages } from '../../services/api'
 import { Member, CreateMemberRequest, UpdateMemberRequest } from '../../types'
 
 export const memberApi = {
   getMembers: async (): Promise<Member[]> => {
-    const response = await api.get<Member[]>('/members')
-    return response.data
+    return getAllPages<Member>('/members')
   },
 
   getMember: async (id: string): Promise<Member> => {
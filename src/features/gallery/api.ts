@@ -1,4 +1,4 @@
-import api from '../../services/api'
+import api, { getAllPages } from '../../services/api'
 import { SynthesisHistory } from '../../types'
 
 const normalizePath = (path?: string) => {
@@ -10,8 +10,8 @@ const normalizePath = (path?: string) => {
 
 export const galleryApi = {
   getHistory: async (): Promise<SynthesisHistory[]> => {
-    const response = await api.get<SynthesisHistory[]>('/synthesis-history')
-    return response.data.map((item) => ({
+    const history = await getAllPages<SynthesisHistory>('/synthesis-history')
+    return history.map((item) => ({
       ...item,
       result_photo_path: normalizePath(item.result_photo_path),
       original_photo_path: normalizePath(item.original_photo_path),
@@ -37,7 +37,8 @@ export default function GalleryItem({ item, memberName, onClick }: GalleryItemPr
       <CardMedia
         component="img"
         height="160"
-        image={getImageUrl(item.result_photo_path)}
+        // Grid cells only need the server's preview size class
+        image={getImageUrl(item.result_photo_path && `${item.result_photo_path}?size=preview`)}
         alt="Synthesis result"
         sx={{ objectFit: 'cover' }}
       />
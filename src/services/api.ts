@@ -98,4 +98,18 @@ api.interceptors.response.use(
   }
 )
 
+// Keyset-paginated list endpoints send the next page's cursor in X-Next-Cursor
+const PAGE_SIZE = 200
+
+export const getAllPages = async <T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> => {
+  const items: T[] = []
+  let cursor: string | undefined
+  do {
+    const response = await api.get<T[]>(url, { params: { ...params, limit: PAGE_SIZE, cursor } })
+    items.push(...response.data)
+    cursor = response.headers['x-next-cursor'] || undefined
+  } while (cursor)
+  return items
+}
+
 export default api
@@ -82,6 +82,13 @@ export interface SynthesisResult {
   style_id: string
 }
 
+export interface SynthesisResponse {
+  result_image?: string // base64, omitted when inline=false
+  result_mime_type?: string
+  result_photo_path?: string
+  preview_photo_path?: string
+}
+
 export interface SynthesisHistory {
   id: string
   member_id?: string
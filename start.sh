@@ -37,6 +37,9 @@ if [ -d "venv" ]; then
     source venv/bin/activate
 fi
 
+# Apply database schema migrations
+alembic upgrade head
+
 uvicorn main:app --host 0.0.0.0 --port 8000 --reload &
 BACKEND_PID=$!
 echo -e "${GREEN}Backend started (PID: $BACKEND_PID) → http://localhost:8000${NC}"